@@ -1,4 +1,4 @@
-from .shopify_products import mcp as my_mcp
+from .shopify_products import mcp as my_mcp, warm_catalog
 import logging
 
 # 配置日志
@@ -12,6 +12,7 @@ def joke():
     # 实现代码...
     # pass
     logger.info("hello")
+    warm_catalog()
     my_mcp.run(transport='stdio')
 
 
@@ -0,0 +1,285 @@
+"""可内存映射的二进制产品目录格式
+
+文件布局::
+
+    MAGIC (8 字节) | 头部长度 (uint64, 小端) | 头部 JSON | 按 8 字节对齐的数据段
+
+数值列直接存放 numpy 原始数组，加载时用 np.frombuffer 映射到 mmap 上，
+不需要解析，多个进程共享同一份页缓存。文本列存放为 UTF-8 数据块、
+字节偏移数组和空值掩码，加载时只把偏移和掩码映射为数组，
+单元格在被访问时才从映射内存解码，不需要 CSV 的分词和引号处理。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype, take as _take_positions
+from pandas.api.indexers import check_array_indexer
+from pandas.api.types import is_integer, pandas_dtype
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SHPCAT01'
+BINARY_CATALOG_SUFFIX = '.catalog'
+ALIGNMENT = 8
+
+_HEADER_LENGTH = struct.Struct('<Q')
+
+
+def binary_catalog_path(csv_path: str) -> str:
+    """根据 CSV 路径得到同目录下的二进制目录路径"""
+    return os.path.splitext(csv_path)[0] + BINARY_CATALOG_SUFFIX
+
+
+class MappedTextDtype(ExtensionDtype):
+    """内存映射文本列的类型"""
+
+    name = 'mapped_text'
+    type = str
+    kind = 'O'
+    na_value = np.nan
+
+    @classmethod
+    def construct_array_type(cls):
+        return MappedTextArray
+
+
+class MappedTextArray(ExtensionArray):
+    """
+    只读的文本列，单元格是映射内存中 UTF-8 数据的 (起点, 终点) 视图，访问时才解码
+
+    起点、终点和空值掩码本身可以是 mmap 上的数组，按行取子集时只复制这些数组，不复制文本。
+    na_text 不为空时，空值按该字符串返回且不再视为缺失，用于和 astype(str) 的 'nan' 保持一致。
+    """
+
+    _dtype = MappedTextDtype()
+
+    def __init__(self, buffer, starts: np.ndarray, ends: np.ndarray, nulls: np.ndarray,
+                 na_text: Optional[str] = None):
+        self._buffer = buffer
+        self._starts = starts
+        self._ends = ends
+        self._nulls = nulls
+        self._na_text = na_text
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy: bool = False) -> 'MappedTextArray':
+        if isinstance(scalars, cls):
+            return scalars.copy() if copy else scalars
+        values = list(scalars)
+        nulls = np.asarray(pd.isna(values), dtype=bool).reshape(len(values))
+        blob, offsets, _ = _encode_text_column(pd.Series(values, dtype=object))
+        return cls(memoryview(blob), offsets[:-1], offsets[1:], nulls)
+
+    @classmethod
+    def _from_factorized(cls, values, original) -> 'MappedTextArray':
+        return cls._from_sequence(values)
+
+    @property
+    def dtype(self) -> MappedTextDtype:
+        return self._dtype
+
+    @property
+    def nbytes(self) -> int:
+        # 文本留在映射内存中，只计算本列自己持有的偏移和掩码
+        return self._starts.nbytes + self._ends.nbytes + self._nulls.nbytes
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _decode(self, index: int) -> Any:
+        if self._nulls[index]:
+            return np.nan if self._na_text is None else self._na_text
+        return str(self._buffer[self._starts[index]:self._ends[index]], 'utf-8')
+
+    def __getitem__(self, item):
+        if is_integer(item):
+            return self._decode(int(item))
+        if isinstance(item, tuple) and len(item) == 1:
+            item = item[0]
+        if not isinstance(item, slice):
+            item = check_array_indexer(self, item)
+        return MappedTextArray(self._buffer, self._starts[item], self._ends[item], self._nulls[item],
+                               self._na_text)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._decode(index)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        values = np.empty(len(self), dtype=object)
+        values[:] = list(self)
+        return values if dtype is None else values.astype(dtype)
+
+    def __eq__(self, other):
+        return np.asarray(self, dtype=object) == (np.asarray(other, dtype=object)
+                                                  if isinstance(other, (ExtensionArray, np.ndarray)) else other)
+
+    def isna(self) -> np.ndarray:
+        if self._na_text is not None:
+            return np.zeros(len(self), dtype=bool)
+        return np.asarray(self._nulls, dtype=bool)
+
+    def fillna(self, value=None, method=None, limit=None, copy: bool = True) -> 'MappedTextArray':
+        """用字符串填充空值，不解码文本"""
+        if isinstance(value, str) and method is None and limit is None:
+            return MappedTextArray(self._buffer, self._starts, self._ends, self._nulls,
+                                   value if self._na_text is None else self._na_text)
+        return super().fillna(value=value, method=method, limit=limit, copy=copy)
+
+    def astype(self, dtype, copy: bool = True):
+        dtype = pandas_dtype(dtype)
+        if isinstance(dtype, MappedTextDtype):
+            return self.copy() if copy else self
+        if isinstance(dtype, np.dtype) and dtype.kind == 'U':
+            # 与 object 列的 astype(str) 一致：得到 Python 字符串的 object 数组，空值为 'nan'
+            return np.asarray(self.fillna('nan'), dtype=object)
+        if isinstance(dtype, np.dtype) and dtype == object:
+            return np.asarray(self, dtype=object)
+        return super().astype(dtype, copy=copy)
+
+    def take(self, indices: Sequence[int], allow_fill: bool = False, fill_value=None) -> 'MappedTextArray':
+        indices = np.asarray(indices, dtype=np.intp)
+        if allow_fill and fill_value is not None and not pd.isna(fill_value):
+            return self._from_sequence(_take_positions(np.asarray(self, dtype=object), indices,
+                                                       allow_fill=True, fill_value=fill_value))
+        positions = np.arange(len(self), dtype=np.intp)
+        positions = _take_positions(positions, indices, allow_fill=allow_fill, fill_value=-1)
+        missing = positions == -1
+        positions[missing] = 0
+        if not len(self):
+            zeros = np.zeros(len(positions), dtype=np.int64)
+            return MappedTextArray(self._buffer, zeros, zeros, np.ones(len(positions), dtype=bool),
+                                   self._na_text)
+        nulls = np.asarray(self._nulls, dtype=bool)[positions] | missing
+        return MappedTextArray(self._buffer, self._starts[positions], self._ends[positions], nulls,
+                               self._na_text)
+
+    def copy(self) -> 'MappedTextArray':
+        # 数据不可变，副本与原数组共享映射内存和偏移数组
+        return MappedTextArray(self._buffer, self._starts, self._ends, self._nulls, self._na_text)
+
+    @classmethod
+    def _concat_same_type(cls, to_concat: Sequence['MappedTextArray']) -> 'MappedTextArray':
+        first = to_concat[0]
+        if all(array._buffer is first._buffer and array._na_text == first._na_text for array in to_concat):
+            return cls(first._buffer,
+                       np.concatenate([array._starts for array in to_concat]),
+                       np.concatenate([array._ends for array in to_concat]),
+                       np.concatenate([np.asarray(array._nulls, dtype=bool) for array in to_concat]),
+                       first._na_text)
+        return cls._from_sequence([value for array in to_concat for value in array])
+
+
+def _encode_text_column(values: pd.Series) -> Tuple[bytes, np.ndarray, np.ndarray]:
+    """把文本列编码为 (UTF-8 数据块, 字节偏移, 空值掩码)"""
+    nulls = values.isna().to_numpy()
+    encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(values, nulls)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets, nulls.astype(np.uint8)
+
+
+def write_binary_catalog(df: pd.DataFrame, path: str) -> None:
+    """
+    把产品数据写成二进制目录文件
+
+    先写临时文件再原子重命名，已经映射旧文件的进程不受影响。
+
+    Args:
+        df: 产品数据
+        path: 输出文件路径
+    """
+    sections: List[bytes] = []
+    columns: List[Dict[str, Any]] = []
+    position = 0
+
+    def add_section(data: bytes) -> List[int]:
+        nonlocal position
+        padding = -len(data) % ALIGNMENT
+        sections.append(data + b'\0' * padding)
+        section = [position, len(data)]
+        position += len(data) + padding
+        return section
+
+    for name in df.columns:
+        values = df[name]
+        if values.dtype.kind in 'biuf':
+            array = np.ascontiguousarray(values.to_numpy())
+            columns.append({'name': name, 'kind': 'array', 'dtype': array.dtype.str,
+                            'data': add_section(array.tobytes())})
+        else:
+            blob, offsets, nulls = _encode_text_column(values)
+            columns.append({'name': name, 'kind': 'text',
+                            'data': add_section(blob),
+                            'offsets': add_section(offsets.tobytes()),
+                            'nulls': add_section(nulls.tobytes())})
+
+    header = json.dumps({'rows': len(df), 'columns': columns}, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + _HEADER_LENGTH.size + len(header)) % ALIGNMENT)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LENGTH.pack(len(header)))
+            f.write(header)
+            for section in sections:
+                f.write(section)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    logger.info(f"二进制产品目录已保存到: {path}")
+
+
+def read_binary_catalog(path: str) -> pd.DataFrame:
+    """
+    映射二进制目录文件并构建 DataFrame
+
+    数值列是 mmap 上的只读视图，不会复制；文本列是 MappedTextArray，只映射偏移和空值掩码，
+    单元格在访问时才从映射内存解码。
+    """
+    with open(path, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapped[:len(MAGIC)] != MAGIC:
+        mapped.close()
+        raise ValueError(f"不是有效的二进制产品目录: {path}")
+
+    (header_length,) = _HEADER_LENGTH.unpack_from(mapped, len(MAGIC))
+    header_start = len(MAGIC) + _HEADER_LENGTH.size
+    header = json.loads(bytes(mapped[header_start:header_start + header_length]))
+    base = header_start + header_length
+    rows = header['rows']
+    view = memoryview(mapped)
+
+    data: Dict[str, Any] = {}
+    for column in header['columns']:
+        offset, length = column['data']
+        if column['kind'] == 'array':
+            dtype = np.dtype(column['dtype'])
+            data[column['name']] = np.frombuffer(mapped, dtype=dtype, count=length // dtype.itemsize,
+                                                 offset=base + offset)
+            continue
+
+        offsets_at, _ = column['offsets']
+        nulls_at, _ = column['nulls']
+        offsets = np.frombuffer(mapped, dtype=np.int64, count=rows + 1, offset=base + offsets_at)
+        nulls = np.frombuffer(mapped, dtype=np.bool_, count=rows, offset=base + nulls_at)
+        # 偏移相对于该列的数据块，视图从数据块开始，偏移无需换算
+        blob = view[base + offset:base + offset + length]
+        data[column['name']] = pd.Series(MappedTextArray(blob, offsets[:-1], offsets[1:], nulls), copy=False)
+
+    return pd.DataFrame(data, columns=[column['name'] for column in header['columns']], copy=False)
@@ -0,0 +1,369 @@
+"""产品目录快照：加载时一次性计算价格、类别等派生字段"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Protocol, Sequence, Tuple
+import base64
+import heapq
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .binary_catalog import MappedTextDtype
+from .facets import FacetIndex
+from .filter_engine import ProductFilterEngine
+from .ngram_index import TrigramIndex
+from .price_index import decimal_prices
+from .text_index import BM25Index, INDEXED_FIELDS, tokenize
+from .variants import VariantGroups, has_variants
+from .vector_index import VectorIndex
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 从产品描述中提取价格的正则
+PRICE_PATTERN = r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)'
+
+# 按名称推断类别的规则，按顺序匹配第一个命中的规则
+CATEGORY_RULES = [
+    (("Solar Generator",), "Solar Generator"),
+    (("Battery Pack", "Power Station"), "Battery Pack"),
+    (("Solar Panel",), "Solar Panel"),
+]
+
+# 紧凑模式下保留的列：工具读取的字段以及变体相关字段
+COMPACT_COLUMNS = [
+    'Name', 'URL', 'Product Description',
+    'Product ID', 'Variant ID', 'Variant Title', 'SKU', 'Price', 'Inventory Quantity'
+]
+
+# 重复值占比达到该比例的文本列转换为 category 类型
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+
+# get_all_products 默认返回的字段
+RECORD_FIELDS = ('name', 'url', 'description', 'price', 'category')
+
+# 按需返回的变体聚合字段，variants 只在请求时才展开
+VARIANT_RECORD_FIELDS = ('min_price', 'max_price', 'total_inventory', 'variant_count', 'variants')
+
+# 相关度排序时每批校验过滤条件的候选数量
+RANK_BATCH_SIZE = 32
+
+# 读取 CSV 时按字符串处理的文本列
+TEXT_COLUMN_DTYPES = {
+    'Name': str,
+    'URL': str,
+    'Meta Title': str,
+    'Meta Description': str,
+    'Product Description': str
+}
+
+# 快照版本号，每次构建新快照递增
+_snapshot_versions = itertools.count(1)
+
+
+def next_snapshot_version() -> int:
+    """分配新的目录版本号，分页游标按版本号判断目录是否已更新"""
+    return next(_snapshot_versions)
+
+
+def parse_prices(descriptions: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """批量从描述中提取价格
+
+    Args:
+        descriptions: 产品描述列
+
+    Returns:
+        (float64 价格数组, int8 舍入方向数组)。没有价格的行为 NaN。
+        舍入方向为十进制原值相对 float 值的符号，用于在边界上复现
+        Decimal 与 float 比较的结果。
+    """
+    # 变体行共享同一段描述，只对去重后的描述做正则解析
+    codes, uniques = pd.factorize(descriptions.astype(str))
+    matches = pd.Series(uniques).str.extract(PRICE_PATTERN, expand=False)
+    prices, rounding = decimal_prices(matches.str.replace(',', '', regex=False))
+    return prices[codes], rounding[codes]
+
+
+def read_products_csv(path: str) -> pd.DataFrame:
+    """读取爬虫生成的产品 CSV"""
+    return pd.read_csv(path, dtype=TEXT_COLUMN_DTYPES)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    生成紧凑的产品数据：只保留需要的列，重复文本用 category 去重，整数列降位
+
+    文本列的缺失值与 str() 的结果保持一致，转换为字符串 'nan'。
+    """
+    columns = {}
+    for column in COMPACT_COLUMNS:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        if values.dtype.kind in 'iu':
+            values = pd.to_numeric(values, downcast='integer')
+        elif values.dtype == object:
+            values = values.astype(str)
+            if values.nunique() <= len(values) * CATEGORICAL_MAX_UNIQUE_RATIO:
+                values = values.astype('category')
+        columns[column] = values
+    return pd.DataFrame(columns)
+
+
+def text_column(values: pd.Series) -> pd.Series:
+    """把列转换为字符串列，category 列保持原样以共享重复值，映射的文本列保持按需解码"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values
+    if isinstance(values.dtype, MappedTextDtype):
+        return values.fillna('nan')
+    return values.astype(str)
+
+
+def lower_text(values: pd.Series) -> pd.Series:
+    """生成过滤用的小写文本列；category 列只转换一次类别值"""
+    if isinstance(values.dtype, MappedTextDtype):
+        values = values.astype(str)
+    return values.str.lower()
+
+
+def encode_cursor(version: int, offset: int) -> str:
+    """把快照版本和偏移量编码为分页游标"""
+    return base64.urlsafe_b64encode(f"{version}:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """解析分页游标，返回 (快照版本, 偏移量)"""
+    try:
+        version, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        version, offset = int(version), int(offset)
+        if offset < 0:
+            raise ValueError(offset)
+        return version, offset
+    except ValueError as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def _optional_price(price: float) -> Optional[float]:
+    """把 NaN 价格转换为 None"""
+    return None if np.isnan(price) else float(price)
+
+
+def derive_category(name: str) -> Optional[str]:
+    """从产品名称中推断类别"""
+    for keywords, category in CATEGORY_RULES:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return None
+
+
+class CatalogBackend(Protocol):
+    """目录后端接口，search_products 和 get_all_products 只依赖这些成员"""
+
+    version: int
+    match_modes: Tuple[str, ...]
+
+    def __len__(self) -> int: ...
+
+    def search(self, product_filter, limit: int) -> List[int]: ...
+
+    def search_record(self, position: int) -> Dict[str, Any]: ...
+
+    def page(self, offset: int, limit: int, fields: Sequence[str] = RECORD_FIELDS) -> List[Dict[str, Any]]: ...
+
+
+class CatalogSnapshot:
+    """不可变的产品目录快照，包含原始数据和预先计算的派生字段"""
+
+    # 内存后端支持全部匹配模式
+    match_modes = ("exact", "fuzzy", "semantic")
+
+    def __init__(self, df: pd.DataFrame, loaded_at: Optional[datetime] = None, compact: bool = False,
+                 taxonomy: Optional[Dict[str, Dict[str, List[str]]]] = None,
+                 vector_index: Optional[VectorIndex] = None, aggregate_variants: bool = True):
+        """
+        构建目录快照
+
+        Args:
+            df: 从 CSV 读取的原始产品数据
+            loaded_at: 数据加载时间
+            compact: 是否使用紧凑模式，只保留需要的列并对重复文本去重
+            taxonomy: 分面标签表，默认使用 facets.DEFAULT_TAXONOMY
+            vector_index: 预先构建（如从文件加载）的向量索引，行数不一致或为空时重新构建
+            aggregate_variants: 带变体的目录是否按 Product ID 聚合为产品，聚合后每个位置对应一个产品
+        """
+        self.variant_groups: Optional[VariantGroups] = None
+        if aggregate_variants and has_variants(df):
+            self.variant_groups = VariantGroups(compact_frame(df) if compact else df)
+            df = df.iloc[self.variant_groups.product_rows]
+        self.df = df.reset_index(drop=True)
+        self.version = next_snapshot_version()
+        self.loaded_at = loaded_at or datetime.now()
+        self.size = len(self.df)
+        self.compact = compact
+
+        # 全文索引需要 Meta 字段，在裁剪列之前构建
+        self.text_index = BM25Index(self._index_documents())
+        self.trigram_index = TrigramIndex(self.text_index.postings)
+        if vector_index is None or vector_index.size != self.size:
+            vector_index = VectorIndex.build(self._index_documents())
+        self.vector_index = vector_index
+        if compact:
+            self.df = compact_frame(self.df)
+
+        self.names = text_column(self.df['Name'])
+        self.urls = text_column(self.df['URL'])
+        self.descriptions = text_column(self.df['Product Description'])
+        self.name_lower = lower_text(self.names)
+        self.description_lower = lower_text(self.descriptions)
+        if self.variant_groups is None:
+            self.prices, self.price_rounding = parse_prices(self.descriptions)
+        else:
+            # 产品价格取变体 Price 列的最低价；价格过滤按每个变体的价格进行，见 ProductFilterEngine
+            self.prices, self.price_rounding = self.variant_groups.min_prices, None
+        self.categories = [derive_category(name) for name in self.names]
+        self.facets = FacetIndex(self.size, {'name': self.name_lower, 'description': self.description_lower},
+                                 taxonomy)
+
+        self.filter_engine = ProductFilterEngine(self)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _index_documents(self) -> pd.Series:
+        """拼接参与全文索引的字段"""
+        fields = [self.df[column].fillna('').astype(str)
+                  for column in INDEXED_FIELDS if column in self.df.columns]
+        documents = fields[0]
+        for field in fields[1:]:
+            documents = documents + ' ' + field
+        return documents
+
+    def search(self, product_filter, limit: int) -> List[int]:
+        """
+        按 BM25 相关度返回满足过滤条件的前 limit 个行位置
+
+        先按得分从高到低分批校验过滤条件；若得分大于 0 的文档不够，
+        再按目录顺序补充满足过滤条件但没有词项命中的文档。
+        """
+        query = ' '.join(value for value in (product_filter.category,
+                                             product_filter.scenario,
+                                             product_filter.description) if value)
+        results: List[int] = []
+        ranked = self.text_index.ranked(query)
+        # 价格掩码每次查询只计算一次，各批候选共用
+        price_mask = self.filter_engine.product_price_mask(product_filter.min_price, product_filter.max_price)
+        exhausted = False
+        while len(results) < limit and not exhausted:
+            batch = [doc_id for doc_id, _ in itertools.islice(ranked, RANK_BATCH_SIZE)]
+            exhausted = len(batch) < RANK_BATCH_SIZE
+            if batch:
+                matched = self.filter_engine.match_positions(product_filter, np.asarray(batch), price_mask)
+                results.extend(matched[:limit - len(results)].tolist())
+
+        if len(results) < limit and exhausted:
+            seen = set(results)
+            fallback = self.filter_engine.filter(product_filter, limit=limit + len(results))
+            results.extend(position for position in fallback.tolist() if position not in seen)
+        return results[:limit]
+
+    def _fuzzy_keyword_scores(self, keyword: str) -> Dict[int, float]:
+        """
+        计算一个关键词在各文档上的模糊匹配得分
+
+        关键词的每个词都扩展为拼写相近的词项（按相似度加权），文档必须包含每个词的
+        至少一个相近词项；得分为各词加权 BM25 得分之和。
+        """
+        scores: Optional[Dict[int, float]] = None
+        for token in tokenize(keyword):
+            weights = dict(self.trigram_index.similar(token))
+            docs, token_scores = self.text_index.score_terms(weights)
+            matched = dict(zip(docs.tolist(), token_scores.tolist()))
+            if scores is None:
+                scores = matched
+            else:
+                scores = {doc_id: scores[doc_id] + score
+                          for doc_id, score in matched.items() if doc_id in scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+    def fuzzy_search(self, product_filter, limit: int) -> List[int]:
+        """
+        容错匹配：类别、场景和描述关键词允许拼写错误，按相似度加权的相关度从高到低
+        返回前 limit 个行位置
+
+        价格条件仍然精确匹配。
+        """
+        keywords = [value for value in (product_filter.category,
+                                        product_filter.scenario,
+                                        product_filter.description) if value]
+        if not keywords:
+            return self.filter_engine.filter(product_filter, limit=limit).tolist()
+
+        scores: Dict[int, float] = {}
+        for index, keyword in enumerate(keywords):
+            keyword_scores = self._fuzzy_keyword_scores(keyword)
+            if index == 0:
+                scores = keyword_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score
+                          for doc_id, score in keyword_scores.items() if doc_id in scores}
+            if not scores:
+                return []
+
+        positions = np.fromiter(scores, dtype=np.intp, count=len(scores))
+        positions = positions[self.filter_engine.price_mask(product_filter.min_price,
+                                                            product_filter.max_price, positions)]
+        return heapq.nsmallest(limit, positions.tolist(), key=lambda doc_id: (-scores[doc_id], doc_id))
+
+    def semantic_search(self, product_filter, limit: int) -> List[int]:
+        """
+        语义匹配：把类别、场景和描述拼成自然语言查询，按向量相似度返回前 limit 个行位置
+
+        价格条件仍然精确匹配，文本条件只参与打分，不要求字面出现。
+        """
+        query = ' '.join(value for value in (product_filter.category,
+                                             product_filter.scenario,
+                                             product_filter.description) if value)
+        mask = None
+        if product_filter.min_price or product_filter.max_price:
+            mask = self.filter_engine.price_mask(product_filter.min_price, product_filter.max_price,
+                                                 np.arange(self.size))
+        return [position for position, _ in self.vector_index.top_k(query, limit, mask)]
+
+    def price_at(self, position: int) -> Optional[float]:
+        """获取指定行的价格，没有价格时返回 None"""
+        return _optional_price(self.prices[position])
+
+    def search_record(self, position: int) -> Dict[str, Any]:
+        """构建 search_products 返回的产品字典"""
+        return {
+            'name': self.names.iat[position],
+            'url': self.urls.iat[position],
+            'description': self.descriptions.iat[position]
+        }
+
+    def record(self, position: int, fields: Sequence[str] = RECORD_FIELDS) -> Dict[str, Any]:
+        """构建 get_all_products 返回的产品字典，只包含指定字段"""
+        groups = self.variant_groups
+        values = {
+            'name': lambda: self.names.iat[position],
+            'url': lambda: self.urls.iat[position],
+            'description': lambda: self.descriptions.iat[position],
+            'price': lambda: self.price_at(position),
+            'category': lambda: self.categories[position],
+            'min_price': lambda: (self.price_at(position) if groups is None
+                                  else _optional_price(groups.min_prices[position])),
+            'max_price': lambda: (self.price_at(position) if groups is None
+                                  else _optional_price(groups.max_prices[position])),
+            'total_inventory': lambda: None if groups is None else int(groups.total_inventory[position]),
+            'variant_count': lambda: 1 if groups is None else int(groups.variant_counts[position]),
+            'variants': lambda: [] if groups is None else groups.variants(position),
+        }
+        return {field: values[field]() for field in fields}
+
+    def page(self, offset: int, limit: int, fields: Sequence[str] = RECORD_FIELDS) -> List[Dict[str, Any]]:
+        """按目录顺序返回从 offset 开始的最多 limit 个产品字典"""
+        return [self.record(position, fields) for position in range(offset, min(offset + limit, self.size))]
@@ -0,0 +1,200 @@
+"""产品目录加载器：按文件变化重新加载，后台刷新并原子替换快照"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from .binary_catalog import BINARY_CATALOG_SUFFIX, read_binary_catalog
+from .catalog import CatalogSnapshot, read_products_csv
+from .vector_index import VectorIndex, vector_index_path
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 两次检查文件变化之间的最小间隔（秒）
+DEFAULT_CHECK_INTERVAL_SECONDS = 30
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class CatalogFingerprint(NamedTuple):
+    """产品文件指纹"""
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+
+
+def stat_file(path: str) -> os.stat_result:
+    """获取文件状态"""
+    return os.stat(path)
+
+
+def hash_file(path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_snapshot_from_file(path: str, digest: Optional[str] = None, compact: bool = False,
+                             taxonomy: Optional[Dict[str, Dict[str, List[str]]]] = None,
+                             vectors_dir: Optional[str] = None) -> CatalogSnapshot:
+    """
+    从二进制目录或 CSV 文件构建目录快照
+
+    向量索引优先从向量文件加载（按文件内容哈希校验），不存在或已过期时重新构建并写回，
+    下次启动不必重新计算。向量文件保存在 vectors_dir 中，未指定时保存在数据文件旁边。
+    digest 为加载器检查变化时已算出的文件哈希，传入后不再重复读取文件计算。
+    """
+    df = read_binary_catalog(path) if path.endswith(BINARY_CATALOG_SUFFIX) else read_products_csv(path)
+    digest = digest or hash_file(path)
+    vectors_path = vector_index_path(path, vectors_dir)
+    vector_index = VectorIndex.load(vectors_path, digest)
+
+    snapshot = CatalogSnapshot(df, compact=compact, taxonomy=taxonomy, vector_index=vector_index)
+    if snapshot.vector_index is not vector_index:
+        try:
+            snapshot.vector_index.save(vectors_path, digest)
+        except OSError as e:
+            logger.warning(f"保存向量文件失败: {str(e)}")
+    return snapshot
+
+
+class CatalogLoader:
+    """带文件变化检测的目录加载器
+
+    首次加载会阻塞调用方，启动时可调用 refresh_in_background() 提前在后台开始；
+    之后按间隔检查文件的 mtime/大小，变化时再比较内容哈希，只有内容真正改变
+    才在后台线程中重新解析。刷新期间调用方继续拿到旧快照（stale-while-revalidate），
+    新快照构建完成后一次性替换。
+    """
+
+    def __init__(self, path: str,
+                 build_snapshot: Callable[[str, str], CatalogSnapshot] = build_snapshot_from_file,
+                 check_interval: float = DEFAULT_CHECK_INTERVAL_SECONDS,
+                 fallback_path: Optional[str] = None):
+        """
+        初始化加载器
+
+        Args:
+            path: 产品数据文件路径
+            build_snapshot: 从文件构建快照的函数，参数为文件路径和文件内容哈希
+            check_interval: 两次检查文件变化之间的最小间隔（秒）
+            fallback_path: path 不存在时使用的文件路径（如二进制目录不存在时回退到 CSV）
+        """
+        self.path = path
+        self.fallback_path = fallback_path
+        self.build_snapshot = build_snapshot
+        self.check_interval = check_interval
+
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._fingerprint: Optional[CatalogFingerprint] = None
+        self._last_check = 0.0
+        self._load_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """当前快照，尚未加载时为 None"""
+        return self._snapshot
+
+    @property
+    def fingerprint(self) -> Optional[CatalogFingerprint]:
+        """当前快照对应的文件指纹"""
+        return self._fingerprint
+
+    def get(self) -> CatalogSnapshot:
+        """获取当前快照，必要时触发后台刷新"""
+        if self._snapshot is None:
+            with self._load_lock:
+                if self._snapshot is None:
+                    self.refresh()
+            return self._snapshot
+
+        snapshot = self._snapshot
+        if time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh_in_background()
+        return snapshot
+
+    def refresh_in_background(self) -> Optional[threading.Thread]:
+        """启动后台刷新线程，已有刷新在进行时直接返回"""
+        if not self._load_lock.acquire(blocking=False):
+            return None
+        self._last_check = time.monotonic()
+        thread = threading.Thread(target=self._refresh_locked, name="catalog-refresh", daemon=True)
+        self._refresh_thread = thread
+        thread.start()
+        return thread
+
+    def wait_for_refresh(self, timeout: Optional[float] = None) -> None:
+        """等待正在进行的后台刷新完成"""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _refresh_locked(self) -> None:
+        """在持有加载锁的情况下检查文件并刷新"""
+        try:
+            self.refresh()
+        except Exception as e:
+            # 保留旧快照，下个检查周期重试
+            logger.error(f"刷新产品数据失败: {str(e)}")
+        finally:
+            self._load_lock.release()
+
+    def source_path(self) -> str:
+        """
+        当前应加载的文件路径
+
+        主文件不存在，或备用文件比主文件更新时（例如手动修改或重新生成了 CSV，而二进制目录还是旧的）
+        使用备用文件。
+        """
+        if self.fallback_path is None:
+            return self.path
+        try:
+            primary_mtime = stat_file(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return self.fallback_path
+        try:
+            if stat_file(self.fallback_path).st_mtime_ns > primary_mtime:
+                logger.debug(f"{self.fallback_path} 比 {self.path} 更新，使用前者")
+                return self.fallback_path
+        except FileNotFoundError:
+            pass
+        return self.path
+
+    def refresh(self) -> bool:
+        """检查文件是否变化，变化时重新加载。返回是否替换了快照"""
+        path = self.source_path()
+        stat = stat_file(path)
+        current = self._fingerprint
+        if (current is not None and
+                (path, stat.st_mtime_ns, stat.st_size) == (current.path, current.mtime_ns, current.size)):
+            logger.debug("产品数据文件未变化")
+            return False
+
+        digest = hash_file(path)
+        if current is not None and (path, digest) == (current.path, current.digest):
+            logger.debug("产品数据文件内容未变化，仅更新文件状态")
+            self._fingerprint = CatalogFingerprint(path, stat.st_mtime_ns, stat.st_size, digest)
+            return False
+
+        self._load(CatalogFingerprint(path, stat.st_mtime_ns, stat.st_size, digest))
+        return True
+
+    def _load(self, fingerprint: CatalogFingerprint) -> None:
+        """解析文件并原子替换快照"""
+        logger.info(f"从文件加载产品数据: {fingerprint.path}")
+        snapshot = self.build_snapshot(fingerprint.path, fingerprint.digest)
+        # 替换引用是原子操作，读者要么拿到旧快照，要么拿到完整的新快照
+        self._snapshot = snapshot
+        self._fingerprint = fingerprint
+        self._last_check = time.monotonic()
+        logger.info(f"产品数据已更新: 版本 {snapshot.version}, 共 {len(snapshot)} 行")
@@ -0,0 +1,137 @@
+"""产品分面标签：加载目录时按关键词/同义词表给产品打标签，并按标签保存位集"""
+
+from typing import Dict, List, Mapping, Optional, Sequence
+import json
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认标签表：分面 -> 标签 -> 关键词（同义词）
+# 标签名本身总是作为关键词之一；关键词按完整的词匹配，"rv" 不会命中 "service"、"reserve"
+DEFAULT_TAXONOMY: Dict[str, Dict[str, List[str]]] = {
+    "category": {
+        "solar generator": ["solar generator"],
+        "battery pack": ["battery pack", "power station"],
+        "solar panel": ["solar panel"],
+    },
+    "scenario": {
+        "camping": ["camping", "campsite"],
+        "home backup": ["home backup", "outage", "blackout", "emergency power"],
+        "rv": ["rv", "motorhome", "campervan"],
+        "off grid": ["off grid", "off-grid"],
+    },
+}
+
+# 分面匹配的文本字段：类别匹配名称或描述，场景只匹配描述
+FACET_FIELDS = {
+    "category": ("name", "description"),
+    "scenario": ("description",),
+}
+
+
+def load_taxonomy(path: Optional[str] = None) -> Dict[str, Dict[str, List[str]]]:
+    """
+    加载标签表
+
+    Args:
+        path: JSON 文件路径，格式为 {分面: {标签: [关键词, ...]}}；为空时使用默认标签表
+
+    Returns:
+        标签和关键词均已转为小写的标签表
+    """
+    if not path:
+        return DEFAULT_TAXONOMY
+
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+
+    taxonomy: Dict[str, Dict[str, List[str]]] = {}
+    for facet, tags in raw.items():
+        if facet not in FACET_FIELDS:
+            raise ValueError(f"未知的分面: {facet}，可选: {', '.join(FACET_FIELDS)}")
+        if not isinstance(tags, dict):
+            raise ValueError(f"分面 {facet} 的标签表必须是对象")
+        taxonomy[facet] = {str(tag).strip().lower(): [str(keyword).strip().lower() for keyword in keywords]
+                           for tag, keywords in tags.items()}
+    logger.info(f"从文件加载标签表: {path}")
+    return taxonomy
+
+
+def keyword_pattern(keywords: Sequence[str]) -> str:
+    """生成按完整的词匹配任一关键词的正则，关键词前后不能紧接字母或数字，允许复数词尾（s / es）"""
+    alternatives = '|'.join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return rf'(?<!\w)(?:{alternatives})(?:e?s)?(?!\w)'
+
+
+def _contains_any(column: pd.Series, keywords: Sequence[str]) -> np.ndarray:
+    """计算整列是否以完整的词包含任一关键词"""
+    if not keywords:
+        return np.zeros(len(column), dtype=bool)
+    return column.str.contains(keyword_pattern(keywords), regex=True).to_numpy(dtype=bool, na_value=False)
+
+
+class FacetIndex:
+    """按标签保存的产品位集
+
+    每个标签对应一个按行位置打包的位集（np.packbits），多个分面条件的组合
+    只是位集之间的按位与，查询时不需要扫描文本。
+    """
+
+    def __init__(self, size: int, fields: Mapping[str, pd.Series],
+                 taxonomy: Optional[Mapping[str, Mapping[str, Sequence[str]]]] = None):
+        """
+        为每个标签计算位集
+
+        Args:
+            size: 目录行数
+            fields: 小写文本列，键为 FACET_FIELDS 中的字段名
+            taxonomy: 标签表，默认为 DEFAULT_TAXONOMY
+        """
+        self.size = size
+        taxonomy = DEFAULT_TAXONOMY if taxonomy is None else taxonomy
+        self.bitsets: Dict[str, Dict[str, np.ndarray]] = {}
+        # 标签名和同义词都解析到标签
+        self.aliases: Dict[str, Dict[str, str]] = {}
+
+        for facet, tags in taxonomy.items():
+            self.bitsets[facet] = {}
+            self.aliases[facet] = {}
+            for tag, keywords in tags.items():
+                keywords = list(dict.fromkeys([tag, *keywords]))
+                mask = np.zeros(size, dtype=bool)
+                for field in FACET_FIELDS[facet]:
+                    mask |= _contains_any(fields[field], keywords)
+                self.bitsets[facet][tag] = np.packbits(mask)
+                for keyword in keywords:
+                    self.aliases[facet].setdefault(keyword, tag)
+
+        tag_count = sum(len(tags) for tags in self.bitsets.values())
+        logger.info(f"分面标签构建完成: {tag_count} 个标签")
+
+    def resolve(self, facet: str, keyword: str) -> Optional[str]:
+        """把查询关键词解析为标签，不在标签表中时返回 None"""
+        return self.aliases.get(facet, {}).get(keyword.strip().lower())
+
+    def bits(self, facet: str, keyword: str) -> Optional[np.ndarray]:
+        """获取关键词对应标签的位集，不在标签表中时返回 None"""
+        tag = self.resolve(facet, keyword)
+        return None if tag is None else self.bitsets[facet][tag]
+
+    def test(self, bits: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """检查给定行位置在位集中是否置位"""
+        positions = np.asarray(positions, dtype=np.intp)
+        return ((bits[positions >> 3] >> (7 - (positions & 7))) & 1).astype(bool)
+
+    def positions(self, bits: np.ndarray) -> np.ndarray:
+        """位集中置位的全部行位置"""
+        return np.flatnonzero(np.unpackbits(bits, count=self.size))
+
+    def tags(self, position: int) -> Dict[str, List[str]]:
+        """获取某一行的全部标签"""
+        return {facet: [tag for tag, bits in tags.items() if self.test(bits, [position])[0]]
+                for facet, tags in self.bitsets.items()}
@@ -0,0 +1,166 @@
+"""产品过滤引擎：把 ProductFilter 转换为列式布尔掩码"""
+
+from typing import Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .price_index import PriceIndex
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 分块大小：每块计算一次掩码，凑够结果数量后提前结束
+DEFAULT_CHUNK_SIZE = 2048
+
+
+class ProductFilterEngine:
+    """基于预计算列的向量化产品过滤引擎"""
+
+    def __init__(self, snapshot):
+        """
+        使用目录快照中预计算的小写文本列与价格列
+
+        Args:
+            snapshot: CatalogSnapshot 实例
+        """
+        self.size = snapshot.size
+        self.name_lower = snapshot.name_lower
+        self.description_lower = snapshot.description_lower
+        groups = snapshot.variant_groups
+        if groups is None:
+            self.prices = snapshot.prices
+            self.price_rounding = snapshot.price_rounding
+            self.price_rows = None
+        else:
+            # 聚合后的产品只要有一个变体的价格满足条件就匹配
+            self.prices = groups.prices
+            self.price_rounding = groups.rounding
+            self.price_rows = groups.variant_products
+        self.facets = snapshot.facets
+        self.price_index = PriceIndex(self.prices, self.price_rounding)
+
+    def product_price_mask(self, min_price: Optional[float], max_price: Optional[float]) -> Optional[np.ndarray]:
+        """
+        用价格索引计算整个目录的价格掩码，没有价格条件时返回 None
+
+        同一次查询分批校验候选时只需计算一次，再用 price_mask 的 product_mask 参数复用。
+        """
+        if not (min_price or max_price):
+            return None
+        matched = np.zeros(self.size, dtype=bool)
+        matched[self._price_positions(min_price, max_price)] = True
+        return matched
+
+    def price_mask(self, min_price: Optional[float], max_price: Optional[float],
+                   positions: np.ndarray, product_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        计算指定行的价格掩码，没有价格的产品视为匹配
+
+        Args:
+            min_price: 最低价格
+            max_price: 最高价格
+            positions: 行位置
+            product_mask: product_price_mask 预先算好的整个目录的掩码
+        """
+        if not (min_price or max_price):
+            return np.ones(len(positions), dtype=bool)
+        if product_mask is not None:
+            return product_mask[positions]
+        if self.price_rows is None:
+            return self._price_row_mask(min_price, max_price, positions)
+        return self.product_price_mask(min_price, max_price)[positions]
+
+    def _price_row_mask(self, min_price: Optional[float], max_price: Optional[float], rows) -> np.ndarray:
+        """计算价格行（未聚合时为目录行，聚合时为变体行）的价格掩码"""
+        prices = self.prices[rows]
+        rounding = self.price_rounding[rows]
+        mask = np.ones(len(prices), dtype=bool)
+        if min_price:
+            mask &= ~((prices < min_price) | ((prices == min_price) & (rounding < 0)))
+        if max_price:
+            mask &= ~((prices > max_price) | ((prices == max_price) & (rounding > 0)))
+        return mask
+
+    def _contains(self, column: pd.Series, keyword: str, candidates: np.ndarray) -> np.ndarray:
+        """在候选行上计算子串包含掩码"""
+        return column.iloc[candidates].str.contains(keyword, regex=False).to_numpy(dtype=bool)
+
+    def _match_text(self, product_filter, candidates: np.ndarray) -> np.ndarray:
+        """在候选行中保留满足类别、场景和描述条件的行
+
+        类别和场景能解析为标签时，先把对应的标签位集按位与，再一次性检查候选行；
+        不在标签表中的关键词退回到子串匹配。
+        """
+        facet_bits = None
+        keywords = []
+        for facet, keyword in (('category', product_filter.category),
+                               ('scenario', product_filter.scenario)):
+            if not keyword:
+                continue
+            bits = self.facets.bits(facet, keyword)
+            if bits is None:
+                keywords.append((facet, keyword.lower()))
+            else:
+                facet_bits = bits if facet_bits is None else facet_bits & bits
+        if product_filter.description:
+            keywords.append(('description', product_filter.description.lower()))
+
+        if facet_bits is not None and len(candidates):
+            candidates = candidates[self.facets.test(facet_bits, candidates)]
+
+        for facet, keyword in keywords:
+            if not len(candidates):
+                break
+            matched = self._contains(self.description_lower, keyword, candidates)
+            if facet == 'category':
+                matched |= self._contains(self.name_lower, keyword, candidates)
+            candidates = candidates[matched]
+
+        return candidates
+
+    def match_positions(self, product_filter, positions: np.ndarray,
+                        product_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """在给定行位置中保留满足所有条件的行，保持输入顺序；product_mask 见 price_mask"""
+        positions = np.asarray(positions, dtype=np.intp)
+        candidates = positions[self.price_mask(product_filter.min_price, product_filter.max_price, positions,
+                                               product_mask)]
+        return self._match_text(product_filter, candidates)
+
+    def _price_positions(self, min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+        """价格索引中满足价格条件的产品位置，聚合目录按变体映射回产品"""
+        rows = self.price_index.range(min_price, max_price)
+        return rows if self.price_rows is None else np.unique(self.price_rows[rows])
+
+    def price_candidates(self, product_filter) -> np.ndarray:
+        """用价格索引取出满足价格条件的行位置，按目录顺序排列"""
+        if not (product_filter.min_price or product_filter.max_price):
+            return np.arange(self.size)
+        return self._price_positions(product_filter.min_price, product_filter.max_price)
+
+    def filter(self, product_filter, limit: Optional[int] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+        """
+        返回满足过滤条件的行位置（按原始顺序）
+
+        Args:
+            product_filter: ProductFilter 实例
+            limit: 最多返回的结果数，达到后停止扫描
+            chunk_size: 每次计算掩码的行数
+        """
+        candidates = self.price_candidates(product_filter)
+        matched = []
+        remaining = limit
+        for start in range(0, len(candidates), chunk_size):
+            positions = self._match_text(product_filter, candidates[start:start + chunk_size])
+            if remaining is not None:
+                positions = positions[:remaining]
+                remaining -= len(positions)
+            matched.append(positions)
+            if remaining is not None and remaining <= 0:
+                break
+
+        if not matched:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(matched)
@@ -0,0 +1,116 @@
+"""只读取产品页面 <head> 部分的流式 meta 提取：读到 </head> 即停止下载和解析"""
+
+from html.parser import HTMLParser
+from typing import Iterable, Optional, Tuple
+import codecs
+import logging
+
+from ..utils.http_client import PooledHTTPClient
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 页面没有 </head> 时最多读取的字节数
+HEAD_MAX_BYTES = 512 * 1024
+HEAD_CHUNK_SIZE = 16 * 1024
+
+
+class HeadMetaParser(HTMLParser):
+    """轻量的 HTML 分词器，只收集 <title> 和 <meta name="description">
+
+    遇到 </head> 或 <body> 时把 done 置为 True，之后的内容无需再传入。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.description = ''
+        self.done = False
+        self._title_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        # 同一个文本块中 </head> 之后的内容忽略
+        if self.done:
+            return
+        if tag == 'title' and self.title is None:
+            self._title_parts = []
+        elif tag == 'meta':
+            attrs = dict(attrs)
+            if (attrs.get('name') or '').strip().lower() == 'description':
+                self.description = attrs.get('content') or ''
+        elif tag == 'body':
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == 'title' and self._title_parts is not None:
+            self.title = ''.join(self._title_parts)
+            self._title_parts = None
+        elif tag == 'head':
+            self.done = True
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+
+def parse_head_meta(chunks: Iterable[str]) -> Tuple[Optional[str], str]:
+    """
+    从页面文本块中解析标题和 meta 描述，读到 </head> 后不再消费后续的块
+
+    Returns:
+        (标题, 描述)，没有标题时为 None，没有描述时为空字符串
+    """
+    parser = HeadMetaParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.title, parser.description
+
+
+def _decoded_chunks(chunks: Iterable[bytes], encoding: Optional[str], limit: int = HEAD_MAX_BYTES) -> Iterable[str]:
+    """按编码增量解码字节块，超过 limit 字节后停止"""
+    decoder = codecs.getincrementaldecoder(encoding or 'utf-8')(errors='replace')
+    received = 0
+    for chunk in chunks:
+        received += len(chunk)
+        yield decoder.decode(chunk)
+        if received >= limit:
+            logger.debug(f"页面前 {received} 字节中没有 </head>，停止读取")
+            return
+    yield decoder.decode(b'', final=True)
+
+
+def read_head_meta(response, encoding: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """从 urllib 的响应中流式读取 <head> 并解析标题和描述"""
+    encoding = encoding or response.headers.get_content_charset()
+    chunks = iter(lambda: response.read(HEAD_CHUNK_SIZE), b'')
+    return parse_head_meta(_decoded_chunks(chunks, encoding))
+
+
+async def fetch_head_meta(client: PooledHTTPClient, url: str) -> Tuple[Optional[str], str]:
+    """
+    流式请求产品页面，只下载到 </head> 为止
+
+    Args:
+        client: 共享的 HTTP 客户端
+        url: 产品页面 URL
+
+    Returns:
+        (标题, 描述)
+    """
+    async with client.stream(url) as response:
+        response.raise_for_status()
+        parser = HeadMetaParser()
+        decoder = codecs.getincrementaldecoder(response.charset_encoding or 'utf-8')(errors='replace')
+        received = 0
+        async for chunk in response.aiter_bytes(HEAD_CHUNK_SIZE):
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or received >= HEAD_MAX_BYTES:
+                break
+        else:
+            parser.feed(decoder.decode(b'', final=True))
+    return parser.title, parser.description
@@ -0,0 +1,63 @@
+"""字符三元组（trigram）索引，用于容错的模糊匹配"""
+
+from typing import Dict, Iterable, List, Set, Tuple
+import logging
+
+import numpy as np
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 词项相似度（三元组 Jaccard 系数）的默认阈值
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+
+def trigrams(word: str) -> Set[str]:
+    """提取单词的字符三元组，首尾补空格以便短词和词首词尾也能匹配"""
+    padded = f"  {word.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """词表上的三元组倒排索引，查找与输入拼写相近的词项"""
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        构建三元组索引
+
+        Args:
+            terms: 词表，通常是全文索引中出现过的全部词项
+        """
+        self.terms: List[str] = list(terms)
+        postings: Dict[str, List[int]] = {}
+        sizes = []
+        for term_id, term in enumerate(self.terms):
+            grams = trigrams(term)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+
+        self.gram_counts = np.asarray(sizes, dtype=np.int32)
+        self.postings: Dict[str, np.ndarray] = {
+            gram: np.asarray(term_ids, dtype=np.int32) for gram, term_ids in postings.items()
+        }
+        logger.info(f"三元组索引构建完成: {len(self.terms)} 个词项, {len(self.postings)} 个三元组")
+
+    def similar(self, word: str,
+                threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> List[Tuple[str, float]]:
+        """
+        查找与 word 相似的词项，按相似度从高到低排列
+
+        只访问 word 的三元组对应的倒排表，不扫描整个词表。
+        """
+        grams = trigrams(word)
+        parts = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not parts:
+            return []
+
+        term_ids, shared = np.unique(np.concatenate(parts), return_counts=True)
+        similarity = shared / (len(grams) + self.gram_counts[term_ids] - shared)
+        keep = similarity >= threshold
+        order = np.argsort(-similarity[keep], kind='stable')
+        return [(self.terms[term_id], float(score))
+                for term_id, score in zip(term_ids[keep][order], similarity[keep][order])]
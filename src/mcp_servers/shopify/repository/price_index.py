@@ -0,0 +1,83 @@
+"""按价格排序的索引，把价格区间查询转换为二分查找切片"""
+
+from decimal import Decimal
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def decimal_prices(texts: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把十进制价格文本转换为 float 价格和舍入方向
+
+    Args:
+        texts: 价格文本，非字符串的值视为没有价格
+
+    Returns:
+        (float64 价格数组, int8 舍入方向数组)。舍入方向为十进制原值相对 float 值的符号，
+        用于在边界上复现 Decimal 与 float 比较的结果。
+    """
+    prices = np.full(len(texts), np.nan, dtype=np.float64)
+    rounding = np.zeros(len(texts), dtype=np.int8)
+    for position, text in enumerate(texts):
+        if not isinstance(text, str):
+            continue
+        price = float(text)
+        prices[position] = price
+        exact = Decimal(text)
+        if exact != Decimal(price):
+            rounding[position] = 1 if exact > Decimal(price) else -1
+    return prices, rounding
+
+
+class PriceIndex:
+    """价格有序索引"""
+
+    def __init__(self, prices: np.ndarray, rounding: np.ndarray):
+        """
+        构建价格索引
+
+        Args:
+            prices: 按目录行顺序排列的价格，没有价格的行为 NaN
+            rounding: 十进制原值相对 float 值的舍入方向
+        """
+        priced = ~np.isnan(prices)
+        positions = np.flatnonzero(priced)
+        # 先按价格、再按舍入方向排序，相等价格内十进制原值较小的排在前面
+        order = np.lexsort((rounding[positions], prices[positions]))
+
+        self.positions = positions[order]
+        self.sorted_prices = prices[self.positions]
+        self.sorted_rounding = rounding[self.positions]
+        # 没有价格的产品总是满足价格条件
+        self.unpriced = np.flatnonzero(~priced)
+
+    def __len__(self) -> int:
+        return len(self.positions) + len(self.unpriced)
+
+    def _lower_bound(self, min_price: float) -> int:
+        """第一个价格不低于 min_price 的位置（按 Decimal 语义处理相等的边界）"""
+        start = int(np.searchsorted(self.sorted_prices, min_price, side='left'))
+        stop = int(np.searchsorted(self.sorted_prices, min_price, side='right'))
+        # 价格相等的区间内，十进制原值略小于 float 的视为低于下限
+        equal_rounding = self.sorted_rounding[start:stop]
+        return start + int(np.count_nonzero(equal_rounding < 0)) if stop > start else start
+
+    def _upper_bound(self, max_price: float) -> int:
+        """最后一个价格不高于 max_price 的位置之后（按 Decimal 语义处理相等的边界）"""
+        start = int(np.searchsorted(self.sorted_prices, max_price, side='left'))
+        stop = int(np.searchsorted(self.sorted_prices, max_price, side='right'))
+        equal_rounding = self.sorted_rounding[start:stop]
+        return stop - int(np.count_nonzero(equal_rounding > 0)) if stop > start else stop
+
+    def range(self, min_price: Optional[float], max_price: Optional[float]) -> np.ndarray:
+        """
+        返回价格在 [min_price, max_price] 内或没有价格的行位置，按目录顺序排列
+
+        与 ProductFilter.match_price 一致，值为 0 或 None 的边界视为不限制。
+        """
+        start = self._lower_bound(min_price) if min_price else 0
+        stop = self._upper_bound(max_price) if max_price else len(self.positions)
+        matched = self.positions[start:max(start, stop)]
+        return np.sort(np.concatenate([matched, self.unpriced]))
@@ -0,0 +1,211 @@
+"""产品详情提取：把 Shopify 产品 JSON 或页面中的 JSON-LD 转换为精简的结构化记录"""
+
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+import json
+import logging
+import re
+
+from bs4 import BeautifulSoup
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 记录的数据来源
+SOURCE_PRODUCT_JSON = "product_json"
+SOURCE_JSON_LD = "json_ld"
+SOURCE_HTML = "html"
+
+PRODUCT_PATH_PATTERN = re.compile(r'^(?P<prefix>.*?/products/)(?P<handle>[^/?#.]+)')
+
+
+def product_json_url(url: str) -> Optional[str]:
+    """
+    获取产品页面对应的 Shopify 产品 JSON 接口地址
+
+    /collections/x/products/<handle> 等带前缀的路径同样适用；不是产品页面时返回 None。
+    """
+    parts = urlsplit(url)
+    match = PRODUCT_PATH_PATTERN.match(parts.path)
+    if not match:
+        return None
+    path = '/products/' + match.group('handle') + '.json'
+    return urlunsplit((parts.scheme, parts.netloc, path, '', ''))
+
+
+def _price(value: Any) -> Optional[float]:
+    """把价格文本或数字转换为 float，无法解析时返回 None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(Decimal(str(value).replace(',', '')))
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def _text(html: Optional[str]) -> str:
+    """去掉 HTML 标签并合并空白"""
+    if not html:
+        return ''
+    return ' '.join(BeautifulSoup(html, "html.parser").get_text(' ').split())
+
+
+def _compact(record: Dict[str, Any]) -> Dict[str, Any]:
+    """去掉值为空的字段"""
+    return {key: value for key, value in record.items() if value not in (None, '', [], {})}
+
+
+def _promotions(variants: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """根据划线价找出正在打折的变体"""
+    promotions = []
+    for variant in variants:
+        price, compare_at = variant.get('price'), variant.get('compare_at_price')
+        if price is not None and compare_at and compare_at > price:
+            promotions.append(_compact({
+                'variant_id': variant.get('id'),
+                'title': variant.get('title'),
+                'price': price,
+                'compare_at_price': compare_at,
+                'discount_percent': round((compare_at - price) / compare_at * 100, 1),
+            }))
+    return promotions
+
+
+def _price_range(variants: List[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    prices = [variant['price'] for variant in variants if variant.get('price') is not None]
+    if not prices:
+        return None
+    return {'min': min(prices), 'max': max(prices)}
+
+
+def record_from_product_json(product: Dict[str, Any], url: str) -> Dict[str, Any]:
+    """
+    从 /products/<handle>.json 返回的产品数据生成结构化记录
+
+    Args:
+        product: 接口返回的 product 对象
+        url: 产品页面 URL
+
+    Returns:
+        只包含价格、规格、变体和优惠等字段的记录，不包含页面 HTML
+    """
+    variants = [_compact({
+        'id': variant.get('id'),
+        'title': variant.get('title'),
+        'sku': variant.get('sku'),
+        'price': _price(variant.get('price')),
+        'compare_at_price': _price(variant.get('compare_at_price')),
+        'available': variant.get('available'),
+        'inventory_quantity': variant.get('inventory_quantity'),
+    }) for variant in product.get('variants') or []]
+    tags = product.get('tags') or []
+    if isinstance(tags, str):
+        tags = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    images = product.get('images') or []
+
+    return _compact({
+        'url': url,
+        'source': SOURCE_PRODUCT_JSON,
+        'title': product.get('title'),
+        'handle': product.get('handle'),
+        'vendor': product.get('vendor'),
+        'product_type': product.get('product_type'),
+        'tags': tags,
+        'description': _text(product.get('body_html')),
+        'price': _price_range(variants),
+        'options': [{'name': option.get('name'), 'values': option.get('values') or []}
+                    for option in product.get('options') or []],
+        'variants': variants,
+        'promotions': _promotions(variants),
+        'image': images[0].get('src') if images and isinstance(images[0], dict) else None,
+    })
+
+
+def _json_ld_items(html: str) -> Iterator[Dict[str, Any]]:
+    """遍历页面中所有 JSON-LD 对象，包括 @graph 中的对象"""
+    soup = BeautifulSoup(html, "html.parser")
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            logger.debug("跳过无法解析的 JSON-LD")
+            continue
+        stack = data if isinstance(data, list) else [data]
+        for item in stack:
+            if not isinstance(item, dict):
+                continue
+            yield item
+            for nested in item.get('@graph') or []:
+                if isinstance(nested, dict):
+                    yield nested
+
+
+def _is_product(item: Dict[str, Any]) -> bool:
+    item_type = item.get('@type')
+    types = item_type if isinstance(item_type, list) else [item_type]
+    return 'Product' in types
+
+
+def record_from_json_ld(html: str, url: str) -> Optional[Dict[str, Any]]:
+    """
+    从页面嵌入的 schema.org Product JSON-LD 生成结构化记录
+
+    Returns:
+        结构化记录，页面中没有 Product 对象时返回 None
+    """
+    product = next((item for item in _json_ld_items(html) if _is_product(item)), None)
+    if product is None:
+        return None
+
+    offers = product.get('offers') or []
+    if isinstance(offers, dict):
+        offers = offers.get('offers') or [offers]
+    variants = []
+    currency = None
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+        currency = currency or offer.get('priceCurrency')
+        availability = offer.get('availability')
+        variants.append(_compact({
+            'title': offer.get('name'),
+            'sku': offer.get('sku'),
+            'price': _price(offer.get('price', offer.get('lowPrice'))),
+            'available': availability.endswith('InStock') if isinstance(availability, str) else None,
+        }))
+    brand = product.get('brand')
+    image = product.get('image')
+    if isinstance(image, list):
+        image = image[0] if image else None
+    if isinstance(image, dict):
+        image = image.get('url')
+
+    return _compact({
+        'url': url,
+        'source': SOURCE_JSON_LD,
+        'title': product.get('name'),
+        'vendor': brand.get('name') if isinstance(brand, dict) else brand,
+        'sku': product.get('sku'),
+        'description': _text(product.get('description')),
+        'price': _price_range(variants),
+        'currency': currency,
+        'variants': variants,
+        'image': image,
+    })
+
+
+def record_from_html(html: str, url: str) -> Dict[str, Any]:
+    """从产品页面生成结构化记录，优先使用 JSON-LD，没有时只返回标题和描述"""
+    record = record_from_json_ld(html, url)
+    if record is not None:
+        return record
+
+    soup = BeautifulSoup(html, "html.parser")
+    description = soup.find('meta', attrs={'name': 'description'})
+    return _compact({
+        'url': url,
+        'source': SOURCE_HTML,
+        'title': soup.title.string.strip() if soup.title and soup.title.string else None,
+        'description': description.get('content', '').strip() if description else None,
+    })
@@ -1,13 +1,28 @@
+import asyncio
 import csv
+import hashlib
+import io
 import json
+import os
+import tempfile
+import time
 import urllib.request
 import requests
 import pandas as pd
 import ssl
 import logging
+import multiprocessing
 from bs4 import BeautifulSoup
-from typing import List, Dict, Tuple, Optional
+from typing import Any, List, Dict, NamedTuple, Tuple, Optional
 from pathlib import Path
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+
+from .binary_catalog import binary_catalog_path, write_binary_catalog
+from .catalog import read_products_csv
+from .head_meta import fetch_head_meta, parse_head_meta, read_head_meta
+from .sqlite_catalog import SQLiteCatalogWriter
+from ..utils.http_client import PooledHTTPClient
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -15,8 +30,182 @@ logger = logging.getLogger(__name__)
 # 创建未验证的HTTPS上下文
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# 异步爬取的默认并发数和请求超时
+DEFAULT_CRAWL_CONCURRENCY = 8
+CRAWL_TIMEOUT_SECONDS = 30
+# products.json 每页允许的最大产品数，不传 limit 时 Shopify 只返回默认的 30 个
+LISTING_PAGE_LIMIT = 250
+
+# 爬取清单：记录上次爬取的每个产品的 updated_at、内容哈希，以及它的行在 CSV 中的位置和哈希，
+# 增量爬取时从上次的 CSV 复制未变化产品的行
+CRAWL_MANIFEST_SUFFIX = '.manifest.json'
+CRAWL_MANIFEST_VERSION = 2
+
+
+def crawl_manifest_path(output_path: str) -> str:
+    """获取与 CSV 同名的爬取清单路径"""
+    return output_path + CRAWL_MANIFEST_SUFFIX
+
+
+def product_key(product: Dict) -> str:
+    """产品在清单中的键：产品 ID，没有时使用 handle"""
+    return str(product.get('id', product['handle']))
+
+
+def product_hash(product: Dict) -> str:
+    """列表接口返回的产品数据的内容哈希"""
+    return hashlib.sha256(json.dumps(product, sort_keys=True, ensure_ascii=False,
+                                     default=str).encode('utf-8')).hexdigest()
+
+
+def encode_csv_rows(rows: List[List]) -> bytes:
+    """把 CSV 行编码为写入文件的字节"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+
+# 带变体的 CSV 中每个变体行依次写入的变体属性，对应表头 Variant ID 到 Quantity Price Breaks
+VARIANT_ATTRIBUTES = (
+    'id',
+    'product_id',
+    'title',
+    'price',
+    'sku',
+    'position',
+    'inventory_policy',
+    'compare_at_price',
+    'fulfillment_service',
+    'inventory_management',
+    'option1',
+    'option2',
+    'option3',
+    'created_at',
+    'updated_at',
+    'taxable',
+    'barcode',
+    'grams',
+    'image_id',
+    'weight',
+    'weight_unit',
+    'inventory_quantity',
+    'old_inventory_quantity',
+    'tax_code',
+    'requires_shipping',
+    'quantity_rule',
+    'price_currency',
+    'compare_at_price_currency',
+    'quantity_price_breaks',
+)
+
+
+def has_variant_attributes(variants: List[Dict]) -> bool:
+    """检查变体是否包含写入 CSV 的全部变体属性
+
+    /products.json 列表中的变体缺少库存、条码、重量等字段，只有 <handle>.json 中才有。
+    """
+    return all(key in variant for variant in variants for key in VARIANT_ATTRIBUTES)
+
+
+def merge_variants(listing: Optional[List[Dict]], detail: List[Dict]) -> List[Dict]:
+    """以列表中的变体为准，按变体 ID 补上只在 <handle>.json 中才有的字段"""
+    if not listing:
+        return detail
+    detail_by_id = {variant.get('id'): variant for variant in detail}
+    return [{**detail_by_id.get(variant.get('id'), {}), **variant} for variant in listing]
+
+
+def build_product_rows(base_url: str, with_variants: bool, product: Dict, title: str, description: str,
+                       variants_df: Optional[pd.DataFrame] = None) -> List[List]:
+    """生成一个产品的 CSV 行，带变体时每个变体一行"""
+    name = product['title']
+    product_url = base_url + '/products/' + product['handle']
+
+    body_description = BeautifulSoup(product['body_html'], "html.parser")
+    body_description = body_description.get_text()
+
+    if not with_variants:
+        return [[name, product_url, title, description, body_description]]
+
+    rows = []
+    for _, variant in variants_df.iterrows():
+        rows.append([name] + [variant.get(key, '') for key in VARIANT_ATTRIBUTES]
+                    + [product_url, title, description, body_description])
+    return rows
+
+
+def parse_product(base_url: str, with_variants: bool, product: Dict, title: str, description: str,
+                  variants: Optional[List[Dict]]) -> List[List]:
+    """解析阶段的任务：在进程池中把 body_html 转为文本并生成 CSV 行"""
+    variants_df = pd.DataFrame(variants) if variants is not None else None
+    return build_product_rows(base_url, with_variants, product, title, description, variants_df)
+
+
+def _parse_context():
+    """解析进程池的启动方式
+
+    服务进程中可能有其他线程，直接 fork 可能使子进程死锁；forkserver 只在第一次使用时启动一个
+    预先导入本模块的服务进程，之后的解析进程都从它 fork，启动开销远小于 spawn。
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class CrawlItem(NamedTuple):
+    """在流水线各阶段之间传递的产品，seq 为产品在列表中的序号"""
+    seq: int
+    last_in_page: bool
+    product: Dict
+    title: Optional[str] = None
+    description: str = ''
+    variants: Optional[List[Dict]] = None
+    rows: Optional[List[List]] = None
+    # 未变化的产品从上次的 CSV 复制的字节
+    block: Optional[bytes] = None
+
+
+class StageCounter:
+    """流水线单个阶段的吞吐统计：处理的产品数、累计耗时和输入队列的最大长度"""
+
+    def __init__(self):
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.queue_peak = 0
+
+    def observe(self, queue: asyncio.Queue) -> None:
+        """记录输入队列的长度"""
+        self.queue_peak = max(self.queue_peak, queue.qsize())
+
+    @contextmanager
+    def timing(self):
+        """统计一个产品的处理耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.busy_seconds += time.perf_counter() - start
+        self.items += 1
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'items_per_second': round(self.items / elapsed, 1) if elapsed > 0 else 0.0,
+            'queue_peak': self.queue_peak,
+        }
+
+
 class ShopifyCrawler:
-    def __init__(self, website_url: str, output_path: str, with_variants: bool = False):
+    def __init__(self, website_url: str, output_path: str, with_variants: bool = False,
+                 binary_output_path: Optional[str] = None, write_binary: bool = True,
+                 sqlite_output_path: Optional[str] = None,
+                 concurrency: int = DEFAULT_CRAWL_CONCURRENCY, incremental: bool = False,
+                 manifest_path: Optional[str] = None, page_limit: int = LISTING_PAGE_LIMIT,
+                 listing_variants: bool = True, parse_workers: Optional[int] = None,
+                 queue_size: Optional[int] = None):
         """
         初始化爬虫
         
@@ -24,38 +213,60 @@ class ShopifyCrawler:
             website_url: Shopify 商店的URL (https://shopifystore.com)
             output_path: 输出CSV文件的路径
             with_variants: 是否爬取产品变体数据
+            binary_output_path: 二进制目录的输出路径，默认与 CSV 同名、扩展名为 .catalog
+            write_binary: 是否在 CSV 之外生成可内存映射的二进制目录
+            sqlite_output_path: SQLite 目录的输出路径，设置后每爬完一页就在一个事务中写入
+            concurrency: 异步爬取时同时获取的产品数
+            incremental: 是否增量爬取：只获取新增或变化的产品，未变化的产品复用上次的行
+            manifest_path: 爬取清单的路径，默认与 CSV 同名、追加 .manifest.json
+            page_limit: 每个列表页请求的产品数
+            listing_variants: 是否使用列表数据中的变体；列表中的变体缺少字段时仍请求 <handle>.json 补全
+            parse_workers: 异步爬取时解析阶段的进程数，默认为 CPU 核数；为 0 时在事件循环中直接解析
+            queue_size: 异步爬取时各阶段之间队列的长度，默认为并发数的 4 倍，同时也是在途产品数的上限
         """
         self.base_url = website_url
         self.url = website_url + '/products.json'
         self.output_path = output_path
         self.with_variants = with_variants
+        self.binary_output_path = binary_output_path or binary_catalog_path(output_path)
+        self.write_binary = write_binary
+        self.sqlite_output_path = sqlite_output_path
+        self.concurrency = concurrency
+        self.incremental = incremental
+        self.page_limit = page_limit
+        self.listing_variants = listing_variants
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size or max(concurrency, 1) * 4
+        self.manifest_path = manifest_path or crawl_manifest_path(output_path)
+        self.stats = {'fetched': 0, 'reused': 0, 'removed': 0}
+        self.stage_stats: Dict[str, Dict[str, Any]] = {}
+        self._previous: Dict[str, Dict] = {}
+        self._manifest: Dict[str, Dict] = {}
+        self._previous_csv = None
+        self._offset = 0
         
     def get_page(self, page: int) -> List[Dict]:
         """获取指定页面的产品数据"""
         logger.info(f"获取第 {page} 页产品数据")
-        data = urllib.request.urlopen(self.url + f'?page={page}').read()
+        data = urllib.request.urlopen(self.page_url(page)).read()
         products = json.loads(data)['products']
         return products
 
+    def page_url(self, page: int) -> str:
+        """列表页的 URL，请求允许的最大页大小以减少请求数"""
+        return self.url + f'?limit={self.page_limit}&page={page}'
+
     def get_tags_from_product(self, product_url: str) -> Tuple[str, str]:
         """获取产品的标题和描述"""
         logger.info(f"获取产品标签信息: {product_url}")
-        r = urllib.request.urlopen(product_url).read()
-        soup = BeautifulSoup(r, "html.parser")
-
-        title = soup.title.string
-        description = ''
+        # 流式读取，读到 </head> 即关闭连接，不下载和解析页面正文
+        with urllib.request.urlopen(product_url) as response:
+            return read_head_meta(response)
 
-        meta = soup.find_all('meta')
-        for tag in meta:
-            if 'name' in tag.attrs.keys() and tag.attrs['name'].strip().lower() == 'description':
-                description = tag.attrs['content']
-
-        return title, description
-
-    def get_variant_attribute(self, variant: Dict, key: str, default: str = '') -> str:
-        """安全地获取variant的属性值"""
-        return variant.get(key, default)
+    @staticmethod
+    def parse_tags(html: str) -> Tuple[str, str]:
+        """从产品页面 HTML 中解析标题和 meta 描述"""
+        return parse_head_meta([html])
 
     def get_inventory_from_product(self, product_url: str) -> pd.DataFrame:
         """获取产品库存信息"""
@@ -65,89 +276,399 @@ class ShopifyCrawler:
         product_variants = pd.DataFrame(product_json['product']['variants'])
         return product_variants
 
+    def variants_from_listing(self, product: Dict) -> Optional[pd.DataFrame]:
+        """列表中的变体包含全部变体属性时直接使用，返回 None 表示需要请求 <handle>.json"""
+        variants = self._listing_variants(product)
+        if variants is not None and has_variant_attributes(variants):
+            return pd.DataFrame(variants)
+        return None
+
+    def _listing_variants(self, product: Dict) -> Optional[List[Dict]]:
+        if self.listing_variants and 'variants' in product:
+            return product['variants']
+        return None
+
+    def header(self) -> List[str]:
+        """CSV 表头"""
+        if self.with_variants:
+            return [
+                'Name', 'Variant ID', 'Product ID', 'Variant Title', 'Price', 'SKU', 
+                'Position', 'Inventory Policy', 'Compare At Price', 'Fulfillment Service',
+                'Inventory Management', 'Option1', 'Option2', 'Option3', 'Created At',
+                'Updated At', 'Taxable', 'Barcode', 'Grams', 'Image ID', 'Weight',
+                'Weight Unit', 'Inventory Quantity', 'Old Inventory Quantity',
+                'Tax Code', 'Requires Shipping', 'Quantity Rule', 'Price Currency',
+                'Compare At Price Currency', 'Quantity Price Breaks',
+                'URL', 'Meta Title', 'Meta Description', 'Product Description'
+            ]
+        return ['Name', 'URL', 'Meta Title', 'Meta Description', 'Product Description']
+
+    def product_url(self, product: Dict) -> str:
+        """产品页面 URL"""
+        return self.base_url + '/products/' + product['handle']
+
+    def product_rows(self, product: Dict, title: str, description: str,
+                     variants_df: Optional[pd.DataFrame] = None) -> List[List]:
+        """生成一个产品的 CSV 行，带变体时每个变体一行"""
+        return build_product_rows(self.base_url, self.with_variants, product, title, description, variants_df)
+
+    def _sqlite_writer(self):
+        """设置了 SQLite 输出路径时返回写入器，否则返回空的上下文"""
+        return SQLiteCatalogWriter(self.sqlite_output_path) if self.sqlite_output_path else nullcontext()
+
+    def load_manifest(self) -> Dict[str, Dict]:
+        """
+        读取上次爬取的清单
+
+        Returns:
+            产品键 -> {updated_at, hash, offset, length, rows_hash}，offset 和 length 是产品的行在 CSV 中的
+            字节范围。清单不存在、损坏，或商店、表头与本次不一致时返回空字典
+        """
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"爬取清单无法读取，将全量爬取: {e}")
+            return {}
+
+        if (manifest.get('version') != CRAWL_MANIFEST_VERSION or manifest.get('base_url') != self.base_url
+                or manifest.get('header') != self.header()):
+            logger.info("爬取清单与本次爬取的设置不一致，将全量爬取")
+            return {}
+        return manifest.get('products', {})
+
+    def save_manifest(self) -> None:
+        """原子地写入本次爬取的清单"""
+        manifest = {
+            'version': CRAWL_MANIFEST_VERSION,
+            'base_url': self.base_url,
+            'header': self.header(),
+            'products': self._manifest,
+        }
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.manifest_path)),
+                                         prefix='.manifest-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+            os.replace(temp_path, self.manifest_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _begin(self) -> None:
+        """开始一次爬取：增量模式下读取上次的清单"""
+        self._previous = self.load_manifest() if self.incremental else {}
+        self._manifest = {}
+        self.stats = {'fetched': 0, 'reused': 0, 'removed': 0}
+
+    def _reused_block(self, product: Dict) -> Optional[bytes]:
+        """产品自上次爬取后未变化时从上次的 CSV 读出它的行，否则返回 None"""
+        entry = self._previous.get(product_key(product))
+        if entry is None or entry.get('hash') != product_hash(product) or self._previous_csv is None:
+            return None
+        self._previous_csv.seek(entry['offset'])
+        block = self._previous_csv.read(entry['length'])
+        # 上次的 CSV 被改动过时不能按位置复制
+        if hashlib.sha256(block).hexdigest() != entry.get('rows_hash'):
+            logger.info(f"上次的 CSV 中的行与清单不一致，重新获取: {product_key(product)}")
+            return None
+        return block
+
+    @contextmanager
+    def _open_output(self):
+        """
+        打开本次爬取输出的 CSV 并写入表头
+
+        先写入同目录的临时文件，爬取成功后再替换原文件：增量爬取期间需要从上次的 CSV 复制行，
+        爬取失败时上次的 CSV 也保持不变。
+        """
+        Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.output_path + '.partial'
+        if self._previous and os.path.exists(self.output_path):
+            self._previous_csv = open(self.output_path, 'rb')
+        try:
+            with open(temp_path, 'wb') as f:
+                header = encode_csv_rows([self.header()])
+                f.write(header)
+                self._offset = len(header)
+                yield f
+            self._close_previous_csv()
+            os.replace(temp_path, self.output_path)
+        except BaseException:
+            self._close_previous_csv()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _close_previous_csv(self) -> None:
+        if self._previous_csv is not None:
+            self._previous_csv.close()
+            self._previous_csv = None
+
+    def _write_product(self, f, product: Dict, rows: Optional[List[List]],
+                       block: Optional[bytes] = None) -> List[List]:
+        """
+        写入一个产品的行，并在本次的清单中记录它们的位置
+
+        行写入后不再保留，清单中每个产品只有几个字段。复用的产品直接写入上次 CSV 中的字节。
+
+        Returns:
+            写入的行，用于按页写入 SQLite；没有 SQLite 输出时返回空列表，写入阶段不再积累整页的行
+        """
+        reused = block is not None
+        if reused:
+            rows = list(csv.reader(io.StringIO(block.decode('utf-8')))) if self.sqlite_output_path else []
+        else:
+            block = encode_csv_rows(rows)
+        f.write(block)
+        self._manifest[product_key(product)] = {
+            'updated_at': product.get('updated_at'),
+            'hash': product_hash(product),
+            'offset': self._offset,
+            'length': len(block),
+            'rows_hash': hashlib.sha256(block).hexdigest(),
+        }
+        self._offset += len(block)
+        self.stats['reused' if reused else 'fetched'] += 1
+        return rows if self.sqlite_output_path else []
+
+    def _finish(self) -> None:
+        # 上次存在、本次列表中没有的产品已被删除
+        self.stats['removed'] = len(self._previous.keys() - self._manifest.keys())
+        self.save_manifest()
+        logger.info(f"爬取完成，数据已保存到: {self.output_path}，获取 {self.stats['fetched']} 个产品，"
+                    f"复用 {self.stats['reused']} 个，删除 {self.stats['removed']} 个")
+
+        if self.write_binary:
+            self.write_binary_catalog()
+
     def crawl(self) -> None:
         """开始爬取产品数据"""
         logger.info("开始爬取产品数据")
+        self._begin()
         
-        # 确保输出目录存在
-        output_dir = Path(self.output_path).parent
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        with open(self.output_path, 'w', encoding='utf-8') as f:
+        with self._open_output() as f, self._sqlite_writer() as sqlite_writer:
             page = 1
-            writer = csv.writer(f)
-            
-            # 写入表头
-            if self.with_variants:
-                writer.writerow([
-                    'Name', 'Variant ID', 'Product ID', 'Variant Title', 'Price', 'SKU', 
-                    'Position', 'Inventory Policy', 'Compare At Price', 'Fulfillment Service',
-                    'Inventory Management', 'Option1', 'Option2', 'Option3', 'Created At',
-                    'Updated At', 'Taxable', 'Barcode', 'Grams', 'Image ID', 'Weight',
-                    'Weight Unit', 'Inventory Quantity', 'Old Inventory Quantity',
-                    'Tax Code', 'Requires Shipping', 'Quantity Rule', 'Price Currency',
-                    'Compare At Price Currency', 'Quantity Price Breaks',
-                    'URL', 'Meta Title', 'Meta Description', 'Product Description'
-                ])
-            else:
-                writer.writerow(['Name', 'URL', 'Meta Title', 'Meta Description', 'Product Description'])
+            header = self.header()
 
             logger.info("开始检查产品页面")
             products = self.get_page(page)
             
             while products:
+                page_rows = []
                 for product in products:
-                    name = product['title']
-                    product_url = self.base_url + '/products/' + product['handle']
-
-                    body_description = BeautifulSoup(product['body_html'], "html.parser")
-                    body_description = body_description.get_text()
-
-                    logger.info(f"爬取产品: {product_url}")
-                    title, description = self.get_tags_from_product(product_url)
-
-                    if self.with_variants:
-                        variants_df = self.get_inventory_from_product(product_url + '.json')
-                        for _, variant in variants_df.iterrows():
-                            row = [
-                                name, 
-                                self.get_variant_attribute(variant, 'id'),
-                                self.get_variant_attribute(variant, 'product_id'),
-                                self.get_variant_attribute(variant, 'title'),
-                                self.get_variant_attribute(variant, 'price'),
-                                self.get_variant_attribute(variant, 'sku'),
-                                self.get_variant_attribute(variant, 'position'),
-                                self.get_variant_attribute(variant, 'inventory_policy'),
-                                self.get_variant_attribute(variant, 'compare_at_price'),
-                                self.get_variant_attribute(variant, 'fulfillment_service'),
-                                self.get_variant_attribute(variant, 'inventory_management'),
-                                self.get_variant_attribute(variant, 'option1'),
-                                self.get_variant_attribute(variant, 'option2'),
-                                self.get_variant_attribute(variant, 'option3'),
-                                self.get_variant_attribute(variant, 'created_at'),
-                                self.get_variant_attribute(variant, 'updated_at'),
-                                self.get_variant_attribute(variant, 'taxable'),
-                                self.get_variant_attribute(variant, 'barcode'),
-                                self.get_variant_attribute(variant, 'grams'),
-                                self.get_variant_attribute(variant, 'image_id'),
-                                self.get_variant_attribute(variant, 'weight'),
-                                self.get_variant_attribute(variant, 'weight_unit'),
-                                self.get_variant_attribute(variant, 'inventory_quantity'),
-                                self.get_variant_attribute(variant, 'old_inventory_quantity'),
-                                self.get_variant_attribute(variant, 'tax_code'),
-                                self.get_variant_attribute(variant, 'requires_shipping'),
-                                self.get_variant_attribute(variant, 'quantity_rule'),
-                                self.get_variant_attribute(variant, 'price_currency'),
-                                self.get_variant_attribute(variant, 'compare_at_price_currency'),
-                                self.get_variant_attribute(variant, 'quantity_price_breaks'),
-                                product_url, title, description, body_description
-                            ]
-                            writer.writerow(row)
-                    else:
-                        row = [name, product_url, title, description, body_description]
-                        writer.writerow(row)
+                    rows = None
+                    block = self._reused_block(product)
+                    if block is None:
+                        product_url = self.product_url(product)
+                        logger.info(f"爬取产品: {product_url}")
+                        title, description = self.get_tags_from_product(product_url)
+
+                        variants_df = None
+                        if self.with_variants:
+                            variants_df = self.variants_from_listing(product)
+                            if variants_df is None:
+                                variants_df = self.get_inventory_from_product(product_url + '.json')
+                                listing = self._listing_variants(product)
+                                if listing:
+                                    variants_df = pd.DataFrame(merge_variants(listing,
+                                                                              variants_df.to_dict('records')))
+                        rows = self.product_rows(product, title, description, variants_df)
+                    page_rows.extend(self._write_product(f, product, rows, block))
+
+                if self.sqlite_output_path:
+                    sqlite_writer.write_page(header, page_rows)
                 
                 page += 1
                 products = self.get_page(page)
         
-        logger.info(f"爬取完成，数据已保存到: {self.output_path}")
+        self._finish()
+
+    async def get_page_async(self, client: PooledHTTPClient, page: int) -> List[Dict]:
+        """异步获取指定页面的产品数据"""
+        logger.info(f"获取第 {page} 页产品数据")
+        response = await client.get(self.page_url(page))
+        response.raise_for_status()
+        return response.json()['products']
+
+    async def _listing_stage(self, client: PooledHTTPClient, fetch_queue: asyncio.Queue,
+                             window: asyncio.Semaphore, counter: StageCounter) -> None:
+        """列表阶段：按顺序获取列表页，把产品逐个放入获取队列；在途产品数达到上限时暂停"""
+        page = 1
+        seq = 0
+        logger.info("开始检查产品页面")
+        with counter.timing():
+            products = await self.get_page_async(client, page)
+        while products:
+            # 先发出下一页的请求再把当前页放入队列，下一页不会因在途产品达到上限而推迟
+            next_page = asyncio.ensure_future(self.get_page_async(client, page + 1))
+            try:
+                for index, product in enumerate(products):
+                    await window.acquire()
+                    await fetch_queue.put(CrawlItem(seq, index == len(products) - 1, product))
+                    counter.observe(fetch_queue)
+                    seq += 1
+                with counter.timing():
+                    products = await next_page
+            finally:
+                # 放入队列时被取消或失败，不留下未完成的列表请求
+                next_page.cancel()
+            page += 1
+
+    async def _fetch_worker(self, client: PooledHTTPClient, fetch_queue: asyncio.Queue,
+                            parse_queue: asyncio.Queue, write_queue: asyncio.Queue,
+                            counter: StageCounter) -> None:
+        """获取阶段：请求产品页面的 <head>（和变体），未变化的产品直接交给写入阶段"""
+        while True:
+            item = await fetch_queue.get()
+            if item is None:
+                return
+
+            block = self._reused_block(item.product)
+            if block is not None:
+                await write_queue.put(item._replace(block=block))
+                continue
+
+            product_url = self.product_url(item.product)
+            listing = self._listing_variants(item.product) if self.with_variants else None
+            variants = listing if listing is not None and has_variant_attributes(listing) else None
+            with counter.timing():
+                logger.info(f"爬取产品: {product_url}")
+                if self.with_variants and variants is None:
+                    (title, description), response = await asyncio.gather(
+                        fetch_head_meta(client, product_url), client.get(product_url + '.json'))
+                    response.raise_for_status()
+                    variants = merge_variants(listing, response.json()['product']['variants'])
+                else:
+                    title, description = await fetch_head_meta(client, product_url)
+            await parse_queue.put(item._replace(title=title, description=description, variants=variants))
+            counter.observe(parse_queue)
+
+    async def _parse_worker(self, executor: Optional[Executor], parse_queue: asyncio.Queue,
+                            write_queue: asyncio.Queue, counter: StageCounter) -> None:
+        """解析阶段：把 body_html 转为文本并生成 CSV 行，有进程池时在进程池中运行"""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+
+            args = (self.base_url, self.with_variants, item.product, item.title, item.description, item.variants)
+            with counter.timing():
+                if executor is None:
+                    rows = parse_product(*args)
+                else:
+                    rows = await loop.run_in_executor(executor, parse_product, *args)
+            await write_queue.put(item._replace(rows=rows, variants=None))
+            counter.observe(write_queue)
+
+    async def _write_stage(self, f, sqlite_writer, header: List[str], write_queue: asyncio.Queue,
+                           window: asyncio.Semaphore, counter: StageCounter) -> None:
+        """写入阶段：按列表顺序写入 CSV 行，每写完一个列表页就写入 SQLite"""
+        pending: Dict[int, CrawlItem] = {}
+        next_seq = 0
+        page_rows: List[List] = []
+        while True:
+            item = await write_queue.get()
+            if item is None:
+                return
+            pending[item.seq] = item
+
+            # 先完成的产品在这里等待排在前面的产品
+            while next_seq in pending:
+                item = pending.pop(next_seq)
+                with counter.timing():
+                    page_rows.extend(self._write_product(f, item.product, item.rows, item.block))
+                    if item.last_in_page:
+                        if self.sqlite_output_path:
+                            sqlite_writer.write_page(header, page_rows)
+                        page_rows = []
+                next_seq += 1
+                window.release()
+
+    async def crawl_async(self, client: Optional[PooledHTTPClient] = None,
+                          executor: Optional[Executor] = None) -> None:
+        """
+        异步爬取产品数据
+
+        爬取分为列表、获取、解析、写入四个阶段，阶段之间通过有界队列连接：列表阶段按顺序获取列表页；
+        获取阶段由 concurrency 个任务通过共享的连接池请求产品页面；解析阶段在进程池中生成 CSV 行，
+        不占用事件循环；写入阶段按列表中的产品顺序写入，输出与 crawl() 相同。
+        在途产品数不超过 queue_size，下游变慢时上游随之暂停；行写入后即丢弃，清单中每个产品只保留
+        updated_at、哈希和行在 CSV 中的位置，内存占用不随商店规模增长。
+        各阶段的吞吐统计保存在 stage_stats 中。
+
+        Args:
+            client: 共享的 HTTP 客户端，不传时创建一个并在爬取结束后关闭
+            executor: 解析阶段使用的进程池，不传时按 parse_workers 创建一个并在爬取结束后关闭
+        """
+        parse_workers = (os.cpu_count() or 1) if self.parse_workers is None else self.parse_workers
+        logger.info(f"开始异步爬取产品数据，并发数: {self.concurrency}，解析进程数: {parse_workers}")
+        self._begin()
+        own_client = client is None
+        if own_client:
+            client = PooledHTTPClient(timeout=CRAWL_TIMEOUT_SECONDS, max_per_host=self.concurrency)
+        own_executor = executor is None and parse_workers > 0
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=_parse_context())
+        # 没有进程池时只用一个解析任务，解析在事件循环中同步完成
+        parse_tasks = max(parse_workers, 1) if executor is not None else 1
+
+        fetch_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        parse_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        window = asyncio.Semaphore(self.queue_size)
+        counters = {stage: StageCounter() for stage in ('listing', 'fetch', 'parse', 'write')}
+        tasks: List[asyncio.Future] = []
+        start = time.perf_counter()
+
+        async def listing():
+            await self._listing_stage(client, fetch_queue, window, counters['listing'])
+            for _ in range(self.concurrency):
+                await fetch_queue.put(None)
+
+        async def fetch():
+            await asyncio.gather(*[
+                self._fetch_worker(client, fetch_queue, parse_queue, write_queue, counters['fetch'])
+                for _ in range(self.concurrency)])
+            for _ in range(parse_tasks):
+                await parse_queue.put(None)
+
+        async def parse():
+            await asyncio.gather(*[
+                self._parse_worker(executor, parse_queue, write_queue, counters['parse'])
+                for _ in range(parse_tasks)])
+            await write_queue.put(None)
+
+        try:
+            with self._open_output() as f, self._sqlite_writer() as sqlite_writer:
+                header = self.header()
+                tasks = [asyncio.ensure_future(stage) for stage in (
+                    listing(), fetch(), parse(),
+                    self._write_stage(f, sqlite_writer, header, write_queue, window, counters['write']))]
+                await asyncio.gather(*tasks)
+        finally:
+            # 任一阶段失败时取消其余阶段，避免它们阻塞在队列上
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if own_client:
+                await client.aclose()
+
+        elapsed = time.perf_counter() - start
+        self.stage_stats = {stage: counter.as_dict(elapsed) for stage, counter in counters.items()}
+        logger.info(f"各阶段吞吐: {self.stage_stats}")
+        self._finish()
+
+    def write_binary_catalog(self) -> None:
+        """把已生成的 CSV 转换为二进制目录，供服务端内存映射加载"""
+        write_binary_catalog(read_products_csv(self.output_path), self.binary_output_path)
@@ -1,14 +1,28 @@
 from typing import Any, Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
-import pandas as pd
+import asyncio
+import httpx
 from decimal import Decimal
 import re
-import requests
 import os
 import json
+import time
 import logging
-from datetime import datetime, timedelta
+from functools import partial
+from datetime import datetime
 from .shopify_crawler import ShopifyCrawler
+from .catalog import (CatalogBackend, PRICE_PATTERN, RECORD_FIELDS, VARIANT_RECORD_FIELDS, decode_cursor,
+                      encode_cursor)
+from .catalog_loader import CatalogLoader, build_snapshot_from_file
+from .binary_catalog import binary_catalog_path
+from .facets import load_taxonomy
+from .product_detail import (SOURCE_HTML, SOURCE_JSON_LD, SOURCE_PRODUCT_JSON, product_json_url,
+                             record_from_html, record_from_product_json)
+from .sqlite_catalog import SQLiteCatalog, sqlite_catalog_path
+from ..utils.disk_cache import DiskCache, DiskCacheEntry
+from ..utils.helpers import generate_cache_key
+from ..utils.http_client import PooledHTTPClient
+from ..utils.lru_cache import LRUCache
 
 
 # 配置日志
@@ -23,11 +37,93 @@ mcp = FastMCP("jackery-products")
 
 # 常量
 PRODUCTS_CSV_PATH = "/Users/yexw/PycharmProjects/mcp/mcp-server/mcp-shopify-products/src/data/products.csv"
-CACHE_TTL_MINUTES = 5
+PRODUCTS_CATALOG_PATH = binary_catalog_path(PRODUCTS_CSV_PATH)
+PRODUCTS_SQLITE_PATH = sqlite_catalog_path(PRODUCTS_CSV_PATH)
+# 目录后端："memory" 在进程内存中保存快照，"sqlite" 只读打开爬虫生成的 SQLite 目录，多进程共享
+CATALOG_BACKEND = os.getenv("SHOPIFY_CATALOG_BACKEND", "memory").lower()
+CATALOG_BACKENDS = ("memory", "sqlite")
+CATALOG_CHECK_INTERVAL_SECONDS = 30
+# 紧凑模式：只保留工具需要的列，重复文本去重，适合带变体的大目录
+COMPACT_CATALOG = os.getenv("SHOPIFY_COMPACT_CATALOG", "false").lower() == "true"
+MAX_SEARCH_RESULTS = 3
+MATCH_MODES = ("exact", "fuzzy", "semantic")
+SEARCH_CACHE_SIZE = int(os.getenv("SHOPIFY_SEARCH_CACHE_SIZE", "256"))
+FACET_TAXONOMY_PATH = os.getenv("SHOPIFY_FACET_TAXONOMY_PATH")
+CACHE_ROOT = os.path.join(os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "mcp-shopify-products")
+DETAIL_CACHE_DIR = os.getenv("SHOPIFY_DETAIL_CACHE_DIR", os.path.join(CACHE_ROOT, "details"))
+# 语义检索的向量文件目录，不写在可能只读的产品数据文件旁边
+VECTOR_CACHE_DIR = os.getenv("SHOPIFY_VECTOR_CACHE_DIR", os.path.join(CACHE_ROOT, "vectors"))
+DETAIL_CACHE_MAX_BYTES = int(os.getenv("SHOPIFY_DETAIL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DETAIL_CACHE_TTL_SECONDS = float(os.getenv("SHOPIFY_DETAIL_CACHE_TTL_SECONDS", "60"))
+# 过期后仍可直接返回旧数据（同时在后台重新验证）的时长，超过后同步重新获取
+DETAIL_CACHE_STALE_SECONDS = float(os.getenv("SHOPIFY_DETAIL_CACHE_STALE_SECONDS", "3600"))
+DETAIL_MEMORY_CACHE_SIZE = 1024
+DETAIL_MEMORY_CACHE_MAX_BYTES = int(os.getenv("SHOPIFY_DETAIL_MEMORY_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+HTTP_TIMEOUT_SECONDS = 10
+DETAIL_BATCH_CONCURRENCY = int(os.getenv("SHOPIFY_DETAIL_BATCH_CONCURRENCY", "5"))
+DETAIL_BATCH_ITEM_TIMEOUT_SECONDS = float(os.getenv("SHOPIFY_DETAIL_BATCH_ITEM_TIMEOUT_SECONDS", "20"))
+MAX_DETAIL_BATCH_SIZE = 20
+HTTP_MAX_CONNECTIONS = int(os.getenv("SHOPIFY_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_PER_HOST = int(os.getenv("SHOPIFY_HTTP_MAX_PER_HOST", "4"))
+CRAWL_CONCURRENCY = int(os.getenv("SHOPIFY_CRAWL_CONCURRENCY", "8"))
+# 解析进程数，未设置时为 CPU 核数
+CRAWL_PARSE_WORKERS = int(os.environ["SHOPIFY_CRAWL_PARSE_WORKERS"]) if os.getenv("SHOPIFY_CRAWL_PARSE_WORKERS") else None
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-# 内存缓存
-_products_cache = None
-_cache_timestamp = None
+def create_catalog_loader(backend: str = CATALOG_BACKEND) -> CatalogLoader:
+    """按后端类型创建目录加载器，文件变化时在后台刷新快照"""
+    if backend == "sqlite":
+        return CatalogLoader(PRODUCTS_SQLITE_PATH,
+                             build_snapshot=lambda path, digest: SQLiteCatalog(path),
+                             check_interval=CATALOG_CHECK_INTERVAL_SECONDS)
+    if backend != "memory":
+        raise ValueError(f"不支持的目录后端: {backend}，可选: {', '.join(CATALOG_BACKENDS)}")
+    # 优先映射爬虫生成的二进制目录，不存在时读取 CSV
+    return CatalogLoader(PRODUCTS_CATALOG_PATH,
+                         build_snapshot=partial(build_snapshot_from_file, compact=COMPACT_CATALOG,
+                                                taxonomy=load_taxonomy(FACET_TAXONOMY_PATH),
+                                                vectors_dir=VECTOR_CACHE_DIR),
+                         check_interval=CATALOG_CHECK_INTERVAL_SECONDS,
+                         fallback_path=PRODUCTS_CSV_PATH)
+
+_catalog_loader = create_catalog_loader()
+
+# search_products 的结果缓存，键包含目录版本，目录更新后整体清空
+_search_cache = LRUCache(max_entries=SEARCH_CACHE_SIZE)
+_search_cache_version = None
+
+# 产品详情的磁盘缓存：按 URL 哈希寻址，压缩存储，超过总大小时按 LRU 淘汰；首次使用时才创建目录
+_detail_cache: Optional[DiskCache] = None
+
+
+def get_detail_cache() -> DiskCache:
+    """获取产品详情的磁盘缓存，首次调用时创建缓存目录并索引已有条目"""
+    global _detail_cache
+    if _detail_cache is None:
+        _detail_cache = DiskCache(DETAIL_CACHE_DIR, max_bytes=DETAIL_CACHE_MAX_BYTES)
+    return _detail_cache
+
+
+def _detail_entry_size(entry: DiskCacheEntry) -> int:
+    """按序列化后的长度估算内存中产品详情条目的大小，包含变体、图片等嵌套字段"""
+    return len(json.dumps(entry.value, ensure_ascii=False)) + 256
+
+
+# 磁盘缓存之前的内存层：保存已解析的产品详情，按字节数限制容量
+_detail_memory_cache = LRUCache(max_entries=DETAIL_MEMORY_CACHE_SIZE, max_bytes=DETAIL_MEMORY_CACHE_MAX_BYTES,
+                                sizeof=_detail_entry_size)
+
+# 共享的 HTTP 连接池：复用 keep-alive 连接，同一 URL 的并发请求合并为一次
+_http_client = PooledHTTPClient(timeout=HTTP_TIMEOUT_SECONDS, max_connections=HTTP_MAX_CONNECTIONS,
+                                max_per_host=HTTP_MAX_PER_HOST)
+
+
+def normalize_keyword(value: Optional[str]) -> Optional[str]:
+    """规范化搜索关键词：去掉首尾空白并转小写，空字符串视为未提供"""
+    if value is None or not value.strip():
+        return None
+    return value.strip().lower()
 
 class ProductFilter:
     """产品过滤器类"""
@@ -43,13 +139,21 @@ class ProductFilter:
         self.scenario = scenario
         self.description = description
 
+    def cache_key(self) -> tuple:
+        """过滤条件的规范化表示，用作查询缓存的键"""
+        return (float(self.min_price) if self.min_price else None,
+                float(self.max_price) if self.max_price else None,
+                normalize_keyword(self.category),
+                normalize_keyword(self.scenario),
+                normalize_keyword(self.description))
+
     def match_price(self, description: str) -> bool:
         """检查价格是否在范围内"""
         if not (self.min_price or self.max_price):
             return True
             
         # 从描述中提取价格
-        price_match = re.search(r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)', str(description))
+        price_match = re.search(PRICE_PATTERN, str(description))
         if not price_match:
             return True
             
@@ -96,37 +200,32 @@ class ProductFilter:
                 self.match_scenario(product_description) and
                 self.match_description(product_description))
 
-def load_products() -> pd.DataFrame:
-    """加载产品数据，使用内存缓存（缓存时间5分钟）"""
-    global _products_cache, _cache_timestamp
-    
-    current_time = datetime.now()
-    
-    # 检查缓存是否有效
-    if (_products_cache is not None and _cache_timestamp is not None and
-        current_time - _cache_timestamp < timedelta(minutes=CACHE_TTL_MINUTES)):
-        logger.info("使用内存缓存的产品数据")
-        return _products_cache
-    
-    # 缓存无效或不存在，重新加载数据
-    logger.info("从文件加载产品数据")
-    _products_cache = pd.read_csv(PRODUCTS_CSV_PATH, dtype={
-        'Name': str,
-        'URL': str,
-        'Meta Title': str,
-        'Meta Description': str,
-        'Product Description': str
-    })
-    _cache_timestamp = current_time
-    
-    return _products_cache
+def load_products() -> CatalogBackend:
+    """获取产品目录快照
+
+    文件内容变化时在后台重新加载，期间继续返回旧快照，工具调用不会等待 CSV 解析
+    （进程启动后的第一次加载除外）。返回的对象取决于 SHOPIFY_CATALOG_BACKEND：
+    内存后端为 CatalogSnapshot，SQLite 后端为 SQLiteCatalog。
+    """
+    return _catalog_loader.get()
+
+async def load_products_async() -> CatalogBackend:
+    """在工具中获取产品目录快照：首次加载尚未完成时在线程中等待，不阻塞事件循环"""
+    if _catalog_loader.snapshot is None:
+        return await asyncio.to_thread(load_products)
+    return load_products()
+
+def warm_catalog() -> None:
+    """服务启动时在后台线程中开始首次加载产品目录（解析文件、构建索引），第一次工具调用不必从头等待"""
+    _catalog_loader.refresh_in_background()
 
 @mcp.tool()
 async def search_products(category: str,
                         scenario: str,
                         min_price: Optional[float] = None,
                         max_price: Optional[float] = None,
-                        description: Optional[str] = None) -> List[Dict[str, Any]]:
+                        description: Optional[str] = None,
+                        match_mode: str = "exact") -> List[Dict[str, Any]]:
     """搜索产品
     
     Args:
@@ -135,160 +234,348 @@ async def search_products(category: str,
         min_price: 最低价格 (可选)
         max_price: 最高价格 (可选)
         description: 产品描述关键词 (可选)
+        match_mode: 匹配模式 (可选)。"exact" 为精确子串匹配（默认）；
+            "fuzzy" 容忍拼写错误（如 "solar generater"、"campng"），结果按相似度排序；
+            "semantic" 按自然语言语义匹配（如描述 "run a CPAP overnight while camping"），
+            关键词不必字面出现，结果按向量相似度排序
     
     Returns:
-        满足条件的产品列表
+        满足条件的产品列表，按相关度从高到低排序
     """
-    # 创建过滤器
+    global _search_cache_version
+
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"不支持的匹配模式: {match_mode}，可选: {', '.join(MATCH_MODES)}")
+
+    # 创建过滤器，关键词规范化后既用于匹配也用于缓存键
     product_filter = ProductFilter(
         min_price=min_price,
         max_price=max_price,
-        category=category,
-        scenario=scenario,
-        description=description
+        category=normalize_keyword(category),
+        scenario=normalize_keyword(scenario),
+        description=normalize_keyword(description)
     )
     
     # 加载产品数据
-    logger.info(f"搜索产品 - 价格范围: {min_price}-{max_price}, 类别: {category}, 场景: {scenario}, 描述关键词: {description}")
-    df = load_products()
+    logger.info(f"搜索产品 - 价格范围: {min_price}-{max_price}, 类别: {category}, 场景: {scenario}, 描述关键词: {description}, 匹配模式: {match_mode}")
+    catalog = await load_products_async()
+    if match_mode not in catalog.match_modes:
+        raise ValueError(f"当前目录后端不支持匹配模式: {match_mode}，可选: {', '.join(catalog.match_modes)}")
+
+    # 目录更新后清空结果缓存
+    if _search_cache_version != catalog.version:
+        _search_cache.clear()
+        _search_cache_version = catalog.version
+
+    cache_key = (match_mode,) + product_filter.cache_key()
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"使用缓存的搜索结果，返回 {len(cached)} 个产品")
+        return [dict(product) for product in cached]
     
-    # 应用过滤器
-    filtered_products = []
-    for _, row in df.iterrows():
-        product = row.to_dict()
-        if product_filter.match_product(product):
-            filtered_products.append({
-                'name': str(product['Name']),
-                'url': str(product['URL']),
-                'description': str(product['Product Description'])
-            })
+    # 按相关度（模糊和语义模式下按相似度）选出满足过滤条件的前几个产品
+    if match_mode == "fuzzy":
+        positions = catalog.fuzzy_search(product_filter, limit=MAX_SEARCH_RESULTS)
+    elif match_mode == "semantic":
+        positions = catalog.semantic_search(product_filter, limit=MAX_SEARCH_RESULTS)
+    else:
+        positions = catalog.search(product_filter, limit=MAX_SEARCH_RESULTS)
+    limited_products = [catalog.search_record(position) for position in positions]
+    _search_cache.put(cache_key, limited_products)
     
-    # 限制返回最多3个产品
-    limited_products = filtered_products[:3]
-    logger.info(f"找到 {len(filtered_products)} 个匹配的产品，返回前 {len(limited_products)} 个")
-    return limited_products
-
-def get_cache_path(url: str) -> str:
-    """获取缓存文件路径"""
-    # 将URL转换为文件名安全的格式
-    cache_filename = re.sub(r'[^\w]', '_', url) + '.json'
-    cache_dir = os.path.join(os.path.dirname(__file__), 'cache')
-    os.makedirs(cache_dir, exist_ok=True)
-    return os.path.join(cache_dir, cache_filename)
-
-def is_cache_valid(cache_path: str) -> bool:
+    logger.info(f"返回 {len(limited_products)} 个匹配的产品")
+    return [dict(product) for product in limited_products]
+
+@mcp.tool()
+def get_search_cache_stats() -> Dict[str, Any]:
+    """获取 search_products 结果缓存的命中统计，用于评估缓存容量
+
+    Returns:
+        包含 entries、max_entries、hits、misses、evictions 和 hit_rate 的字典
+    """
+    return _search_cache.stats()
+
+@mcp.tool()
+def get_detail_cache_stats() -> Dict[str, Any]:
+    """获取产品详情各级缓存的命中统计：内存、磁盘和网络请求
+
+    Returns:
+        memory、disk 两层缓存的统计（含 hit_rate），以及 network 中实际发出和合并的请求数
+    """
+    return {
+        "memory": _detail_memory_cache.stats(),
+        "disk": get_detail_cache().stats(),
+        "network": {"requests": _http_client.requests, "coalesced": _http_client.coalesced},
+    }
+
+# 正在后台重新验证的产品详情，键为缓存键
+_detail_revalidations: Dict[str, asyncio.Task] = {}
+
+# 保存到缓存的验证头
+VALIDATOR_HEADERS = ("etag", "last-modified")
+
+
+def is_cache_valid(entry: Optional[DiskCacheEntry]) -> bool:
     """检查缓存是否在TTL期限内"""
-    if not os.path.exists(cache_path):
-        return False
+    return entry is not None and time.time() - entry.stored_at < DETAIL_CACHE_TTL_SECONDS
+
+def is_cache_servable_stale(entry: Optional[DiskCacheEntry]) -> bool:
+    """检查过期的缓存是否仍可在后台重新验证期间直接返回"""
+    return entry is not None and time.time() - entry.stored_at < DETAIL_CACHE_TTL_SECONDS + DETAIL_CACHE_STALE_SECONDS
+
+def conditional_headers(entry: Optional[DiskCacheEntry]) -> Dict[str, str]:
+    """根据缓存的 ETag / Last-Modified 生成条件请求头"""
+    if entry is None or not entry.validators:
+        return {}
+    headers = {}
+    if "etag" in entry.validators:
+        headers["If-None-Match"] = entry.validators["etag"]
+    if "last-modified" in entry.validators:
+        headers["If-Modified-Since"] = entry.validators["last-modified"]
+    return headers
+
+def _lookup_product_detail(cache_key: str) -> Optional[DiskCacheEntry]:
+    """依次查找内存缓存和磁盘缓存，损坏的磁盘条目会被删除并视为未命中"""
+    entry = _detail_memory_cache.get(cache_key)
+    if entry is None:
+        entry = get_detail_cache().get(cache_key)
+        if entry is not None:
+            _detail_memory_cache.put(cache_key, entry)
+    return entry
+
+def _store_product_detail(cache_key: str, entry: DiskCacheEntry) -> None:
+    """把产品详情写入内存缓存和磁盘缓存，写入失败不影响本次返回"""
+    _detail_memory_cache.put(cache_key, entry)
+    try:
+        get_detail_cache().put(cache_key, entry.value, stored_at=entry.stored_at, validators=entry.validators)
+        logger.info(f"保存数据到缓存: {cache_key}")
+    except OSError as e:
+        logger.warning(f"保存缓存失败: {e}")
+
+def _response_validators(response: httpx.Response) -> Dict[str, str]:
+    """取出响应中的 ETag / Last-Modified"""
+    return {name: response.headers[name] for name in VALIDATOR_HEADERS if name in response.headers}
+
+def _store_not_modified(cache_key: str, entry: DiskCacheEntry, response: httpx.Response) -> Dict[str, Any]:
+    """内容未变化（304）时只刷新缓存时间和验证头"""
+    validators = dict(entry.validators or {})
+    validators.update(_response_validators(response))
+    _store_product_detail(cache_key, DiskCacheEntry(entry.value, time.time(), validators))
+    return entry.value
+
+async def _fetch_product_detail(url: str, cache_key: str, entry: Optional[DiskCacheEntry],
+                                include_html: bool = False) -> Dict[str, Any]:
+    """
+    获取产品详情并更新缓存
+
+    优先请求 Shopify 的 /products/<handle>.json 接口；接口不可用或需要返回页面 HTML 时
+    请求产品页面，从 JSON-LD 中提取。有缓存时带上验证头发送条件请求，内容未变化（304）时
+    只刷新缓存时间，不重新下载。
+    只有接口返回 404 或无法解析的 JSON 时才记住改用页面；其他错误（如 429、5xx）只在本次
+    改为解析页面，结果不写入缓存，下次仍先请求接口。
+    """
+    json_url = None if include_html else product_json_url(url)
+    source = entry.value.get('source') if entry is not None else None
+    cacheable = True
+    # 上次已确认接口不可用（数据来自页面）时直接请求页面
+    if json_url is not None and source not in (SOURCE_JSON_LD, SOURCE_HTML):
+        # 验证头属于上次实际请求的地址，只对同一来源发送条件请求
+        json_entry = entry if source == SOURCE_PRODUCT_JSON else None
+        # 通过共享连接池获取，不阻塞事件循环
+        response = await _http_client.get(json_url, headers=conditional_headers(json_entry) or None)
+        if response.status_code == 304 and json_entry is not None:
+            logger.info(f"产品数据未变化: {json_url}")
+            return _store_not_modified(cache_key, json_entry, response)
+        if response.status_code == 200:
+            try:
+                product_data = record_from_product_json(response.json()['product'], url)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"产品 JSON 格式不正确，改为解析产品页面: {json_url}: {e}")
+            else:
+                product_data['timestamp'] = datetime.now().isoformat()
+                _store_product_detail(cache_key, DiskCacheEntry(product_data, time.time(),
+                                                                _response_validators(response)))
+                return product_data
+        elif response.status_code == 404:
+            logger.info(f"产品 JSON 接口不可用 ({response.status_code})，改为解析产品页面: {url}")
+        else:
+            # 暂时性错误不能说明接口不可用，页面结果不缓存，避免以后一直跳过接口
+            logger.warning(f"产品 JSON 接口请求失败 ({response.status_code})，本次改为解析产品页面: {url}")
+            cacheable = False
+        entry = None
+
+    response = await _http_client.get(url, headers=conditional_headers(entry) or None)
+    if response.status_code == 304 and entry is not None:
+        logger.info(f"产品页面未变化: {url}")
+        return _store_not_modified(cache_key, entry, response)
+    response.raise_for_status()
+    html_content = response.text
     
-    # 检查文件修改时间是否在1分钟内
-    mtime = datetime.fromtimestamp(os.path.getmtime(cache_path))
-    return datetime.now() - mtime < timedelta(minutes=1)
+    # 从页面的 JSON-LD 提取产品信息，页面 HTML 只在请求时返回
+    product_data = record_from_html(html_content, url)
+    product_data['timestamp'] = datetime.now().isoformat()
+    if include_html:
+        product_data['html_content'] = html_content
+    if cacheable:
+        _store_product_detail(cache_key, DiskCacheEntry(product_data, time.time(), _response_validators(response)))
+    return product_data
+
+async def _revalidate_product_detail(url: str, cache_key: str, entry: DiskCacheEntry,
+                                     include_html: bool = False) -> None:
+    """后台重新验证过期的产品详情，失败时保留旧缓存"""
+    try:
+        await _fetch_product_detail(url, cache_key, entry, include_html)
+    except Exception as e:
+        logger.warning(f"后台重新验证产品详情失败: {url}: {e}")
+    finally:
+        _detail_revalidations.pop(cache_key, None)
 
 @mcp.tool()
-async def get_single_product_detail(url: str) -> Dict[str, Any]:
+async def get_single_product_detail(url: str, include_html: bool = False) -> Dict[str, Any]:
     """获取指定URL的产品详情
     1. 获取具体的产品的价格，规格，优惠卷，SKU等信息。
-    2. 当需要对比不同的商品的时候， 分别获取不同的商品详情来对比。
+    2. 当需要对比不同的商品的时候，使用 get_product_details_batch 一次获取多个商品详情来对比。
     
     Args:
         url: 产品页面URL
+        include_html: 是否同时返回完整的页面 HTML (html_content)，默认只返回结构化字段
     
     Returns:
-        包含产品详细信息的字典
+        包含产品详细信息的字典：title、description、price（价格区间）、options、
+        variants（变体的价格、SKU、库存状态）、promotions（划线价优惠）等
     """
     logger.info(f"获取产品详情: {url}")
-    cache_path = get_cache_path(url)
+    cache_key = generate_cache_key(url, {'include_html': True} if include_html else None)
     
-    # 检查缓存是否有效
-    if is_cache_valid(cache_path):
-        try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                logger.info(f"使用缓存数据: {cache_path}")
-                return json.load(f)
-        except:
-            pass
+    entry = _lookup_product_detail(cache_key)
+    if is_cache_valid(entry):
+        logger.info(f"使用缓存数据: {cache_key}")
+        return dict(entry.value)
+    
+    # 过期不久的缓存直接返回，同时在后台发送条件请求重新验证
+    if is_cache_servable_stale(entry):
+        if cache_key not in _detail_revalidations:
+            _detail_revalidations[cache_key] = asyncio.ensure_future(
+                _revalidate_product_detail(url, cache_key, entry, include_html))
+        logger.info(f"使用过期缓存数据并在后台重新验证: {cache_key}")
+        return dict(entry.value)
     
     try:
-        # 发送HTTP请求获取页面内容
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        html_content = response.text
-        
-        # 提取产品信息
-        # 这里使用简单的数据结构存储,实际使用时可能需要更复杂的解析逻辑
-        product_data = {
-            'url': url,
-            'html_content': html_content,
-            'timestamp': datetime.now().isoformat(),
-        }
-        
-        # 保存到缓存
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            logger.info(f"保存数据到缓存: {cache_path}")
-            json.dump(product_data, f, ensure_ascii=False, indent=2)
-        
-        return product_data
-        
+        return dict(await _fetch_product_detail(url, cache_key, entry, include_html))
     except Exception as e:
         error_msg = f"获取产品详情失败: {str(e)}"
         logger.error(error_msg)
         return {"error": error_msg}
 
+async def _timed_product_detail(url: str, include_html: bool, semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+    """在并发限制内获取单个产品详情，记录耗时，超时或失败只影响这一项"""
+    start = time.perf_counter()
+    async with semaphore:
+        try:
+            detail = await asyncio.wait_for(get_single_product_detail(url, include_html),
+                                            timeout=DETAIL_BATCH_ITEM_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            detail = {"error": f"获取产品详情超时 ({DETAIL_BATCH_ITEM_TIMEOUT_SECONDS:g} 秒)"}
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    if "error" in detail:
+        return {"url": url, "ok": False, "error": detail["error"], "elapsed_ms": elapsed_ms}
+    return {"url": url, "ok": True, "detail": detail, "elapsed_ms": elapsed_ms}
+
 @mcp.tool()
-async def get_all_products() -> List[Dict[str, Any]]:
-    """获取所有产品数据
+async def get_product_details_batch(urls: List[str], include_html: bool = False) -> Dict[str, Any]:
+    """批量获取多个产品的详情，用于对比商品
+    
+    未缓存的产品并发获取（并发数由 SHOPIFY_DETAIL_BATCH_CONCURRENCY 配置），
+    单个产品失败或超时不影响其他产品。
+    
+    Args:
+        urls: 产品页面URL列表，最多 20 个
+        include_html: 是否同时返回完整的页面 HTML
     
     Returns:
-        所有产品的列表，每个产品包含名称、URL、描述、价格和类别信息
+        包含 results 和 elapsed_ms（总耗时，毫秒）的字典。results 与 urls 顺序一致，每一项包含
+        url、ok、elapsed_ms，成功时包含 detail（与 get_single_product_detail 的返回相同），失败时包含 error
     """
-    logger.info("获取所有产品数据")
-    df = load_products()
+    logger.info(f"批量获取产品详情: {len(urls)} 个")
+    if len(urls) > MAX_DETAIL_BATCH_SIZE:
+        error_msg = f"一次最多获取 {MAX_DETAIL_BATCH_SIZE} 个产品详情，实际为 {len(urls)} 个"
+        logger.error(error_msg)
+        return {"error": error_msg}
+
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(DETAIL_BATCH_CONCURRENCY)
+    results = await asyncio.gather(*[_timed_product_detail(url, include_html, semaphore) for url in urls])
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"批量获取产品详情完成: {sum(result['ok'] for result in results)}/{len(urls)} 成功, "
+                f"耗时 {elapsed_ms} ms")
+    return {"results": list(results), "elapsed_ms": elapsed_ms}
+
+@mcp.tool()
+async def get_all_products(limit: int = DEFAULT_PAGE_SIZE,
+                           cursor: Optional[str] = None,
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """分页获取所有产品数据
     
-    products = []
-    for _, row in df.iterrows():
-        description = str(row['Product Description'])
-        
-        # 提取价格
-        price = None
-        price_match = re.search(r'\$(\d+(?:,\d{3})*(?:\.\d{2})?)', description)
-        if price_match:
-            try:
-                price = float(price_match.group(1).replace(',', ''))
-            except:
-                pass
-        
-        # 从名称中提取类别
-        name = str(row['Name'])
-        category = None
-        if "Solar Generator" in name:
-            category = "Solar Generator"
-        elif "Battery Pack" in name or "Power Station" in name:
-            category = "Battery Pack"
-        elif "Solar Panel" in name:
-            category = "Solar Panel"
-        
-        products.append({
-            'name': name,
-            'url': str(row['URL']),
-            'description': description,
-            'price': price,
-            'category': category
-        })
+    Args:
+        limit: 每页返回的产品数量 (默认 50，最多 200)
+        cursor: 上一页返回的 next_cursor，不传时从第一页开始
+        fields: 需要返回的字段，可选 name、url、description、price、category，默认返回这五个字段。
+            只需要名称和价格时传 ["name", "price"] 可以大幅减少返回数据量。
+            带变体的目录按产品聚合，还可以请求 min_price、max_price、total_inventory、
+            variant_count 和 variants（变体列表，只在请求时展开）
     
-    logger.info(f"总共返回 {len(products)} 个产品")
-    return products
+    Returns:
+        包含 products（当前页产品列表）、next_cursor（下一页游标，没有更多数据时为 None）
+        和 total（产品总数）的字典
+    """
+    logger.info(f"获取所有产品数据 - limit: {limit}, cursor: {cursor}, fields: {fields}")
+    catalog = await load_products_async()
+
+    fields = list(fields) if fields else list(RECORD_FIELDS)
+    available_fields = RECORD_FIELDS + VARIANT_RECORD_FIELDS
+    unknown_fields = [field for field in fields if field not in available_fields]
+    if unknown_fields:
+        error_msg = f"不支持的字段: {', '.join(unknown_fields)}，可选字段: {', '.join(available_fields)}"
+        logger.error(error_msg)
+        return {"error": error_msg}
+
+    offset = 0
+    if cursor:
+        try:
+            version, offset = decode_cursor(cursor)
+        except ValueError as e:
+            logger.error(str(e))
+            return {"error": str(e)}
+        if version != catalog.version:
+            error_msg = "产品数据已更新，请不带 cursor 重新开始分页"
+            logger.error(error_msg)
+            return {"error": error_msg}
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    products = catalog.page(offset, limit, fields)
+    next_offset = offset + len(products)
+    next_cursor = encode_cursor(catalog.version, next_offset) if next_offset < len(catalog) else None
+
+    logger.info(f"返回第 {offset + 1}-{next_offset} 个产品，共 {len(catalog)} 个")
+    return {
+        'products': products,
+        'next_cursor': next_cursor,
+        'total': len(catalog)
+    }
 
 # @mcp.tool()
-async def crawl_all_products(website_url: str, with_variants: bool = False) -> Dict[str, Any]:
+async def crawl_all_products(website_url: str, with_variants: bool = False,
+                             incremental: bool = False) -> Dict[str, Any]:
     """重新爬取所有产品数据
     
     Args:
         website_url: Shopify 商店的URL (https://shopifystore.com)
         with_variants: 是否爬取产品变体数据
+        incremental: 是否增量爬取：只获取上次爬取后新增或变化的产品，删除已下架的产品
     
     Returns:
-        包含爬取结果信息的字典
+        包含爬取结果信息的字典，stats 中为获取、复用和删除的产品数，stages 中为各阶段的吞吐统计
     """
     try:
         logger.info(f"开始爬取商店 {website_url} 的产品数据")
@@ -297,16 +584,22 @@ async def crawl_all_products(website_url: str, with_variants: bool = False) -> D
         crawler = ShopifyCrawler(
             website_url=website_url,
             output_path=PRODUCTS_CSV_PATH,
-            with_variants=with_variants
+            with_variants=with_variants,
+            sqlite_output_path=PRODUCTS_SQLITE_PATH if CATALOG_BACKEND == "sqlite" else None,
+            concurrency=CRAWL_CONCURRENCY,
+            incremental=incremental,
+            parse_workers=CRAWL_PARSE_WORKERS
         )
         
-        # 开始爬取
-        crawler.crawl()
+        # 开始爬取，产品页面并发获取，不阻塞事件循环
+        await crawler.crawl_async()
         
         return {
             "status": "success",
             "message": f"产品数据已成功爬取并保存到 {PRODUCTS_CSV_PATH}",
-            "output_path": PRODUCTS_CSV_PATH
+            "output_path": PRODUCTS_CSV_PATH,
+            "stats": crawler.stats,
+            "stages": crawler.stage_stats
         }
         
     except Exception as e:
@@ -319,4 +612,5 @@ async def crawl_all_products(website_url: str, with_variants: bool = False) -> D
 
 if __name__ == "__main__":
     # 初始化并运行服务器
+    warm_catalog()
     mcp.run(transport='stdio')
@@ -0,0 +1,297 @@
+"""SQLite 产品目录后端
+
+产品数据存放在一个 SQLite 文件中，服务进程以只读方式打开，多个进程共享同一份
+页缓存，不需要各自在内存中保存完整的 DataFrame。
+
+- 文本条件使用 FTS5 trigram 索引做子串匹配（与内存后端的子串语义一致）
+- 相关度排序使用 FTS5 unicode61 索引的 bm25()
+- 价格区间使用 (price, price_rounding) 上的普通索引
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+from .catalog import RECORD_FIELDS, derive_category, next_snapshot_version, parse_prices
+from .text_index import tokenize
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+SQLITE_CATALOG_SUFFIX = '.sqlite'
+
+# CSV 列名到表字段的映射，其余列以 JSON 形式保存在 extra 字段
+COLUMN_FIELDS = {
+    'Name': 'name',
+    'URL': 'url',
+    'Meta Title': 'meta_title',
+    'Meta Description': 'meta_description',
+    'Product Description': 'description',
+}
+
+# trigram 分词器只能匹配至少 3 个字符的子串，更短的关键词使用 LIKE
+TRIGRAM_MIN_LENGTH = 3
+
+SCHEMA = """
+CREATE TABLE products (
+    position INTEGER PRIMARY KEY,
+    name TEXT,
+    url TEXT,
+    meta_title TEXT,
+    meta_description TEXT,
+    description TEXT,
+    price REAL,
+    price_rounding INTEGER NOT NULL DEFAULT 0,
+    category TEXT,
+    extra TEXT
+);
+CREATE INDEX products_price ON products (price, price_rounding);
+CREATE VIRTUAL TABLE products_text USING fts5(
+    name, description, content='products', content_rowid='position', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE products_rank USING fts5(
+    name, meta_title, meta_description, description, content='products', content_rowid='position'
+);
+"""
+
+
+def sqlite_catalog_path(csv_path: str) -> str:
+    """根据 CSV 路径得到同目录下的 SQLite 目录路径"""
+    return os.path.splitext(csv_path)[0] + SQLITE_CATALOG_SUFFIX
+
+
+def _sql_value(value: Any) -> Any:
+    """把单元格的值转换为 SQLite 可以保存的值，缺失值为 NULL"""
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _phrase(keyword: str) -> str:
+    """把关键词转换为 FTS5 短语"""
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+def _like_pattern(keyword: str) -> str:
+    """把关键词转换为 LIKE 子串模式"""
+    escaped = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+class SQLiteCatalogWriter:
+    """SQLite 目录写入器
+
+    先写入同目录下的临时文件，每页数据一个事务；close() 时原子替换目标文件，
+    正在读取旧文件的服务进程不受影响。
+    """
+
+    def __init__(self, path: str):
+        """
+        创建临时数据库并建表
+
+        Args:
+            path: 目标 SQLite 文件路径
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        self._connection = sqlite3.connect(self._temp_path)
+        self._connection.executescript(SCHEMA)
+        self.rows = 0
+
+    def __enter__(self) -> "SQLiteCatalogWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write_page(self, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+        """
+        在一个事务中写入一页产品
+
+        Args:
+            columns: CSV 列名
+            rows: 与列名对应的行
+        """
+        if not rows:
+            return
+        records = [dict(zip(columns, row)) for row in rows]
+        descriptions = pd.Series([record.get('Product Description') for record in records], dtype=object)
+        prices, rounding = parse_prices(descriptions)
+
+        values = []
+        for offset, record in enumerate(records):
+            fields = {field: _sql_value(record.get(column)) for column, field in COLUMN_FIELDS.items()}
+            extra = {column: _sql_value(value) for column, value in record.items() if column not in COLUMN_FIELDS}
+            price = None if np.isnan(prices[offset]) else float(prices[offset])
+            values.append((
+                self.rows + offset, fields['name'], fields['url'], fields['meta_title'],
+                fields['meta_description'], fields['description'], price, int(rounding[offset]),
+                derive_category(str(fields['name'] or '')),
+                json.dumps(extra, ensure_ascii=False) if extra else None,
+            ))
+
+        with self._connection:
+            self._connection.executemany(
+                "INSERT INTO products (position, name, url, meta_title, meta_description, description, "
+                "price, price_rounding, category, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            self._connection.executemany(
+                "INSERT INTO products_text (rowid, name, description) VALUES (?, ?, ?)",
+                [(value[0], value[1], value[5]) for value in values])
+            self._connection.executemany(
+                "INSERT INTO products_rank (rowid, name, meta_title, meta_description, description) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(value[0], value[1], value[3], value[4], value[5]) for value in values])
+        self.rows += len(values)
+
+    def close(self) -> None:
+        """整理索引并原子替换目标文件"""
+        with self._connection:
+            self._connection.execute("INSERT INTO products_text (products_text) VALUES ('optimize')")
+            self._connection.execute("INSERT INTO products_rank (products_rank) VALUES ('optimize')")
+            self._connection.execute("ANALYZE")
+        self._connection.close()
+        os.chmod(self._temp_path, 0o644)
+        os.replace(self._temp_path, self.path)
+        logger.info(f"SQLite 产品目录已保存到: {self.path}，共 {self.rows} 行")
+
+    def abort(self) -> None:
+        """放弃写入，删除临时文件"""
+        self._connection.close()
+        os.unlink(self._temp_path)
+
+
+def write_sqlite_catalog(df: pd.DataFrame, path: str, page_size: int = 1000) -> None:
+    """把产品数据写成 SQLite 目录文件"""
+    columns = list(df.columns)
+    rows = df.astype(object).to_numpy().tolist()
+    with SQLiteCatalogWriter(path) as writer:
+        for start in range(0, len(rows), page_size):
+            writer.write_page(columns, rows[start:start + page_size])
+
+
+class SQLiteCatalog:
+    """只读的 SQLite 目录，接口与 CatalogSnapshot 一致"""
+
+    # SQLite 后端只支持精确匹配
+    match_modes = ("exact",)
+
+    def __init__(self, path: str, loaded_at: Optional[datetime] = None):
+        """
+        以只读方式打开 SQLite 目录
+
+        Args:
+            path: SQLite 文件路径
+            loaded_at: 数据加载时间
+        """
+        self.path = path
+        self.version = next_snapshot_version()
+        self.loaded_at = loaded_at or datetime.now()
+        uri = 'file:' + urllib.parse.quote(os.path.abspath(path)) + '?mode=ro'
+        self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        (self.size,) = self._query("SELECT COUNT(*) FROM products")[0]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        """执行查询，连接在线程之间共享，用锁串行化"""
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._connection.close()
+
+    def search(self, product_filter, limit: int) -> List[int]:
+        """
+        按 BM25 相关度返回满足过滤条件的前 limit 个行位置
+
+        没有词项命中的行排在最后，按目录顺序。
+        """
+        conditions: List[str] = []
+        params: List[Any] = []
+
+        match_terms = []
+        like_conditions = []
+        for columns, keyword in (('{name description}', product_filter.category),
+                                 ('description', product_filter.scenario),
+                                 ('description', product_filter.description)):
+            if not keyword:
+                continue
+            keyword = keyword.lower()
+            if len(keyword) >= TRIGRAM_MIN_LENGTH:
+                match_terms.append(f"{columns} : {_phrase(keyword)}")
+            else:
+                fields = ['p.name', 'p.description'] if columns.startswith('{') else ['p.description']
+                like_conditions.append('(' + ' OR '.join(f"{field} LIKE ? ESCAPE '\\'" for field in fields) + ')')
+                params.extend([_like_pattern(keyword)] * len(fields))
+
+        if match_terms:
+            conditions.append("p.position IN (SELECT rowid FROM products_text WHERE products_text MATCH ?)")
+            params.insert(0, ' AND '.join(match_terms))
+        conditions.extend(like_conditions)
+
+        if product_filter.min_price:
+            conditions.append("(p.price IS NULL OR p.price > ? OR (p.price = ? AND p.price_rounding >= 0))")
+            params.extend([product_filter.min_price] * 2)
+        if product_filter.max_price:
+            conditions.append("(p.price IS NULL OR p.price < ? OR (p.price = ? AND p.price_rounding <= 0))")
+            params.extend([product_filter.max_price] * 2)
+
+        query = ' '.join(value for value in (product_filter.category,
+                                             product_filter.scenario,
+                                             product_filter.description) if value)
+        rank_query = ' OR '.join(_phrase(token) for token in dict.fromkeys(tokenize(query)))
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        if rank_query:
+            sql = (f"SELECT p.position FROM products AS p "
+                   f"LEFT JOIN (SELECT rowid, bm25(products_rank) AS score FROM products_rank "
+                   f"WHERE products_rank MATCH ?) AS r ON r.rowid = p.position "
+                   f"{where} ORDER BY r.score IS NULL, r.score, p.position LIMIT ?")
+            params = [rank_query] + params + [limit]
+        else:
+            sql = f"SELECT p.position FROM products AS p {where} ORDER BY p.position LIMIT ?"
+            params = params + [limit]
+        return [position for (position,) in self._query(sql, params)]
+
+    def search_record(self, position: int) -> Dict[str, Any]:
+        """构建 search_products 返回的产品字典"""
+        name, url, description = self._query(
+            "SELECT name, url, description FROM products WHERE position = ?", (position,))[0]
+        return {'name': name, 'url': url, 'description': description}
+
+    def record(self, position: int, fields: Sequence[str] = RECORD_FIELDS) -> Dict[str, Any]:
+        """构建 get_all_products 返回的产品字典，只包含指定字段"""
+        return self.page(position, 1, fields)[0]
+
+    def page(self, offset: int, limit: int, fields: Sequence[str] = RECORD_FIELDS) -> List[Dict[str, Any]]:
+        """按目录顺序返回从 offset 开始的最多 limit 个产品字典"""
+        rows = self._query(
+            "SELECT name, url, description, price, category FROM products "
+            "WHERE position >= ? ORDER BY position LIMIT ?", (offset, limit))
+        records = [dict(zip(RECORD_FIELDS, row)) for row in rows]
+        # SQLite 后端不做变体聚合，聚合字段返回 None
+        return [{field: record.get(field) for field in fields} for record in records]
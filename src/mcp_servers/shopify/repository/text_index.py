@@ -0,0 +1,122 @@
+"""产品全文倒排索引，使用 BM25 打分"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+import heapq
+import logging
+import math
+import re
+
+import numpy as np
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 参与索引的字段
+INDEXED_FIELDS = ['Name', 'Meta Title', 'Meta Description', 'Product Description']
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text: str) -> List[str]:
+    """把文本切分为小写词项"""
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+class BM25Index:
+    """基于倒排表的 BM25 全文索引"""
+
+    def __init__(self, documents: Iterable[str], k1: float = BM25_K1, b: float = BM25_B):
+        """
+        构建倒排索引
+
+        Args:
+            documents: 按目录行顺序排列的文档文本
+            k1: 词频饱和参数
+            b: 文档长度归一化参数
+        """
+        self.k1 = k1
+        self.b = b
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        lengths = []
+        # 变体行的文本相同，每段不同的文本只分词一次
+        token_counts: Dict[str, Counter] = {}
+        for doc_id, text in enumerate(documents):
+            counts = token_counts.get(text)
+            if counts is None:
+                counts = token_counts[text] = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                postings.setdefault(term, []).append((doc_id, frequency))
+
+        self.size = len(lengths)
+        self.doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self.avg_doc_length = float(self.doc_lengths.mean()) if self.size else 0.0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.fromiter((doc for doc, _ in entries), dtype=np.int32, count=len(entries)),
+                   np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries)))
+            for term, entries in postings.items()
+        }
+        logger.info(f"全文索引构建完成: {self.size} 个文档, {len(self.postings)} 个词项")
+
+    def idf(self, term: str) -> float:
+        """计算词项的逆文档频率"""
+        entries = self.postings.get(term)
+        doc_freq = len(entries[0]) if entries else 0
+        return math.log(1 + (self.size - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def score(self, query: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        计算查询命中文档的 BM25 得分，只访问查询词项的倒排表
+
+        Returns:
+            (文档编号数组, 得分数组)，只包含得分大于 0 的文档
+        """
+        return self.score_terms({term: 1.0 for term in tokenize(query)})
+
+    def score_terms(self, weights: Dict[str, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        按词项权重计算 BM25 加权得分，用于模糊匹配时的查询扩展
+
+        Args:
+            weights: 词项到权重的映射
+
+        Returns:
+            (文档编号数组, 得分数组)
+        """
+        doc_parts = []
+        score_parts = []
+        for term, weight in weights.items():
+            if term not in self.postings:
+                continue
+            docs, frequencies = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_doc_length)
+            doc_parts.append(docs)
+            score_parts.append(weight * self.idf(term) * frequencies * (self.k1 + 1) / (frequencies + norm))
+
+        if not doc_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        return docs, scores
+
+    def ranked(self, query: str) -> Iterable[Tuple[int, float]]:
+        """按得分从高到低依次产出 (文档编号, 得分)，同分按目录顺序"""
+        docs, scores = self.score(query)
+        heap = list(zip((-scores).tolist(), docs.tolist()))
+        heapq.heapify(heap)
+        while heap:
+            negative_score, doc_id = heapq.heappop(heap)
+            yield doc_id, -negative_score
+
+    def top_k(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """返回得分最高的 k 个文档"""
+        docs, scores = self.score(query)
+        best = heapq.nsmallest(k, zip((-scores).tolist(), docs.tolist()))
+        return [(doc_id, -negative_score) for negative_score, doc_id in best]
@@ -0,0 +1,111 @@
+"""变体聚合：把带变体的目录按 Product ID 合并为产品，预先计算价格区间和总库存"""
+
+from typing import Any, Dict, List, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .price_index import decimal_prices
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 变体列表中返回的字段：CSV 列名 -> 返回字段名
+VARIANT_FIELDS = {
+    'Variant ID': 'id',
+    'Variant Title': 'title',
+    'SKU': 'sku',
+    'Price': 'price',
+    'Inventory Quantity': 'inventory_quantity',
+}
+
+PRICE_TEXT_PATTERN = r'\d+(?:\.\d+)?'
+
+
+def has_variants(df: pd.DataFrame) -> bool:
+    """判断目录是否按变体逐行保存（爬虫 with_variants=True 的输出）"""
+    return 'Product ID' in df.columns and 'Price' in df.columns
+
+
+def parse_price_column(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    解析 Price 列
+
+    数值列直接使用；文本列按十进制解析并记录舍入方向，与描述中的价格处理方式一致。
+
+    Returns:
+        (float64 价格数组, int8 舍入方向数组)，没有价格的行为 NaN
+    """
+    if values.dtype.kind in 'iuf':
+        return values.to_numpy(dtype=np.float64), np.zeros(len(values), dtype=np.int8)
+
+    codes, uniques = pd.factorize(values.astype(str).str.strip().str.replace(',', '', regex=False))
+    texts = pd.Series(uniques, dtype=object)
+    texts = texts.where(texts.str.fullmatch(PRICE_TEXT_PATTERN))
+    prices, rounding = decimal_prices(texts)
+    return prices[codes], rounding[codes]
+
+
+class VariantGroups:
+    """按 Product ID 分组的变体
+
+    产品的顺序为每个 Product ID 第一次出现的顺序，产品的文本字段取第一个变体行。
+    变体明细只在 variants() 被调用时才转换为字典。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Args:
+            df: 变体级别的产品数据，每个变体一行
+        """
+        df = df.reset_index(drop=True)
+        # 没有 Product ID 的行各自视为一个产品
+        keys = [product_id if pd.notna(product_id) else ('row', row)
+                for row, product_id in enumerate(df['Product ID'].tolist())]
+        codes, uniques = pd.factorize(pd.Series(keys, dtype=object))
+        self.size = len(uniques)
+        # 变体行 -> 产品位置
+        self.variant_products = codes.astype(np.int32)
+        # 按产品分组的变体行顺序，第 i 个产品的变体为 order[offsets[i]:offsets[i + 1]]
+        self.order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes, minlength=self.size)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.product_rows = self.order[self.offsets[:-1]]
+
+        self.prices, self.rounding = parse_price_column(df['Price'])
+        grouped_prices = self.prices[self.order]
+        with np.errstate(invalid='ignore'):
+            self.min_prices = np.fmin.reduceat(grouped_prices, self.offsets[:-1]) if self.size else grouped_prices
+            self.max_prices = np.fmax.reduceat(grouped_prices, self.offsets[:-1]) if self.size else grouped_prices
+
+        if 'Inventory Quantity' in df.columns:
+            inventory = pd.to_numeric(df['Inventory Quantity'], errors='coerce').fillna(0).to_numpy()
+            self.total_inventory = np.bincount(codes, weights=inventory, minlength=self.size).astype(np.int64)
+        else:
+            self.total_inventory = np.zeros(self.size, dtype=np.int64)
+        self.variant_counts = counts
+
+        self._variants = df[[column for column in VARIANT_FIELDS if column in df.columns]]
+        logger.info(f"变体聚合完成: {len(df)} 个变体, {self.size} 个产品")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def variants(self, position: int) -> List[Dict[str, Any]]:
+        """获取指定产品的变体列表"""
+        rows = self.order[self.offsets[position]:self.offsets[position + 1]]
+        variants = []
+        for row in rows:
+            variant = {}
+            for column, value in self._variants.iloc[row].items():
+                if column == 'Price':
+                    value = self.prices[row]
+                variant[VARIANT_FIELDS[column]] = None if pd.isna(value) else _python_value(value)
+            variants.append(variant)
+        return variants
+
+
+def _python_value(value: Any) -> Any:
+    """把 numpy 标量转换为 Python 值，便于 JSON 序列化"""
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,195 @@
+"""本地语义检索：基于特征哈希的 TF-IDF 向量索引，不依赖外部模型"""
+
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple
+import hashlib
+import logging
+import os
+import tempfile
+import zipfile
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .text_index import tokenize
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 哈希向量维度
+VECTOR_DIMENSIONS = 2048
+
+# 向量文件后缀
+VECTOR_INDEX_SUFFIX = '.vectors.npz'
+
+
+def vector_index_path(catalog_path: str, directory: Optional[str] = None) -> str:
+    """
+    根据产品数据文件路径得到向量文件路径
+
+    Args:
+        catalog_path: 产品数据文件路径
+        directory: 向量文件所在目录；为空时保存在产品数据文件旁边，否则按数据文件的
+            绝对路径哈希命名，不同目录下的同名文件互不覆盖
+    """
+    if directory is None:
+        return catalog_path + VECTOR_INDEX_SUFFIX
+    path_hash = hashlib.sha256(os.path.abspath(catalog_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, f"{os.path.basename(catalog_path)}-{path_hash}{VECTOR_INDEX_SUFFIX}")
+
+
+def text_features(text: str) -> List[str]:
+    """提取文本特征：单词和相邻词组成的二元词组"""
+    tokens = tokenize(text)
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+
+def hashed_term_frequencies(text: str, dimensions: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把文本特征哈希到固定维度，返回 (维度下标, 次线性词频)
+
+    使用 crc32 而不是内置 hash，保证不同进程得到相同的向量。
+    """
+    counts = Counter(zlib.crc32(feature.encode('utf-8')) % dimensions for feature in text_features(text))
+    columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    frequencies = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+    return columns, 1 + np.log(frequencies)
+
+
+class VectorIndex:
+    """哈希 TF-IDF 向量索引
+
+    每段不同的文本对应一行稀疏向量（已做 L2 归一化），按 CSR 格式保存为 indptr/indices/data
+    三个数组，只占用非零维度的空间；变体行通过 rows 映射共享同一个向量。
+    查询时把查询向量按 indices 取值、与 data 相乘，再按行求和得到余弦相似度。
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, data: np.ndarray, idf: np.ndarray,
+                 rows: np.ndarray):
+        """
+        Args:
+            indptr: 第 i 段文本的非零项为 indices/data[indptr[i]:indptr[i + 1]]
+            indices: 非零项的维度下标
+            data: 非零项的归一化权重（float32）
+            idf: 每个维度的逆文档频率
+            rows: 目录行位置到文本的映射
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.idf = idf
+        self.rows = rows
+        self.size = len(rows)
+        self.dimensions = len(idf)
+        self.text_count = len(indptr) - 1
+        self._nonempty = indptr[:-1] < indptr[1:]
+        self._row_starts = indptr[:-1][self._nonempty]
+
+    @property
+    def nbytes(self) -> int:
+        """索引数组占用的字节数"""
+        return sum(array.nbytes for array in (self.indptr, self.indices, self.data, self.idf, self.rows))
+
+    @classmethod
+    def build(cls, documents: Iterable[str], dimensions: int = VECTOR_DIMENSIONS) -> "VectorIndex":
+        """从按目录行顺序排列的文档文本构建索引"""
+        rows, texts = pd.factorize(pd.Series(list(documents), dtype=object))
+        occurrences = np.bincount(rows, minlength=len(texts)).astype(np.float64)
+
+        features = [hashed_term_frequencies(text, dimensions) for text in texts]
+        document_frequency = np.zeros(dimensions, dtype=np.float64)
+        for text_id, (columns, _) in enumerate(features):
+            document_frequency[columns] += occurrences[text_id]
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(columns) for columns, _ in features], out=indptr[1:])
+        index_dtype = np.uint16 if dimensions <= np.iinfo(np.uint16).max + 1 else np.int32
+        indices = np.empty(indptr[-1], dtype=index_dtype)
+        data = np.empty(indptr[-1], dtype=np.float32)
+        for text_id, (columns, frequencies) in enumerate(features):
+            order = np.argsort(columns)
+            weights = frequencies[order] * idf[columns[order]]
+            norm = np.linalg.norm(weights)
+            start, end = indptr[text_id], indptr[text_id + 1]
+            indices[start:end] = columns[order]
+            data[start:end] = weights / norm if norm > 0 else weights
+
+        logger.info(f"向量索引构建完成: {len(rows)} 行, {len(texts)} 段不同文本, {dimensions} 维, "
+                    f"{len(data)} 个非零项")
+        return cls(indptr, indices, data, idf, rows.astype(np.int32))
+
+    def query_vector(self, query: str) -> np.ndarray:
+        """把查询文本转换为归一化向量"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        columns, frequencies = hashed_term_frequencies(query, self.dimensions)
+        vector[columns] = frequencies * self.idf[columns]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def text_scores(self, query: str) -> np.ndarray:
+        """计算查询与每段文本的余弦相似度"""
+        scores = np.zeros(self.text_count, dtype=np.float32)
+        if len(self.data):
+            products = self.data * self.query_vector(query)[self.indices]
+            # reduceat 按相邻的起点分段求和；空行没有非零项，跳过以免取到下一行的值
+            scores[self._nonempty] = np.add.reduceat(products, self._row_starts)
+        return scores
+
+    def scores(self, query: str) -> np.ndarray:
+        """计算查询与每个目录行的余弦相似度"""
+        return self.text_scores(query)[self.rows]
+
+    def top_k(self, query: str, k: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        返回相似度最高的 k 个目录行，只包含相似度大于 0 的行，同分按目录顺序
+
+        Args:
+            query: 查询文本
+            k: 返回数量
+            mask: 可选的布尔掩码，只在为 True 的行中选择
+        """
+        scores = self.scores(query)
+        if mask is not None:
+            scores = np.where(mask, scores, 0)
+        positions = np.flatnonzero(scores > 0)
+        if len(positions) > k:
+            # 先按 argpartition 取出第 k 大的得分，再保留所有不低于它的行，避免同分时截断不稳定
+            threshold = scores[positions[np.argpartition(-scores[positions], k - 1)[k - 1]]]
+            positions = positions[scores[positions] >= threshold]
+        order = np.lexsort((positions, -scores[positions]))[:k]
+        return [(int(position), float(scores[position])) for position in positions[order]]
+
+    def save(self, path: str, digest: str) -> None:
+        """把索引保存到文件，digest 是产品数据文件的内容哈希"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, indptr=self.indptr, indices=self.indices, data=self.data, idf=self.idf,
+                         rows=self.rows, digest=np.array(digest))
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        logger.info(f"向量索引已保存到: {path}")
+
+    @classmethod
+    def load(cls, path: str, digest: str) -> Optional["VectorIndex"]:
+        """从文件加载索引，文件不存在、损坏或与产品数据不对应时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if str(data['digest']) != digest:
+                    logger.info(f"向量文件与产品数据不一致，需要重新构建: {path}")
+                    return None
+                index = cls(data['indptr'], data['indices'], data['data'], data['idf'], data['rows'])
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"读取向量文件失败: {str(e)}")
+            return None
+        logger.info(f"从文件加载向量索引: {path}")
+        return index
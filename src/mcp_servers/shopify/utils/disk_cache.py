@@ -0,0 +1,182 @@
+"""Size-bounded, compressed disk cache with LRU eviction."""
+
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+ENTRY_SUFFIX = '.json.z'
+
+
+class DiskCacheEntry(NamedTuple):
+    """A cached value, the time it was stored and its HTTP validators."""
+    value: Any
+    stored_at: float
+    validators: Optional[Dict[str, str]] = None
+
+
+class DiskCache:
+    """Content-addressed cache of JSON values, bounded by total bytes on disk.
+
+    Each entry is a zlib-compressed JSON file named by its key. Writes go to
+    a temporary file that is renamed into place, so readers never see a
+    partial entry. Access order is kept in memory and seeded from file
+    modification times, which are refreshed on every hit.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, compress_level: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self) -> None:
+        """Index existing entries, least recently used first."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, name[:-len(ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._sizes[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._sizes
+
+    def get(self, key: str) -> Optional[DiskCacheEntry]:
+        """Read an entry and mark it as recently used.
+
+        Unreadable or corrupt entries are removed and reported as misses.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                payload = json.loads(zlib.decompress(f.read()))
+            entry = DiskCacheEntry(payload['value'], float(payload['stored_at']),
+                                   dict(payload.get('validators') or {}))
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+        except (OSError, zlib.error, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping corrupt cache entry {path}: {e}")
+            with self._lock:
+                self.errors += 1
+                self.misses += 1
+                self._remove(key)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if key not in self._sizes:
+                # Written by another process since the directory was scanned
+                self._sizes[key] = os.path.getsize(path)
+                self._total_bytes += self._sizes[key]
+            self._sizes.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, key: str, value: Any, stored_at: Optional[float] = None,
+            validators: Optional[Dict[str, str]] = None) -> None:
+        """Atomically write an entry, evicting least recently used entries if over budget.
+
+        ``validators`` holds response headers such as ETag and Last-Modified
+        used to revalidate the entry once it expires.
+        """
+        payload = {'stored_at': time.time() if stored_at is None else stored_at, 'value': value,
+                   'validators': validators or {}}
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode('utf-8'), self.compress_level)
+        if len(data) > self.max_bytes:
+            logger.warning(f"Cache entry {key} ({len(data)} bytes) exceeds the cache size, not stored")
+            return
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._forget(key)
+            self._sizes[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        with self._lock:
+            self._remove(key)
+
+    def clear(self) -> None:
+        """Remove all entries, keeping the counters."""
+        with self._lock:
+            for key in list(self._sizes):
+                self._remove(key)
+
+    def _forget(self, key: str) -> None:
+        self._total_bytes -= self._sizes.pop(key, 0)
+
+    def _remove(self, key: str) -> None:
+        self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._sizes:
+            key = next(iter(self._sizes))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._sizes),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,118 @@
+"""Shared async HTTP client with per-host limits and request coalescing."""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+import asyncio
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class PooledHTTPClient:
+    """Keep-alive connection pool shared by all tool calls.
+
+    Concurrent GETs for the same URL share one in-flight request, and each
+    host gets at most ``max_per_host`` requests at a time so a burst of
+    calls does not hammer a single store.
+    """
+
+    def __init__(self, timeout: float = 10.0, max_connections: int = 100,
+                 max_keepalive_connections: int = 20, max_per_host: int = 4,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.max_per_host = max_per_host
+        self.transport = transport
+        self.requests = 0
+        self.coalesced = 0
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def _ensure_client(self) -> httpx.AsyncClient:
+        """Create the client on first use, or again if the event loop changed."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            stale, stale_loop = self._client, self._loop
+            # Swap before awaiting so concurrent callers share the new client
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits,
+                                             follow_redirects=True, transport=self.transport)
+            self._loop = loop
+            self._host_limits = {}
+            self._in_flight = {}
+            if stale is not None:
+                await self._close_stale(stale, stale_loop)
+        return self._client
+
+    @staticmethod
+    async def _close_stale(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        """Close a client created on an event loop that is no longer current."""
+        if loop.is_running():
+            # The old loop still runs in another thread, so its connections are closed there
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            return
+        try:
+            await client.aclose()
+        except RuntimeError as e:
+            # Connections bound to a closed loop cannot be shut down gracefully;
+            # the pool is marked closed and its sockets are released with the client
+            logger.debug(f"Dropped client from a closed event loop: {e}")
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent requests to the URL's host."""
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]]) -> httpx.Response:
+        client = await self._ensure_client()
+        async with self._host_limit(url):
+            self.requests += 1
+            return await client.get(url, headers=headers)
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a URL, joining an identical request that is already in flight.
+
+        Requests are identical when both the URL and the headers match, so
+        conditional requests never share a response with plain ones.
+        """
+        await self._ensure_client()
+        key = (url, tuple(sorted((headers or {}).items())))
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            logger.debug(f"Joining in-flight request: {url}")
+        else:
+            future = asyncio.ensure_future(self._fetch(url, headers))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one caller being cancelled does not cancel the shared fetch
+        return await asyncio.shield(future)
+
+    @asynccontextmanager
+    async def stream(self, url: str) -> AsyncIterator[httpx.Response]:
+        """Stream a GET response within the host limit.
+
+        Streams are not coalesced: callers read the body incrementally and
+        may stop early, which closes the connection instead of reading the
+        rest of the body.
+        """
+        client = await self._ensure_client()
+        async with self._host_limit(url):
+            self.requests += 1
+            async with client.stream('GET', url) as response:
+                yield response
+
+    async def aclose(self) -> None:
+        """Close the underlying connection pool."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
@@ -0,0 +1,88 @@
+"""Bounded LRU cache with hit/miss counters."""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import sys
+import threading
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and, optionally, bytes.
+
+    With ``max_bytes`` set, each value is measured once with ``sizeof`` when
+    stored and entries are evicted until the total fits the budget.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: Optional[int] = None,
+                 sizeof: Callable[[Any], int] = sys.getsizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Get a value and mark it as recently used."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        if self.max_entries <= 0:
+            return
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            self._total_bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries or (
+                    self.max_bytes is not None and self._total_bytes > self.max_bytes):
+                evicted, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Optional[Any] = None) -> Optional[Any]:
+        """Remove an entry and return its value."""
+        with self._lock:
+            self._total_bytes -= self._sizes.pop(key, 0)
+            return self._entries.pop(key, default)
+
+    def clear(self) -> None:
+        """Drop all entries, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,171 @@
+"""Tests for the memory-mappable binary catalog format."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+
+from mcp_servers.shopify.repository.binary_catalog import (
+    MappedTextArray,
+    MappedTextDtype,
+    binary_catalog_path,
+    read_binary_catalog,
+    write_binary_catalog,
+)
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.shopify_crawler import ShopifyCrawler
+
+
+@pytest.fixture
+def products_df():
+    """Build a catalog with text, numeric and missing values."""
+    return pd.DataFrame({
+        'Name': ['Solar Generator 2000 v2（100 Mini）', 'Explorer 1000', 'Cable'],
+        'Price': [1999.0, 799.5, np.nan],
+        'Inventory Quantity': np.array([5, 0, 12], dtype=np.int64),
+        'Taxable': [True, False, True],
+        'URL': ['https://a', 'https://b', 'https://c'],
+        'Product Description': ['Portable ⚡ power, "quoted", multi\nline', np.nan, ''],
+    })
+
+
+def materialize(df):
+    """Decode the mapped text columns into ordinary object columns."""
+    return df.astype({name: object for name, dtype in df.dtypes.items() if isinstance(dtype, MappedTextDtype)})
+
+
+class TestBinaryCatalog:
+    """Test writing and mapping binary catalogs."""
+
+    def test_binary_catalog_path(self):
+        """Test the binary catalog sits next to the CSV."""
+        assert binary_catalog_path('/data/products.csv') == '/data/products.catalog'
+
+    def test_round_trip(self, products_df, tmp_path):
+        """Test values and dtypes survive a round trip."""
+        path = str(tmp_path / 'products.catalog')
+        write_binary_catalog(products_df, path)
+
+        pd.testing.assert_frame_equal(materialize(read_binary_catalog(path)), products_df)
+
+    def test_numeric_columns_are_mapped(self, products_df, tmp_path):
+        """Test numeric columns are read-only views over the mapping."""
+        path = str(tmp_path / 'products.catalog')
+        write_binary_catalog(products_df, path)
+
+        prices = read_binary_catalog(path)['Price'].to_numpy()
+        assert not prices.flags.writeable
+        assert not prices.flags.owndata
+
+    def test_text_columns_are_not_decoded_at_load(self, products_df, tmp_path):
+        """Test text cells are decoded from the mapping only when accessed."""
+        path = str(tmp_path / 'products.catalog')
+        write_binary_catalog(products_df, path)
+
+        with patch.object(MappedTextArray, '_decode', autospec=True,
+                          side_effect=MappedTextArray._decode) as decode:
+            df = read_binary_catalog(path)
+            assert isinstance(df['Name'].dtype, MappedTextDtype)
+            assert decode.call_count == 0
+
+            assert df['Name'].iat[1] == 'Explorer 1000'
+            assert decode.call_count == 1
+
+        # Only offsets and null flags are held; the text stays in the mapping
+        assert df['Product Description'].array.nbytes == 3 * (8 + 8 + 1)
+
+    def test_row_subsets_share_the_mapping(self, products_df, tmp_path):
+        """Test taking rows keeps pointing into the mapped text."""
+        path = str(tmp_path / 'products.catalog')
+        write_binary_catalog(products_df, path)
+        names = read_binary_catalog(path)['Product Description']
+
+        subset = names.iloc[[2, 1, 0]]
+        assert subset.array._buffer is names.array._buffer
+        assert subset.tolist() == ['', np.nan, 'Portable ⚡ power, "quoted", multi\nline']
+        assert subset.fillna('nan').tolist()[1] == 'nan'
+
+    def test_empty_catalog(self, products_df, tmp_path):
+        """Test an empty catalog round trips."""
+        path = str(tmp_path / 'empty.catalog')
+        write_binary_catalog(products_df.iloc[0:0], path)
+
+        df = read_binary_catalog(path)
+        assert len(df) == 0
+        assert list(df.columns) == list(products_df.columns)
+
+    def test_invalid_file(self, tmp_path):
+        """Test files without the magic header are rejected."""
+        path = tmp_path / 'products.catalog'
+        path.write_bytes(b'Name,URL\n')
+
+        with pytest.raises(ValueError):
+            read_binary_catalog(str(path))
+
+    def test_rewrite_keeps_existing_mapping(self, products_df, tmp_path):
+        """Test replacing the file does not disturb a mapped reader."""
+        path = str(tmp_path / 'products.catalog')
+        write_binary_catalog(products_df, path)
+        mapped = read_binary_catalog(path)
+
+        write_binary_catalog(products_df.iloc[:1], path)
+
+        assert mapped['Price'].tolist()[:2] == [1999.0, 799.5]
+        assert len(read_binary_catalog(path)) == 1
+
+
+class TestLoaderWithBinaryCatalog:
+    """Test the loader prefers the binary catalog."""
+
+    def test_falls_back_to_csv(self, products_df, tmp_path):
+        """Test the CSV is used until a binary catalog exists."""
+        csv_path = str(tmp_path / 'products.csv')
+        products_df.to_csv(csv_path, index=False)
+        loader = CatalogLoader(binary_catalog_path(csv_path), fallback_path=csv_path)
+
+        assert loader.get() is not None
+        assert loader.fingerprint.path == csv_path
+
+        write_binary_catalog(products_df.iloc[:2], binary_catalog_path(csv_path))
+        assert loader.refresh() is True
+        assert loader.fingerprint.path == binary_catalog_path(csv_path)
+        assert len(loader.get()) == 2
+
+
+    def test_newer_csv_wins(self, products_df, tmp_path):
+        """Test an edited CSV is loaded instead of an older binary catalog."""
+        csv_path = str(tmp_path / 'products.csv')
+        products_df.to_csv(csv_path, index=False)
+        write_binary_catalog(products_df.iloc[:2], binary_catalog_path(csv_path))
+        os.utime(csv_path, ns=(1_000_000_000, 1_000_000_000))
+        os.utime(binary_catalog_path(csv_path), ns=(2_000_000_000, 2_000_000_000))
+        loader = CatalogLoader(binary_catalog_path(csv_path), fallback_path=csv_path, check_interval=0)
+
+        assert len(loader.get()) == 2
+        assert loader.fingerprint.path == binary_catalog_path(csv_path)
+
+        products_df.to_csv(csv_path, index=False)
+        os.utime(csv_path, ns=(3_000_000_000, 3_000_000_000))
+        assert loader.refresh() is True
+        assert loader.fingerprint.path == csv_path
+        assert len(loader.get()) == 3
+
+
+class TestCrawlerBinaryOutput:
+    """Test the crawler writes the binary catalog next to the CSV."""
+
+    def test_crawl_writes_binary_catalog(self, tmp_path):
+        """Test crawl() emits both CSV and binary catalog."""
+        csv_path = str(tmp_path / 'products.csv')
+        crawler = ShopifyCrawler('https://store.example.com', csv_path)
+        listing = [{'title': 'Explorer 1000', 'handle': 'explorer-1000', 'body_html': '<p>Only $799</p>'}]
+
+        with patch.object(crawler, 'get_page', side_effect=[listing, []]), \
+                patch.object(crawler, 'get_tags_from_product', return_value=('Explorer', 'Meta')):
+            crawler.crawl()
+
+        df = read_binary_catalog(binary_catalog_path(csv_path))
+        pd.testing.assert_frame_equal(materialize(df), pd.read_csv(csv_path, dtype=str))
+        assert df['URL'].tolist() == ['https://store.example.com/products/explorer-1000']
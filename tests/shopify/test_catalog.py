@@ -0,0 +1,219 @@
+"""Tests for the normalized catalog snapshot."""
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import (
+    CatalogSnapshot,
+    compact_frame,
+    decode_cursor,
+    derive_category,
+    encode_cursor,
+    parse_prices,
+)
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+
+
+@pytest.fixture
+def snapshot():
+    """Build a small catalog snapshot."""
+    return CatalogSnapshot(pd.DataFrame({
+        'Name': ['Solar Generator 1000', 'Explorer Power Station', 'Solar Panel 100W', 'Cable'],
+        'URL': ['u1', 'u2', 'u3', 'u4'],
+        'Product Description': ['Now $1,099.00 for camping', 'Only $499', float('nan'), 'no price'],
+    }))
+
+
+class TestParsePrices:
+    """Test batch price extraction."""
+
+    def test_parse_prices(self):
+        """Test prices, missing prices and thousands separators."""
+        prices, rounding = parse_prices(pd.Series(['Only $1,299.99 today', 'no price', None, '$5']))
+
+        assert prices[0] == 1299.99
+        assert pd.isna(prices[1]) and pd.isna(prices[2])
+        assert prices[3] == 5.0
+        assert rounding[3] == 0
+
+
+class TestDeriveCategory:
+    """Test category derivation from product names."""
+
+    @pytest.mark.parametrize('name, expected', [
+        ('Jackery Solar Generator 2000', 'Solar Generator'),
+        ('Battery Pack 5000 Plus', 'Battery Pack'),
+        ('Explorer 3000 Portable Power Station', 'Battery Pack'),
+        ('SolarSaga Solar Panel', 'Solar Panel'),
+        ('Extended Warranty', None),
+    ])
+    def test_derive_category(self, name, expected):
+        """Test the first matching rule wins."""
+        assert derive_category(name) == expected
+
+
+class TestCatalogSnapshot:
+    """Test CatalogSnapshot class."""
+
+    def test_derived_fields(self, snapshot):
+        """Test price and category are computed at build time."""
+        assert len(snapshot) == 4
+        assert snapshot.price_at(0) == 1099.0
+        assert snapshot.price_at(2) is None
+        assert snapshot.categories == ['Solar Generator', 'Battery Pack', 'Solar Panel', None]
+        assert snapshot.description_lower.iat[0] == 'now $1,099.00 for camping'
+
+    def test_record_matches_legacy_format(self, snapshot):
+        """Test records keep the get_all_products output format."""
+        assert snapshot.record(1) == {
+            'name': 'Explorer Power Station',
+            'url': 'u2',
+            'description': 'Only $499',
+            'price': 499.0,
+            'category': 'Battery Pack'
+        }
+        assert snapshot.record(2)['description'] == 'nan'
+
+    def test_record_projection(self, snapshot):
+        """Test only requested fields are built."""
+        assert snapshot.record(0, ['name', 'price']) == {'name': 'Solar Generator 1000', 'price': 1099.0}
+
+    def test_page(self, snapshot):
+        """Test pages slice the catalog in order."""
+        assert [record['url'] for record in snapshot.page(1, 2)] == ['u2', 'u3']
+        assert [record['url'] for record in snapshot.page(3, 10)] == ['u4']
+        assert snapshot.page(4, 10) == []
+
+    def test_versions_increase(self, snapshot):
+        """Test each snapshot gets a new version."""
+        newer = CatalogSnapshot(snapshot.df)
+        assert newer.version > snapshot.version
+
+
+@pytest.fixture
+def variants_df():
+    """Build a with-variants catalog where product text repeats per variant."""
+    rows = []
+    for product in range(3):
+        for variant in range(4):
+            rows.append({
+                'Name': f'Solar Generator {product}',
+                'Variant ID': product * 10 + variant,
+                'Product ID': product,
+                'Variant Title': f'Option {product}-{variant}',
+                'Price': 100.0 * (product + 1),
+                'Inventory Quantity': variant,
+                'Grams': 1000,
+                'URL': f'https://store/products/{product}',
+                'Meta Title': f'Meta {product}',
+                'Meta Description': 'meta description',
+                'Product Description': f'Product {product} for camping, only ${100 * (product + 1)}',
+            })
+    return pd.DataFrame(rows)
+
+
+class TestCompactCatalog:
+    """Test the compact catalog mode."""
+
+    def test_compact_frame_keeps_needed_columns(self, variants_df):
+        """Test unread columns are dropped and repeated text is categorical."""
+        df = compact_frame(variants_df)
+
+        assert 'Meta Title' not in df.columns and 'Grams' not in df.columns
+        assert isinstance(df['Name'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['Product Description'].dtype, pd.CategoricalDtype)
+        assert df['Variant Title'].dtype == object
+        assert df['Inventory Quantity'].dtype.itemsize == 1
+        assert df['Price'].dtype == 'float64'
+
+    def test_compact_uses_less_memory(self, variants_df):
+        """Test the compact frame is smaller than the full frame."""
+        full = variants_df.memory_usage(deep=True).sum()
+        assert compact_frame(variants_df).memory_usage(deep=True).sum() < full / 2
+
+    def test_compact_snapshot_matches_full_snapshot(self, variants_df):
+        """Test compact mode changes memory layout, not results."""
+        full = CatalogSnapshot(variants_df)
+        compact = CatalogSnapshot(variants_df, compact=True)
+        product_filter = shopify_products.ProductFilter(category='solar', scenario='camping', max_price=250)
+
+        assert compact.page(0, len(full)) == full.page(0, len(full))
+        assert compact.search(product_filter, 3) == full.search(product_filter, 3)
+        assert compact.filter_engine.filter(product_filter).tolist() == \
+            full.filter_engine.filter(product_filter).tolist()
+
+    def test_lowercase_text_is_shared_across_variants(self, variants_df):
+        """Test variant rows share one lowercase string per product."""
+        snapshot = CatalogSnapshot(variants_df, compact=True, aggregate_variants=False)
+        assert snapshot.description_lower.iat[0] is snapshot.description_lower.iat[3]
+
+
+class TestCursor:
+    """Test pagination cursors."""
+
+    def test_round_trip(self):
+        """Test a cursor decodes to its version and offset."""
+        assert decode_cursor(encode_cursor(7, 150)) == (7, 150)
+
+    @pytest.mark.parametrize('cursor', ['not-a-cursor', encode_cursor(1, 0)[:-2] + '!!', 'LTE6LTE='])
+    def test_invalid_cursor(self, cursor):
+        """Test malformed cursors are rejected."""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+class TestGetAllProducts:
+    """Test get_all_products on top of the snapshot."""
+
+    @pytest.fixture
+    def use_snapshot(self, snapshot, monkeypatch, tmp_path):
+        """Serve the snapshot through the module loader."""
+        csv_path = tmp_path / 'products.csv'
+        csv_path.write_text('')
+        monkeypatch.setattr(shopify_products, '_catalog_loader',
+                            CatalogLoader(str(csv_path), build_snapshot=lambda path, digest: snapshot))
+        return snapshot
+
+    @pytest.mark.asyncio
+    async def test_first_page(self, use_snapshot):
+        """Test the first page includes all fields and a cursor."""
+        result = await shopify_products.get_all_products(limit=2)
+
+        assert result['total'] == 4
+        assert [product['price'] for product in result['products']] == [1099.0, 499.0]
+        assert set(result['products'][0]) == {'name', 'url', 'description', 'price', 'category'}
+        assert result['next_cursor'] == encode_cursor(use_snapshot.version, 2)
+
+    @pytest.mark.asyncio
+    async def test_follow_cursor_to_the_end(self, use_snapshot):
+        """Test following cursors visits every product exactly once."""
+        urls = []
+        cursor = None
+        while True:
+            result = await shopify_products.get_all_products(limit=3, cursor=cursor, fields=['url'])
+            urls.extend(product['url'] for product in result['products'])
+            cursor = result['next_cursor']
+            if cursor is None:
+                break
+
+        assert urls == ['u1', 'u2', 'u3', 'u4']
+
+    @pytest.mark.asyncio
+    async def test_limit_is_clamped(self, use_snapshot, monkeypatch):
+        """Test oversized pages are capped."""
+        monkeypatch.setattr(shopify_products, 'MAX_PAGE_SIZE', 1)
+        result = await shopify_products.get_all_products(limit=1000)
+        assert len(result['products']) == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_field(self, use_snapshot):
+        """Test unknown fields are reported."""
+        result = await shopify_products.get_all_products(fields=['name', 'html'])
+        assert 'html' in result['error']
+
+    @pytest.mark.asyncio
+    async def test_stale_cursor(self, use_snapshot):
+        """Test cursors from an older snapshot are rejected."""
+        result = await shopify_products.get_all_products(cursor=encode_cursor(use_snapshot.version - 1, 2))
+        assert 'error' in result
@@ -0,0 +1,163 @@
+"""Tests for the change-aware catalog loader."""
+
+import os
+import threading
+
+import pytest
+
+from mcp_servers.shopify.repository import catalog_loader, shopify_products
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+
+
+HEADER = 'Name,URL,Meta Title,Meta Description,Product Description\n'
+
+
+def write_catalog(path, rows, mtime_ns=None):
+    """Write a small products CSV."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for name in rows:
+            f.write(f'{name},https://example.com/{name},,,{name} for camping\n')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    """Create a products CSV with two rows."""
+    path = str(tmp_path / 'products.csv')
+    write_catalog(path, ['A', 'B'], mtime_ns=1_000_000_000)
+    return path
+
+
+@pytest.fixture
+def counting_loader(csv_path):
+    """Create a loader that counts CSV parses."""
+    loader = CatalogLoader(csv_path, check_interval=0)
+    loader.parses = 0
+    build = loader.build_snapshot
+
+    def counting_build(path, digest):
+        loader.parses += 1
+        return build(path, digest)
+
+    loader.build_snapshot = counting_build
+    return loader
+
+
+class TestCatalogLoader:
+    """Test CatalogLoader class."""
+
+    def test_first_load_is_synchronous(self, counting_loader):
+        """Test the first call returns a loaded snapshot."""
+        snapshot = counting_loader.get()
+
+        assert len(snapshot) == 2
+        assert counting_loader.parses == 1
+        assert counting_loader.fingerprint.size == os.path.getsize(counting_loader.path)
+
+    def test_unchanged_file_is_not_reparsed(self, counting_loader):
+        """Test an unchanged file only costs a stat."""
+        first = counting_loader.get()
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(catalog_loader, 'hash_file', lambda path: pytest.fail('file should not be hashed'))
+            assert counting_loader.refresh() is False
+
+        assert counting_loader.get() is first
+        counting_loader.wait_for_refresh()
+        assert counting_loader.parses == 1
+
+    def test_load_hashes_file_once(self, counting_loader, monkeypatch):
+        """Test the digest computed by refresh is reused when building the snapshot."""
+        hashed = []
+        hash_file = catalog_loader.hash_file
+
+        def counting_hash(path):
+            hashed.append(path)
+            return hash_file(path)
+
+        monkeypatch.setattr(catalog_loader, 'hash_file', counting_hash)
+        counting_loader.get()
+
+        assert hashed == [counting_loader.path]
+
+    def test_touched_file_with_same_content_is_not_reparsed(self, counting_loader):
+        """Test a new mtime with identical content is detected by hash."""
+        counting_loader.get()
+        os.utime(counting_loader.path, ns=(2_000_000_000, 2_000_000_000))
+
+        assert counting_loader.refresh() is False
+        assert counting_loader.parses == 1
+        assert counting_loader.fingerprint.mtime_ns == 2_000_000_000
+
+    def test_changed_file_is_swapped_in_background(self, counting_loader):
+        """Test a changed file is reloaded while the old snapshot is served."""
+        first = counting_loader.get()
+        write_catalog(counting_loader.path, ['A', 'B', 'C'], mtime_ns=3_000_000_000)
+
+        assert counting_loader.get() is first
+        counting_loader.wait_for_refresh()
+
+        second = counting_loader.get()
+        assert second is not first
+        assert len(second) == 3
+        assert second.version > first.version
+        assert counting_loader.parses == 2
+
+    def test_failed_refresh_keeps_old_snapshot(self, counting_loader):
+        """Test parse errors keep serving the previous snapshot."""
+        first = counting_loader.get()
+        counting_loader.build_snapshot = lambda path, digest: (_ for _ in ()).throw(ValueError('bad csv'))
+        write_catalog(counting_loader.path, ['A'], mtime_ns=4_000_000_000)
+
+        counting_loader.refresh_in_background()
+        counting_loader.wait_for_refresh()
+
+        assert counting_loader.get() is first
+        assert counting_loader.fingerprint.mtime_ns == 1_000_000_000
+
+    def test_refresh_respects_check_interval(self, csv_path):
+        """Test no refresh is started inside the check interval."""
+        loader = CatalogLoader(csv_path, check_interval=3600)
+        loader.get()
+        write_catalog(csv_path, ['A', 'B', 'C'], mtime_ns=5_000_000_000)
+
+        loader.get()
+        assert loader._refresh_thread is None
+        assert len(loader.get()) == 2
+
+
+class TestStartupLoad:
+    """Test the first catalog load stays off the event loop."""
+
+    @pytest.fixture
+    def threads(self, csv_path, monkeypatch):
+        """Install a loader that records which thread builds the snapshot."""
+        threads = []
+        loader = CatalogLoader(csv_path, check_interval=3600)
+        build = loader.build_snapshot
+
+        def recording_build(path, digest):
+            threads.append(threading.get_ident())
+            return build(path, digest)
+
+        loader.build_snapshot = recording_build
+        monkeypatch.setattr(shopify_products, '_catalog_loader', loader)
+        return threads
+
+    def test_warm_catalog_loads_in_background(self, threads):
+        """Test warming at startup builds the first snapshot in a background thread."""
+        shopify_products.warm_catalog()
+        shopify_products._catalog_loader.wait_for_refresh()
+
+        assert threads and threads[0] != threading.get_ident()
+        assert len(shopify_products.load_products()) == 2
+
+    @pytest.mark.asyncio
+    async def test_first_tool_call_loads_in_thread(self, threads):
+        """Test a tool call before the catalog is loaded waits in a worker thread."""
+        result = await shopify_products.get_all_products(limit=1, fields=['name'])
+
+        assert result['total'] == 2
+        assert threads and threads[0] != threading.get_ident()
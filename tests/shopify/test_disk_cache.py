@@ -0,0 +1,267 @@
+"""Tests for the disk cache and the product detail cache."""
+
+import asyncio
+import json
+import os
+import time
+import zlib
+
+import httpx
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.utils.disk_cache import ENTRY_SUFFIX, DiskCache, DiskCacheEntry
+from mcp_servers.shopify.utils.http_client import PooledHTTPClient
+from mcp_servers.shopify.utils.lru_cache import LRUCache
+
+
+class TestDiskCache:
+    """Test DiskCache class."""
+
+    def test_put_and_get(self, tmp_path):
+        """Test entries round-trip compressed under their key."""
+        cache = DiskCache(str(tmp_path))
+        cache.put('abc', {'html_content': '<html>' * 100}, stored_at=123.0)
+
+        entry = cache.get('abc')
+        assert entry.value == {'html_content': '<html>' * 100}
+        assert entry.stored_at == 123.0
+        assert os.listdir(tmp_path) == ['abc' + ENTRY_SUFFIX]
+        assert os.path.getsize(tmp_path / ('abc' + ENTRY_SUFFIX)) < 600
+        assert cache.get('missing') is None
+        assert cache.stats()['hit_rate'] == 0.5
+
+    def test_entry_without_validators(self):
+        """Test entries default to no validators and send no conditional headers."""
+        first = DiskCacheEntry({}, 1.0)
+        second = DiskCacheEntry({}, 2.0)
+
+        assert first.validators is None
+        assert shopify_products.conditional_headers(first) == {}
+        assert shopify_products.conditional_headers(second) == {}
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test the total size stays within the budget."""
+        cache = DiskCache(str(tmp_path), compress_level=0)
+        cache.put('a', 'x' * 20, stored_at=1.0)
+        cache.max_bytes = cache.stats()['bytes'] * 2
+        cache.put('b', 'y' * 20, stored_at=1.0)
+        cache.get('a')
+        cache.put('c', 'z' * 20, stored_at=1.0)
+
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
+        assert not (tmp_path / ('b' + ENTRY_SUFFIX)).exists()
+        assert cache.stats()['bytes'] <= cache.max_bytes
+        assert cache.stats()['evictions'] == 1
+
+    def test_oversized_entry_not_stored(self, tmp_path):
+        """Test an entry larger than the whole cache is skipped."""
+        cache = DiskCache(str(tmp_path), max_bytes=10)
+        cache.put('a', 'x' * 100)
+        assert len(cache) == 0
+
+    def test_scan_existing_entries(self, tmp_path):
+        """Test a new instance picks up entries in modification order."""
+        cache = DiskCache(str(tmp_path), compress_level=0)
+        cache.put('old', 'x' * 20)
+        cache.put('new', 'y' * 20)
+        os.utime(tmp_path / ('old' + ENTRY_SUFFIX), (1, 1))
+        size = cache.stats()['bytes']
+
+        reopened = DiskCache(str(tmp_path), max_bytes=size - 1)
+        assert 'new' in reopened and 'old' not in reopened
+
+    def test_corrupt_entry_is_dropped(self, tmp_path):
+        """Test a damaged entry is removed and reported as a miss."""
+        cache = DiskCache(str(tmp_path))
+        cache.put('a', 'value')
+        (tmp_path / ('a' + ENTRY_SUFFIX)).write_bytes(zlib.compress(b'{"value": ')[:-3])
+
+        assert cache.get('a') is None
+        assert 'a' not in cache
+        assert not (tmp_path / ('a' + ENTRY_SUFFIX)).exists()
+        assert cache.stats()['errors'] == 1
+
+    def test_failed_write_leaves_no_partial_entry(self, tmp_path, monkeypatch):
+        """Test a write that fails before the rename keeps the previous entry."""
+        cache = DiskCache(str(tmp_path))
+        cache.put('a', 'old')
+
+        def failing_replace(source, target):
+            raise OSError('disk full')
+
+        monkeypatch.setattr(os, 'replace', failing_replace)
+        with pytest.raises(OSError):
+            cache.put('a', 'new')
+
+        assert cache.get('a').value == 'old'
+        assert os.listdir(tmp_path) == ['a' + ENTRY_SUFFIX]
+
+
+class TestProductDetailCache:
+    """Test get_single_product_detail caching."""
+
+    @pytest.fixture
+    def calls(self, monkeypatch, tmp_path):
+        """Serve product pages from a mock transport with a temporary cache."""
+        calls = []
+
+        def handler(request):
+            calls.append(str(request.url))
+            return httpx.Response(200, json={'product': {'title': 'Explorer', 'variants': [{'price': '999.00'}]}})
+
+        monkeypatch.setattr(shopify_products, '_http_client',
+                            PooledHTTPClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(max_bytes=1024 * 1024,
+                                                                                sizeof=shopify_products._detail_entry_size))
+        return calls
+
+    def test_entry_size_counts_nested_fields(self):
+        """Test memory entries are sized from the whole value, not only top-level strings."""
+        flat = DiskCacheEntry({'title': 'Explorer'}, 1.0)
+        nested = DiskCacheEntry({'title': 'Explorer', 'variants': [{'title': 'Black ' * 500}]}, 1.0)
+
+        assert shopify_products._detail_entry_size(nested) - shopify_products._detail_entry_size(flat) > 3000
+
+    def test_cache_directory_created_on_first_use(self, monkeypatch, tmp_path):
+        """Test the detail cache directory is only created when the cache is first used."""
+        directory = tmp_path / 'details'
+        monkeypatch.setattr(shopify_products, 'DETAIL_CACHE_DIR', str(directory))
+        monkeypatch.setattr(shopify_products, '_detail_cache', None)
+        assert not directory.exists()
+
+        cache = shopify_products.get_detail_cache()
+
+        assert directory.is_dir()
+        assert shopify_products.get_detail_cache() is cache
+
+    @pytest.mark.asyncio
+    async def test_cached_within_ttl(self, calls):
+        """Test a second call within the TTL is served from the cache."""
+        url = 'https://store.example.com/products/explorer'
+        first = await shopify_products.get_single_product_detail(url)
+        second = await shopify_products.get_single_product_detail(url)
+
+        assert first == second
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_fetched_again(self, calls):
+        """Test entries past the TTL and the stale window are refreshed before returning."""
+        url = 'https://store.example.com/products/explorer'
+        shopify_products._detail_cache.put(
+            shopify_products.generate_cache_key(url), {'url': url, 'html_content': 'old'},
+            stored_at=time.time() - shopify_products.DETAIL_CACHE_TTL_SECONDS
+            - shopify_products.DETAIL_CACHE_STALE_SECONDS - 1)
+
+        result = await shopify_products.get_single_product_detail(url)
+
+        assert result['title'] == 'Explorer'
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_tiers_report_hit_rates(self, calls):
+        """Test lookups fall through memory, then disk, then the network."""
+        url = 'https://store.example.com/products/explorer'
+        await shopify_products.get_single_product_detail(url)
+        await shopify_products.get_single_product_detail(url)
+        shopify_products._detail_memory_cache.clear()
+        await shopify_products.get_single_product_detail(url)
+
+        stats = shopify_products.get_detail_cache_stats()
+        assert stats['memory']['hits'] == 1 and stats['memory']['misses'] == 2
+        assert stats['disk']['hits'] == 1 and stats['disk']['misses'] == 1
+        assert stats['network']['requests'] == 1
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_stats_exposed_as_tool(self, calls):
+        """Test operators can read the tier hit rates through the MCP server."""
+        await shopify_products.get_single_product_detail('https://store.example.com/products/explorer')
+
+        content, _ = await shopify_products.mcp.call_tool('get_detail_cache_stats', {})
+
+        stats = json.loads(content[0].text)
+        assert stats['memory']['misses'] == 1
+        assert stats['network']['requests'] == 1
+
+
+class TestProductDetailRevalidation:
+    """Test conditional revalidation of product details."""
+
+    URL = 'https://store.example.com/products/explorer'
+
+    @pytest.fixture
+    def requests(self, monkeypatch, tmp_path):
+        """Serve a product page that honours ETag and If-None-Match."""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304, headers={'ETag': '"v1"'})
+            return httpx.Response(200, json={'product': {'title': 'Explorer v1'}},
+                                  headers={'ETag': '"v1"', 'Last-Modified': 'Wed, 01 Oct 2025 00:00:00 GMT'})
+
+        monkeypatch.setattr(shopify_products, '_http_client',
+                            PooledHTTPClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(max_bytes=1024 * 1024,
+                                                                                sizeof=shopify_products._detail_entry_size))
+        return requests
+
+    def expire(self, seconds):
+        """Age the cached entry by the given number of seconds."""
+        key = shopify_products.generate_cache_key(self.URL)
+        entry = shopify_products._detail_cache.get(key)
+        shopify_products._detail_memory_cache.clear()
+        shopify_products._detail_cache.put(key, entry.value, stored_at=entry.stored_at - seconds,
+                                           validators=entry.validators)
+
+    @pytest.mark.asyncio
+    async def test_validators_are_stored(self, requests):
+        """Test ETag and Last-Modified are saved with the entry."""
+        await shopify_products.get_single_product_detail(self.URL)
+
+        entry = shopify_products._detail_cache.get(shopify_products.generate_cache_key(self.URL))
+        assert entry.validators == {'etag': '"v1"', 'last-modified': 'Wed, 01 Oct 2025 00:00:00 GMT'}
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_revalidating(self, requests):
+        """Test a stale entry is returned at once and revalidated with a 304."""
+        first = await shopify_products.get_single_product_detail(self.URL)
+        self.expire(shopify_products.DETAIL_CACHE_TTL_SECONDS + 1)
+
+        stale = await shopify_products.get_single_product_detail(self.URL)
+        assert stale == first
+        await asyncio.gather(*shopify_products._detail_revalidations.values())
+
+        assert len(requests) == 2
+        assert requests[1].headers['If-None-Match'] == '"v1"'
+        assert requests[1].headers['If-Modified-Since'] == 'Wed, 01 Oct 2025 00:00:00 GMT'
+        entry = shopify_products._detail_cache.get(shopify_products.generate_cache_key(self.URL))
+        assert shopify_products.is_cache_valid(entry)
+        assert entry.value == first
+
+    @pytest.mark.asyncio
+    async def test_one_revalidation_per_entry(self, requests):
+        """Test concurrent stale reads start a single background request."""
+        await shopify_products.get_single_product_detail(self.URL)
+        self.expire(shopify_products.DETAIL_CACHE_TTL_SECONDS + 1)
+
+        await asyncio.gather(*[shopify_products.get_single_product_detail(self.URL) for _ in range(3)])
+        await asyncio.gather(*shopify_products._detail_revalidations.values())
+
+        assert len(requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_not_modified_on_synchronous_refresh(self, requests):
+        """Test a 304 past the stale window returns the cached body."""
+        first = await shopify_products.get_single_product_detail(self.URL)
+        self.expire(shopify_products.DETAIL_CACHE_TTL_SECONDS + shopify_products.DETAIL_CACHE_STALE_SECONDS + 1)
+
+        assert await shopify_products.get_single_product_detail(self.URL) == first
+        assert len(requests) == 2
+        assert not shopify_products._detail_revalidations
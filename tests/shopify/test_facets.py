@@ -0,0 +1,150 @@
+"""Tests for facet tag bitsets."""
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot, read_products_csv
+from mcp_servers.shopify.repository.facets import DEFAULT_TAXONOMY, FacetIndex, load_taxonomy
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+
+DATA_CSV_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'mcp_servers', 'shopify', 'data',
+                             'products.csv')
+
+
+@pytest.fixture
+def df():
+    """Build a small product table."""
+    return pd.DataFrame({
+        'Name': ['Solar Generator 1000', 'Explorer Power Station', 'Solar Panel 100W',
+                 'Battery Pack', 'Solar Generator 2000'],
+        'URL': ['u1', 'u2', 'u3', 'u4', 'u5'],
+        'Product Description': ['$999 for camping', '$499 keeps the lights on in an outage',
+                                '$199 for camping', '$299 for home backup', float('nan')],
+    })
+
+
+class TestLoadTaxonomy:
+    """Test taxonomy loading."""
+
+    def test_default(self):
+        """Test the default table is used without a path."""
+        assert load_taxonomy(None) is DEFAULT_TAXONOMY
+
+    def test_from_file(self, tmp_path):
+        """Test tags and keywords are lowercased."""
+        path = tmp_path / 'taxonomy.json'
+        path.write_text(json.dumps({'scenario': {'Fishing': ['Boat', 'kayak']}}))
+
+        assert load_taxonomy(str(path)) == {'scenario': {'fishing': ['boat', 'kayak']}}
+
+    def test_unknown_facet(self, tmp_path):
+        """Test unknown facets are rejected."""
+        path = tmp_path / 'taxonomy.json'
+        path.write_text(json.dumps({'color': {'red': []}}))
+
+        with pytest.raises(ValueError):
+            load_taxonomy(str(path))
+
+
+class TestFacetIndex:
+    """Test FacetIndex class."""
+
+    @pytest.fixture
+    def facets(self, df):
+        """Build facets from the default taxonomy."""
+        return CatalogSnapshot(df).facets
+
+    def test_bitsets(self, facets):
+        """Test tags are set on matching rows only."""
+        assert facets.positions(facets.bitsets['scenario']['camping']).tolist() == [0, 2]
+        assert facets.positions(facets.bitsets['category']['solar generator']).tolist() == [0, 4]
+
+    def test_synonyms_resolve_to_tag(self, facets):
+        """Test synonyms share the bitset of their tag."""
+        assert facets.resolve('scenario', 'Outage') == 'home backup'
+        assert facets.positions(facets.bits('scenario', 'outage')).tolist() == [1, 3]
+        assert facets.bits('scenario', 'fishing') is None
+
+    def test_test_bits(self, facets):
+        """Test bit lookups for arbitrary positions."""
+        bits = facets.bitsets['category']['battery pack']
+        assert facets.test(bits, np.array([0, 1, 3, 4])).tolist() == [False, True, True, False]
+
+    def test_tags(self, facets):
+        """Test the tags of a single row."""
+        assert facets.tags(1) == {'category': ['battery pack'], 'scenario': ['home backup']}
+
+    def test_keywords_match_whole_words(self):
+        """Test short keywords do not match inside longer words."""
+        column = pd.Series(['full rv hookup', 'customer service', 'reserve power', 'rv.', 'rvs', 'off-grid cabin'])
+        facets = FacetIndex(len(column), {'name': column, 'description': column})
+
+        assert facets.positions(facets.bits('scenario', 'motorhome')).tolist() == [0, 3, 4]
+        assert facets.positions(facets.bits('scenario', 'off grid')).tolist() == [5]
+
+    def test_keywords_match_plurals(self):
+        """Test plural product text still matches singular keywords."""
+        column = pd.Series(['two solar panels', 'rvs and campers', 'solar generators', 'batteries', 'rvsx'])
+        facets = FacetIndex(len(column), {'name': column, 'description': column})
+
+        assert facets.positions(facets.bits('category', 'solar panel')).tolist() == [0]
+        assert facets.positions(facets.bits('scenario', 'motorhome')).tolist() == [1]
+        assert facets.positions(facets.bits('category', 'solar generator')).tolist() == [2]
+
+    def test_many_rows(self):
+        """Test packed bitsets past the first byte."""
+        column = pd.Series(['camping' if i % 3 == 0 else 'home' for i in range(20)])
+        facets = FacetIndex(20, {'name': column, 'description': column})
+
+        assert facets.positions(facets.bitsets['scenario']['camping']).tolist() == list(range(0, 20, 3))
+
+
+class TestFacetFiltering:
+    """Test filtering through facet bitsets."""
+
+    def test_category_and_scenario(self, df):
+        """Test category and scenario tags are combined."""
+        snapshot = CatalogSnapshot(df)
+        positions = snapshot.filter_engine.filter(ProductFilter(category='battery pack', scenario='outage'))
+        assert positions.tolist() == [1, 3]
+
+    def test_unknown_keyword_falls_back_to_substring(self, df):
+        """Test keywords outside the taxonomy still match as substrings."""
+        snapshot = CatalogSnapshot(df)
+        positions = snapshot.filter_engine.filter(ProductFilter(category='explorer', scenario='lights'))
+        assert positions.tolist() == [1]
+
+    def test_custom_taxonomy(self, df):
+        """Test a custom table replaces the default tags."""
+        snapshot = CatalogSnapshot(df, taxonomy={'scenario': {'camping': ['camping', 'outage']}})
+
+        positions = snapshot.filter_engine.filter(ProductFilter(category='solar', scenario='camping'))
+        assert positions.tolist() == [0, 2]
+        positions = snapshot.filter_engine.filter(ProductFilter(scenario='camping'))
+        assert positions.tolist() == [0, 1, 2]
+
+    def test_matches_substring_scan_without_synonyms(self, df):
+        """Test tags without synonyms give the same rows as a text scan."""
+        tagged = CatalogSnapshot(df, taxonomy={'category': {'solar': []}, 'scenario': {'camping': []}})
+        untagged = CatalogSnapshot(df, taxonomy={})
+        product_filter = ProductFilter(category='solar', scenario='camping')
+
+        assert (tagged.filter_engine.filter(product_filter).tolist() ==
+                untagged.filter_engine.filter(product_filter).tolist() == [0, 2])
+
+    def test_scenario_excludes_substring_matches_in_catalog(self):
+        """Test scenario tags on the bundled catalog ignore words that merely contain the keyword."""
+        snapshot = CatalogSnapshot(read_products_csv(DATA_CSV_PATH))
+        product_filter = ProductFilter(category='jackery', scenario='motorhome')
+        names = [snapshot.names.iat[position] for position in snapshot.filter_engine.filter(product_filter)]
+
+        assert names
+        assert 'Jackery AC Adapter Set' not in names
+        assert 'AC Adapter & Car Charger Set' not in names
+        assert all(re.search(r'\b(rv|motorhome|campervan)(e?s)?\b', snapshot.description_lower.iat[position])
+                   for position in snapshot.filter_engine.filter(product_filter))
@@ -0,0 +1,114 @@
+"""Tests for the vectorized product filter engine."""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.filter_engine import ProductFilterEngine
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+
+
+DATA_CSV_PATH = os.path.join(
+    os.path.dirname(shopify_products.__file__), '..', 'data', 'products.csv'
+)
+
+FILTER_CASES = [
+    {},
+    {'category': 'Solar Generator', 'scenario': 'camping'},
+    {'category': 'explorer', 'scenario': 'home', 'min_price': 500},
+    {'category': 'Battery', 'scenario': 'backup', 'max_price': 1000},
+    {'category': 'jackery', 'scenario': 'power', 'min_price': 100, 'max_price': 3000},
+    {'category': 'solar', 'scenario': 'outdoor', 'description': 'portable'},
+    {'category': 'nothing-like-this', 'scenario': 'camping'},
+]
+
+
+@pytest.fixture
+def products_df():
+    """Load the bundled catalog the same way load_products does."""
+    return pd.read_csv(DATA_CSV_PATH, dtype={
+        'Name': str,
+        'URL': str,
+        'Meta Title': str,
+        'Meta Description': str,
+        'Product Description': str
+    })
+
+
+class TestProductFilterEngine:
+    """Test ProductFilterEngine class."""
+
+    @pytest.mark.parametrize('criteria', FILTER_CASES)
+    def test_matches_row_by_row_filter(self, products_df, criteria):
+        """Test the engine returns exactly the rows match_product accepts, variant by variant."""
+        product_filter = ProductFilter(**criteria)
+        expected = [
+            position for position, (_, row) in enumerate(products_df.iterrows())
+            if product_filter.match_product(row.to_dict())
+        ]
+
+        engine = ProductFilterEngine(CatalogSnapshot(products_df, aggregate_variants=False))
+        assert engine.filter(product_filter, chunk_size=16).tolist() == expected
+        assert engine.filter(product_filter, limit=3).tolist() == expected[:3]
+
+    def test_price_boundaries_follow_decimal_comparison(self):
+        """Test prices equal to the bounds compare like Decimal does."""
+        df = pd.DataFrame({
+            'Name': ['A', 'B', 'C'],
+            'URL': ['a', 'b', 'c'],
+            'Product Description': ['$1999.99', '$2000', 'no price'],
+        })
+        engine = ProductFilterEngine(CatalogSnapshot(df))
+
+        for min_price, max_price in [(1999.99, None), (None, 1999.99), (2000, 2000)]:
+            product_filter = ProductFilter(min_price=min_price, max_price=max_price)
+            expected = [
+                position for position, (_, row) in enumerate(df.iterrows())
+                if product_filter.match_product(row.to_dict())
+            ]
+            assert engine.filter(product_filter).tolist() == expected
+
+    def test_limit_stops_scanning(self):
+        """Test scanning stops once the limit is reached."""
+        df = pd.DataFrame({
+            'Name': ['Solar Generator'] * 10,
+            'URL': ['url'] * 10,
+            'Product Description': ['camping'] * 10,
+        })
+        engine = ProductFilterEngine(CatalogSnapshot(df))
+        calls = []
+        original = engine._match_text
+
+        def spy(product_filter, candidates):
+            calls.append(candidates.tolist())
+            return original(product_filter, candidates)
+
+        engine._match_text = spy
+        result = engine.filter(ProductFilter(category='solar', scenario='camping'), limit=3, chunk_size=4)
+
+        assert result.tolist() == [0, 1, 2]
+        assert calls == [[0, 1, 2, 3]]
+
+
+class TestSearchProducts:
+    """Test search_products on top of the filter engine."""
+
+    @pytest.mark.asyncio
+    async def test_search_products_limits_results(self, products_df, monkeypatch, tmp_path):
+        """Test search_products returns the first matching products."""
+        # Load a copy so the vector file is not written into the package data directory
+        csv_path = tmp_path / 'products.csv'
+        shutil.copyfile(DATA_CSV_PATH, csv_path)
+        monkeypatch.setattr(shopify_products, '_catalog_loader', CatalogLoader(str(csv_path)))
+
+        results = await shopify_products.search_products(category='Solar Generator', scenario='camping')
+
+        assert len(results) <= shopify_products.MAX_SEARCH_RESULTS
+        for product in results:
+            assert set(product) == {'name', 'url', 'description'}
+            assert 'camping' in product['description'].lower()
@@ -0,0 +1,104 @@
+"""Tests for head-only meta extraction."""
+
+from urllib.parse import quote
+
+import httpx
+import pytest
+
+from mcp_servers.shopify.repository.head_meta import fetch_head_meta, parse_head_meta
+from mcp_servers.shopify.repository.shopify_crawler import ShopifyCrawler
+from mcp_servers.shopify.utils.http_client import PooledHTTPClient
+
+HEAD = ('<!doctype html><html><head><meta charset="utf-8"><title>Explorer 1000 &amp; Panel</title>'
+        '<meta name="Description " content="Portable power for camping">'
+        '<script>var x = "</title>";</script></head>')
+BODY = '<body>' + '<div><meta name="description" content="body meta"></div>' * 500 + '</body></html>'
+
+
+class TestParseHeadMeta:
+    """Test parse_head_meta function."""
+
+    def test_title_and_description(self):
+        """Test the title and description are read from the head."""
+        assert parse_head_meta([HEAD + BODY]) == ('Explorer 1000 & Panel', 'Portable power for camping')
+
+    def test_missing_tags(self):
+        """Test pages without a title or description."""
+        assert parse_head_meta(['<html><head></head><body><p>x</p></body></html>']) == (None, '')
+
+    def test_chunk_boundaries(self):
+        """Test tags split across chunks are parsed the same way."""
+        page = HEAD + BODY
+        for split in range(0, len(HEAD) + 10, 7):
+            assert parse_head_meta([page[:split], page[split:]]) == parse_head_meta([page])
+
+    def test_stops_after_head(self):
+        """Test chunks after </head> are not consumed."""
+        consumed = []
+
+        def chunks():
+            for chunk in [HEAD[:50], HEAD[50:], BODY[:100], BODY[100:]]:
+                consumed.append(chunk)
+                yield chunk
+
+        assert parse_head_meta(chunks())[0] == 'Explorer 1000 & Panel'
+        assert len(consumed) == 2
+
+    def test_body_without_head(self):
+        """Test pages without a head stop at <body>."""
+        assert parse_head_meta(['<title>Only title</title><body><meta name="description" content="x">']) == (
+            'Only title', '')
+
+
+class TestFetchHeadMeta:
+    """Test fetch_head_meta function."""
+
+    @pytest.mark.asyncio
+    async def test_streams_only_the_head(self):
+        """Test the response body stops being read after </head>."""
+        sent = []
+
+        async def body():
+            for chunk in [HEAD.encode()] + [BODY.encode()] * 100:
+                sent.append(len(chunk))
+                yield chunk
+
+        def handler(request):
+            return httpx.Response(200, headers={'Content-Type': 'text/html; charset=utf-8'}, content=body())
+
+        client = PooledHTTPClient(transport=httpx.MockTransport(handler))
+        title, description = await fetch_head_meta(client, 'https://store.example.com/products/a')
+
+        assert (title, description) == ('Explorer 1000 & Panel', 'Portable power for camping')
+        assert sum(sent) < 3 * len(BODY)
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_charset(self):
+        """Test the response charset is used to decode the head."""
+        def handler(request):
+            return httpx.Response(200, headers={'Content-Type': 'text/html; charset=iso-8859-1'},
+                                  content='<title>Café</title></head>'.encode('iso-8859-1'))
+
+        client = PooledHTTPClient(transport=httpx.MockTransport(handler))
+        assert await fetch_head_meta(client, 'https://store.example.com/') == ('Café', '')
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_http_error(self):
+        """Test HTTP errors are raised."""
+        client = PooledHTTPClient(transport=httpx.MockTransport(lambda request: httpx.Response(404)))
+        with pytest.raises(httpx.HTTPStatusError):
+            await fetch_head_meta(client, 'https://store.example.com/')
+        await client.aclose()
+
+
+class TestGetTagsFromProduct:
+    """Test the blocking crawler reads only the head."""
+
+    def test_reads_head(self, tmp_path):
+        """Test the title and description come from the streamed head."""
+        crawler = ShopifyCrawler('https://store.example.com', str(tmp_path / 'products.csv'))
+        url = 'data:text/html;charset=utf-8,' + quote(HEAD + BODY)
+
+        assert crawler.get_tags_from_product(url) == ('Explorer 1000 & Panel', 'Portable power for camping')
@@ -0,0 +1,176 @@
+"""Tests for the pooled HTTP client."""
+
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.utils.disk_cache import DiskCache
+from mcp_servers.shopify.utils.http_client import PooledHTTPClient
+from mcp_servers.shopify.utils.lru_cache import LRUCache
+
+
+def slow_transport(calls, delay=0.01, status_code=200):
+    """Build a mock transport that records requests and tracks concurrency."""
+    state = {'active': 0, 'peak': 0}
+
+    async def handler(request):
+        calls.append(str(request.url))
+        state['active'] += 1
+        state['peak'] = max(state['peak'], state['active'])
+        await asyncio.sleep(delay)
+        state['active'] -= 1
+        return httpx.Response(status_code, text=f'<html>{request.url.path}</html>')
+
+    return httpx.MockTransport(handler), state
+
+
+class TestPooledHTTPClient:
+    """Test PooledHTTPClient class."""
+
+    @pytest.mark.asyncio
+    async def test_coalesces_same_url(self):
+        """Test concurrent calls for one URL share a single request."""
+        calls = []
+        transport, _ = slow_transport(calls)
+        client = PooledHTTPClient(transport=transport)
+
+        responses = await asyncio.gather(*[client.get('https://store.example.com/products/a')
+                                           for _ in range(5)])
+
+        assert calls == ['https://store.example.com/products/a']
+        assert {response.text for response in responses} == {'<html>/products/a</html>'}
+        assert client.coalesced == 4
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_fetch_again(self):
+        """Test a finished request is not reused by later calls."""
+        calls = []
+        transport, _ = slow_transport(calls, delay=0)
+        client = PooledHTTPClient(transport=transport)
+
+        await client.get('https://store.example.com/products/a')
+        await client.get('https://store.example.com/products/a')
+
+        assert len(calls) == 2
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self):
+        """Test at most max_per_host requests run against one host."""
+        calls = []
+        transport, state = slow_transport(calls)
+        client = PooledHTTPClient(max_per_host=2, transport=transport)
+
+        await asyncio.gather(*[client.get(f'https://store.example.com/products/{index}')
+                               for index in range(6)])
+
+        assert len(calls) == 6
+        assert state['peak'] == 2
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller(self):
+        """Test a failed shared request raises in all waiting callers."""
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            raise httpx.ConnectError('unreachable', request=request)
+
+        client = PooledHTTPClient(transport=httpx.MockTransport(handler))
+        results = await asyncio.gather(*[client.get('https://store.example.com/') for _ in range(3)],
+                                       return_exceptions=True)
+
+        assert all(isinstance(result, httpx.ConnectError) for result in results)
+        assert client.requests == 1
+        await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_keeps_shared_request(self):
+        """Test cancelling one caller does not cancel the request for others."""
+        calls = []
+        transport, _ = slow_transport(calls, delay=0.05)
+        client = PooledHTTPClient(transport=transport)
+
+        first = asyncio.ensure_future(client.get('https://store.example.com/products/a'))
+        second = asyncio.ensure_future(client.get('https://store.example.com/products/a'))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert (await second).status_code == 200
+        assert len(calls) == 1
+        await client.aclose()
+
+    def test_new_event_loop_closes_old_client(self):
+        """Test the client from a finished event loop is closed when it is replaced."""
+        transport, _ = slow_transport([], delay=0)
+        client = PooledHTTPClient(transport=transport)
+
+        asyncio.run(client.get('https://store.example.com/products/a'))
+        first = client._client
+        asyncio.run(client.get('https://store.example.com/products/a'))
+
+        assert first.is_closed
+        assert client._client is not first
+        asyncio.run(client.aclose())
+
+    @pytest.mark.asyncio
+    async def test_old_client_is_closed_on_its_running_loop(self):
+        """Test a client still owned by a loop in another thread is closed on that loop."""
+        transport, _ = slow_transport([], delay=0)
+        client = PooledHTTPClient(transport=transport)
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever)
+        thread.start()
+        try:
+            future = asyncio.run_coroutine_threadsafe(client.get('https://store.example.com/products/a'), other)
+            await asyncio.wrap_future(future)
+            first = client._client
+
+            await client.get('https://store.example.com/products/a')
+
+            assert first.is_closed
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join()
+            other.close()
+        await client.aclose()
+
+
+class TestGetSingleProductDetail:
+    """Test get_single_product_detail on the shared client."""
+
+    @pytest.fixture
+    def use_client(self, monkeypatch, tmp_path):
+        """Route detail requests through a mock transport and a temporary cache."""
+        calls = []
+        transport, _ = slow_transport(calls)
+        monkeypatch.setattr(shopify_products, '_http_client', PooledHTTPClient(transport=transport))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(max_bytes=1024 * 1024,
+                                                                                sizeof=shopify_products._detail_entry_size))
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_concurrent_details_share_fetch(self, use_client):
+        """Test concurrent detail calls for one product make one request."""
+        url = 'https://store.example.com/products/explorer'
+        results = await asyncio.gather(*[shopify_products.get_single_product_detail(url, include_html=True)
+                                          for _ in range(3)])
+
+        assert use_client == [url]
+        assert all(result['html_content'] == '<html>/products/explorer</html>' for result in results)
+
+    @pytest.mark.asyncio
+    async def test_http_error(self, monkeypatch, tmp_path):
+        """Test HTTP errors are returned as an error dictionary."""
+        transport, _ = slow_transport([], status_code=404)
+        monkeypatch.setattr(shopify_products, '_http_client', PooledHTTPClient(transport=transport))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(max_bytes=1024 * 1024,
+                                                                                sizeof=shopify_products._detail_entry_size))
+
+        result = await shopify_products.get_single_product_detail('https://store.example.com/products/none')
+        assert 'error' in result
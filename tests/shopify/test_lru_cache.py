@@ -0,0 +1,173 @@
+"""Tests for the LRU cache and the search_products result cache."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.shopify_products import ProductFilter, normalize_keyword
+from mcp_servers.shopify.utils.lru_cache import LRUCache
+
+
+class TestLRUCache:
+    """Test LRUCache class."""
+
+    def test_get_and_put(self):
+        """Test basic storage and counters."""
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.stats()['hit_rate'] == 0.5
+
+    def test_evicts_least_recently_used(self):
+        """Test the least recently used entry is evicted first."""
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
+        assert cache.stats()['evictions'] == 1
+
+    def test_clear_keeps_counters(self):
+        """Test clearing drops entries but not statistics."""
+        cache = LRUCache()
+        cache.put('a', 1)
+        cache.get('a')
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.stats()['hits'] == 1
+
+    def test_zero_size_disables_cache(self):
+        """Test a zero-sized cache stores nothing."""
+        cache = LRUCache(max_entries=0)
+        cache.put('a', 1)
+        assert len(cache) == 0
+
+    def test_byte_budget(self):
+        """Test entries are evicted to stay within max_bytes."""
+        cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+        cache.put('a', 'xxxx')
+        cache.put('b', 'yyyy')
+        cache.get('a')
+        cache.put('c', 'zzzz')
+
+        assert 'a' in cache and 'c' in cache
+        assert 'b' not in cache
+        assert cache.stats()['bytes'] == 8
+
+    def test_replacing_entry_updates_size(self):
+        """Test storing a key again replaces its size."""
+        cache = LRUCache(max_bytes=10, sizeof=len)
+        cache.put('a', 'xxxxxxxx')
+        cache.put('a', 'x')
+        cache.put('b', 'yyyyyyyy')
+
+        assert len(cache) == 2
+        assert cache.stats()['bytes'] == 9
+
+    def test_oversized_value_not_stored(self):
+        """Test a value larger than the whole budget is skipped."""
+        cache = LRUCache(max_bytes=3, sizeof=len)
+        cache.put('a', 'xxxx')
+        assert len(cache) == 0
+
+
+class TestFilterCacheKey:
+    """Test the normalized ProductFilter cache key."""
+
+    def test_normalize_keyword(self):
+        """Test keywords are trimmed and lowercased."""
+        assert normalize_keyword('  Solar Generator ') == 'solar generator'
+        assert normalize_keyword('   ') is None
+        assert normalize_keyword(None) is None
+
+    def test_equivalent_filters_share_a_key(self):
+        """Test case, whitespace and falsy prices do not change the key."""
+        first = ProductFilter(min_price=0, max_price=500, category='Solar ', scenario='CAMPING')
+        second = ProductFilter(min_price=None, max_price=500.0, category='solar', scenario=' camping')
+        assert first.cache_key() == second.cache_key()
+
+    def test_different_filters_differ(self):
+        """Test different criteria produce different keys."""
+        assert (ProductFilter(category='solar', scenario='camping').cache_key() !=
+                ProductFilter(category='solar', scenario='camping', description='portable').cache_key())
+
+
+class TestSearchResultCache:
+    """Test the result cache in front of search_products."""
+
+    @pytest.fixture
+    def loader(self, monkeypatch, tmp_path):
+        """Serve a small catalog and count searches."""
+        csv_path = tmp_path / 'products.csv'
+        csv_path.write_text('')
+        snapshots = iter([
+            CatalogSnapshot(pd.DataFrame({
+                'Name': ['Solar Generator A', 'Solar Generator B'],
+                'URL': ['a', 'b'],
+                'Product Description': ['camping', 'camping at home'],
+            })),
+            CatalogSnapshot(pd.DataFrame({
+                'Name': ['Solar Generator C'],
+                'URL': ['c'],
+                'Product Description': ['camping'],
+            })),
+        ])
+        loader = CatalogLoader(str(csv_path), build_snapshot=lambda path, digest: next(snapshots), check_interval=3600)
+        monkeypatch.setattr(shopify_products, '_catalog_loader', loader)
+        monkeypatch.setattr(shopify_products, '_search_cache', LRUCache(max_entries=8))
+        monkeypatch.setattr(shopify_products, '_search_cache_version', None)
+        return loader
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_hits_cache(self, loader):
+        """Test normalized repeats are served from the cache."""
+        first = await shopify_products.search_products(category='Solar Generator', scenario='camping')
+        second = await shopify_products.search_products(category=' solar generator', scenario='CAMPING ')
+
+        assert first == second
+        stats = shopify_products.get_search_cache_stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    @pytest.mark.asyncio
+    async def test_cached_results_are_copies(self, loader):
+        """Test callers cannot mutate cached results."""
+        first = await shopify_products.search_products(category='solar', scenario='camping')
+        first[0]['name'] = 'changed'
+
+        second = await shopify_products.search_products(category='solar', scenario='camping')
+        assert second[0]['name'] != 'changed'
+
+    @pytest.mark.asyncio
+    async def test_new_snapshot_invalidates_cache(self, loader):
+        """Test a reloaded catalog drops cached results."""
+        await shopify_products.search_products(category='solar', scenario='camping')
+        loader._snapshot = None
+        loader._fingerprint = None
+
+        results = await shopify_products.search_products(category='solar', scenario='camping')
+
+        assert [product['url'] for product in results] == ['c']
+        assert shopify_products.get_search_cache_stats()['hits'] == 0
+
+    @pytest.mark.asyncio
+    async def test_stats_exposed_as_tool(self, loader):
+        """Test operators can read the hit rate through the MCP server."""
+        await shopify_products.search_products(category='solar', scenario='camping')
+
+        content, _ = await shopify_products.mcp.call_tool('get_search_cache_stats', {})
+
+        assert 'get_search_cache_stats' in [tool.name for tool in await shopify_products.mcp.list_tools()]
+        assert json.loads(content[0].text)['misses'] == 1
@@ -0,0 +1,106 @@
+"""Tests for the trigram index and fuzzy matching."""
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.ngram_index import TrigramIndex, trigrams
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+
+
+@pytest.fixture
+def snapshot():
+    """Build a small catalog snapshot."""
+    return CatalogSnapshot(pd.DataFrame({
+        'Name': ['Solar Generator 1000', 'Explorer Power Station', 'Solar Generator 2000', 'Solar Panel'],
+        'URL': ['u1', 'u2', 'u3', 'u4'],
+        'Product Description': ['$999 for camping trips', '$499 for camping',
+                                '$1,999 camping camping', '$199 for the home'],
+    }))
+
+
+class TestTrigrams:
+    """Test trigram extraction."""
+
+    def test_trigrams(self):
+        """Test words are padded so short words still have trigrams."""
+        assert trigrams('Ab') == {'  a', ' ab', 'ab '}
+
+
+class TestTrigramIndex:
+    """Test TrigramIndex class."""
+
+    @pytest.fixture
+    def index(self):
+        """Build a small index."""
+        return TrigramIndex(['generator', 'camping', 'camera', 'battery'])
+
+    def test_similar_finds_misspellings(self, index):
+        """Test misspelled words find the intended term first."""
+        assert index.similar('generater')[0][0] == 'generator'
+        assert index.similar('campng')[0][0] == 'camping'
+
+    def test_exact_word_scores_one(self, index):
+        """Test an exact term has similarity one."""
+        assert index.similar('battery')[0] == ('battery', 1.0)
+
+    def test_threshold(self, index):
+        """Test terms below the threshold are dropped."""
+        assert [term for term, _ in index.similar('camp', threshold=0.0)][:2] == ['camping', 'camera']
+        assert index.similar('camp', threshold=0.9) == []
+        assert index.similar('xyz') == []
+
+
+class TestFuzzySearch:
+    """Test CatalogSnapshot.fuzzy_search."""
+
+    def test_typos_match(self, snapshot):
+        """Test misspelled keywords still find products."""
+        positions = snapshot.fuzzy_search(ProductFilter(category='solar generater', scenario='campng'), 3)
+        assert sorted(positions) == [0, 2]
+
+    def test_ranked_by_relevance(self, snapshot):
+        """Test documents with more matching terms rank first."""
+        positions = snapshot.fuzzy_search(ProductFilter(category='generater', scenario='campng'), 3)
+        assert positions == [2, 0]
+
+    def test_price_filter_is_exact(self, snapshot):
+        """Test price bounds still apply in fuzzy mode."""
+        positions = snapshot.fuzzy_search(
+            ProductFilter(category='solar generater', scenario='campng', max_price=1500), 3)
+        assert positions == [0]
+
+    def test_no_match(self, snapshot):
+        """Test unrelated keywords return nothing."""
+        assert snapshot.fuzzy_search(ProductFilter(category='refrigerator', scenario='campng'), 3) == []
+
+
+class TestSearchProductsMatchMode:
+    """Test the match_mode parameter of search_products."""
+
+    @pytest.fixture(autouse=True)
+    def use_snapshot(self, snapshot, monkeypatch, tmp_path):
+        """Serve the snapshot through the module loader with an empty cache."""
+        csv_path = tmp_path / 'products.csv'
+        csv_path.write_text('')
+        monkeypatch.setattr(shopify_products, '_catalog_loader',
+                            CatalogLoader(str(csv_path), build_snapshot=lambda path, digest: snapshot))
+        shopify_products._search_cache.clear()
+        return snapshot
+
+    @pytest.mark.asyncio
+    async def test_fuzzy_mode(self):
+        """Test fuzzy mode tolerates typos that exact mode does not."""
+        exact = await shopify_products.search_products('solar generater', 'campng')
+        fuzzy = await shopify_products.search_products('solar generater', 'campng', match_mode='fuzzy')
+
+        assert exact == []
+        assert {product['url'] for product in fuzzy} == {'u1', 'u3'}
+
+    @pytest.mark.asyncio
+    async def test_invalid_mode(self):
+        """Test unknown match modes are rejected."""
+        with pytest.raises(ValueError):
+            await shopify_products.search_products('solar', 'camping', match_mode='regex')
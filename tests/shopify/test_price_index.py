@@ -0,0 +1,79 @@
+"""Tests for the sorted price index."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot, parse_prices
+from mcp_servers.shopify.repository.price_index import PriceIndex
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+
+
+DESCRIPTIONS = ['$300', 'no price', '$1,999.99', '$100', '$2000', '$1999.99', None, '$0.10', '$0.1']
+
+
+@pytest.fixture
+def index():
+    """Build a price index over a few descriptions."""
+    return PriceIndex(*parse_prices(pd.Series(DESCRIPTIONS)))
+
+
+class TestPriceIndex:
+    """Test PriceIndex class."""
+
+    def test_sorted_layout(self, index):
+        """Test priced rows are sorted and unpriced rows are kept apart."""
+        assert len(index) == len(DESCRIPTIONS)
+        assert np.all(np.diff(index.sorted_prices) >= 0)
+        assert index.unpriced.tolist() == [1, 6]
+
+    def test_range_includes_unpriced(self, index):
+        """Test a range returns matching and unpriced rows in catalog order."""
+        assert index.range(200, 1500).tolist() == [0, 1, 6]
+
+    def test_open_bounds(self, index):
+        """Test missing or zero bounds do not restrict the range."""
+        assert index.range(None, 150).tolist() == [1, 3, 6, 7, 8]
+        assert index.range(0, 150).tolist() == [1, 3, 6, 7, 8]
+        assert index.range(1000, None).tolist() == [1, 2, 4, 5, 6]
+
+    def test_empty_range(self, index):
+        """Test an inverted range returns only unpriced rows."""
+        assert index.range(500, 200).tolist() == [1, 6]
+
+    @pytest.mark.parametrize('min_price, max_price', [
+        (1999.99, None), (None, 1999.99), (2000, 2000), (0.1, 0.1), (None, 0.1), (0.1, None),
+    ])
+    def test_matches_match_price(self, index, min_price, max_price):
+        """Test boundaries follow ProductFilter.match_price exactly."""
+        product_filter = ProductFilter(min_price=min_price, max_price=max_price)
+        expected = [
+            position for position, description in enumerate(DESCRIPTIONS)
+            if product_filter.match_price(description if description is not None else float('nan'))
+        ]
+        assert index.range(min_price, max_price).tolist() == expected
+
+
+class TestFilterEngineWithPriceIndex:
+    """Test the filter engine narrows candidates with the price index."""
+
+    def test_only_price_candidates_are_scanned(self):
+        """Test text matching only runs on rows inside the price range."""
+        snapshot = CatalogSnapshot(pd.DataFrame({
+            'Name': ['Solar Generator'] * 4,
+            'URL': ['a', 'b', 'c', 'd'],
+            'Product Description': ['$100 camping', '$900 camping', 'camping', '$5000 camping'],
+        }))
+        engine = snapshot.filter_engine
+        scanned = []
+        original = engine._match_text
+
+        def spy(product_filter, candidates):
+            scanned.extend(candidates.tolist())
+            return original(product_filter, candidates)
+
+        engine._match_text = spy
+        result = engine.filter(ProductFilter(min_price=500, max_price=1000, category='solar', scenario='camping'))
+
+        assert result.tolist() == [1, 2]
+        assert scanned == [1, 2]
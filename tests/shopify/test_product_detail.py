@@ -0,0 +1,282 @@
+"""Tests for structured product detail extraction."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.product_detail import (
+    product_json_url,
+    record_from_html,
+    record_from_json_ld,
+    record_from_product_json,
+)
+from mcp_servers.shopify.utils.disk_cache import DiskCache
+from mcp_servers.shopify.utils.http_client import PooledHTTPClient
+from mcp_servers.shopify.utils.lru_cache import LRUCache
+
+PRODUCT = {
+    'title': 'Explorer 1000',
+    'handle': 'explorer-1000',
+    'vendor': 'Jackery',
+    'product_type': 'Portable Power Station',
+    'tags': 'camping, solar',
+    'body_html': '<p>Portable power</p>\n<ul><li>1000W output</li></ul>',
+    'options': [{'name': 'Bundle', 'values': ['Standalone', 'With panel']}],
+    'variants': [
+        {'id': 11, 'title': 'Standalone', 'sku': 'E1000', 'price': '799.00', 'compare_at_price': '999.00'},
+        {'id': 12, 'title': 'With panel', 'sku': 'E1000-P', 'price': '1,099.00', 'compare_at_price': None},
+    ],
+    'images': [{'src': 'https://cdn.example.com/e1000.png'}],
+}
+
+JSON_LD_PAGE = '''<html><head><title>Explorer 1000</title>
+<script type="application/ld+json">{"@type": "Organization", "name": "Jackery"}</script>
+<script type="application/ld+json">{"@context": "https://schema.org", "@type": "Product",
+ "name": "Explorer 1000", "sku": "E1000", "brand": {"@type": "Brand", "name": "Jackery"},
+ "description": "<p>Portable power</p>", "image": ["https://cdn.example.com/e1000.png"],
+ "offers": [{"@type": "Offer", "name": "Standalone", "sku": "E1000", "price": "799.00",
+             "priceCurrency": "USD", "availability": "https://schema.org/InStock"},
+            {"@type": "Offer", "name": "With panel", "sku": "E1000-P", "price": "1099.00",
+             "priceCurrency": "USD", "availability": "https://schema.org/OutOfStock"}]}
+</script></head><body>''' + '<div>filler</div>' * 1000 + '</body></html>'
+
+
+class TestProductJsonUrl:
+    """Test product_json_url function."""
+
+    @pytest.mark.parametrize('url,expected', [
+        ('https://store.example.com/products/explorer-1000',
+         'https://store.example.com/products/explorer-1000.json'),
+        ('https://store.example.com/collections/power/products/explorer-1000?variant=11',
+         'https://store.example.com/products/explorer-1000.json'),
+        ('https://store.example.com/en-gb/products/explorer-1000/',
+         'https://store.example.com/products/explorer-1000.json'),
+        ('https://store.example.com/pages/about', None),
+    ])
+    def test_urls(self, url, expected):
+        """Test product pages map to the JSON endpoint."""
+        assert product_json_url(url) == expected
+
+
+class TestRecordFromProductJson:
+    """Test record_from_product_json function."""
+
+    def test_structured_fields(self):
+        """Test the record keeps prices, variants and promotions only."""
+        record = record_from_product_json(PRODUCT, 'https://store.example.com/products/explorer-1000')
+
+        assert record['source'] == 'product_json'
+        assert record['description'] == 'Portable power 1000W output'
+        assert record['tags'] == ['camping', 'solar']
+        assert record['price'] == {'min': 799.0, 'max': 1099.0}
+        assert record['variants'][1] == {'id': 12, 'title': 'With panel', 'sku': 'E1000-P', 'price': 1099.0}
+        assert record['promotions'] == [{'variant_id': 11, 'title': 'Standalone', 'price': 799.0,
+                                         'compare_at_price': 999.0, 'discount_percent': 20.0}]
+        assert record['image'] == 'https://cdn.example.com/e1000.png'
+
+    def test_missing_fields_are_omitted(self):
+        """Test empty fields do not appear in the record."""
+        assert record_from_product_json({'title': 'Gift card'}, 'u') == {
+            'url': 'u', 'source': 'product_json', 'title': 'Gift card'
+        }
+
+
+class TestRecordFromHtml:
+    """Test JSON-LD and HTML extraction."""
+
+    def test_json_ld_product(self):
+        """Test the Product object is found among other JSON-LD blocks."""
+        record = record_from_json_ld(JSON_LD_PAGE, 'u')
+
+        assert record['source'] == 'json_ld'
+        assert record['vendor'] == 'Jackery'
+        assert record['currency'] == 'USD'
+        assert record['price'] == {'min': 799.0, 'max': 1099.0}
+        assert [variant['available'] for variant in record['variants']] == [True, False]
+        assert record['image'] == 'https://cdn.example.com/e1000.png'
+
+    def test_json_ld_graph(self):
+        """Test products nested in @graph are found."""
+        html = ('<script type="application/ld+json">'
+                + json.dumps({'@graph': [{'@type': ['Product'], 'name': 'Panel',
+                                          'offers': {'@type': 'AggregateOffer', 'lowPrice': 199}}]})
+                + '</script>')
+        assert record_from_json_ld(html, 'u')['price'] == {'min': 199.0, 'max': 199.0}
+
+    def test_html_fallback(self):
+        """Test pages without JSON-LD return the title and meta description."""
+        html = '<html><head><title> Explorer </title><meta name="description" content="Portable"></head></html>'
+        assert record_from_html(html, 'u') == {'url': 'u', 'source': 'html', 'title': 'Explorer',
+                                               'description': 'Portable'}
+
+
+class TestGetSingleProductDetail:
+    """Test get_single_product_detail returns structured records."""
+
+    URL = 'https://store.example.com/products/explorer-1000'
+
+    def use_store(self, monkeypatch, tmp_path, json_status=200):
+        """Serve the product JSON endpoint and page from a mock transport."""
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.path)
+            if request.url.path.endswith('.json'):
+                if json_status != 200:
+                    return httpx.Response(json_status)
+                return httpx.Response(200, json={'product': PRODUCT})
+            return httpx.Response(200, text=JSON_LD_PAGE)
+
+        monkeypatch.setattr(shopify_products, '_http_client',
+                            PooledHTTPClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(
+            max_bytes=1024 * 1024, sizeof=shopify_products._detail_entry_size))
+        return calls
+
+    @pytest.mark.asyncio
+    async def test_product_json(self, monkeypatch, tmp_path):
+        """Test the JSON endpoint is used and no HTML is returned."""
+        calls = self.use_store(monkeypatch, tmp_path)
+        result = await shopify_products.get_single_product_detail(self.URL)
+
+        assert calls == ['/products/explorer-1000.json']
+        assert result['title'] == 'Explorer 1000'
+        assert 'html_content' not in result
+        assert len(json.dumps(result)) < 1500
+
+    @pytest.mark.asyncio
+    async def test_json_ld_fallback(self, monkeypatch, tmp_path):
+        """Test the page's JSON-LD is used when the endpoint is unavailable."""
+        calls = self.use_store(monkeypatch, tmp_path, json_status=404)
+        result = await shopify_products.get_single_product_detail(self.URL)
+
+        assert calls == ['/products/explorer-1000.json', '/products/explorer-1000']
+        assert result['source'] == 'json_ld'
+        assert 'html_content' not in result
+
+    @pytest.mark.asyncio
+    async def test_missing_endpoint_is_remembered(self, monkeypatch, tmp_path):
+        """Test a 404 from the endpoint sends later fetches straight to the page."""
+        calls = self.use_store(monkeypatch, tmp_path, json_status=404)
+        await shopify_products.get_single_product_detail(self.URL)
+        cache_key = shopify_products.generate_cache_key(self.URL)
+        entry = shopify_products._lookup_product_detail(cache_key)
+        calls.clear()
+
+        await shopify_products._fetch_product_detail(self.URL, cache_key, entry)
+
+        assert calls == ['/products/explorer-1000']
+
+    @pytest.mark.asyncio
+    async def test_endpoint_error_is_not_remembered(self, monkeypatch, tmp_path):
+        """Test other endpoint errors fall back to the page once without caching the result."""
+        calls = self.use_store(monkeypatch, tmp_path, json_status=503)
+
+        first = await shopify_products.get_single_product_detail(self.URL)
+        await shopify_products.get_single_product_detail(self.URL)
+
+        assert first['source'] == 'json_ld'
+        assert calls == ['/products/explorer-1000.json', '/products/explorer-1000'] * 2
+        assert shopify_products._lookup_product_detail(shopify_products.generate_cache_key(self.URL)) is None
+
+    @pytest.mark.asyncio
+    async def test_include_html(self, monkeypatch, tmp_path):
+        """Test raw HTML is returned only on request and cached separately."""
+        calls = self.use_store(monkeypatch, tmp_path)
+
+        with_html = await shopify_products.get_single_product_detail(self.URL, include_html=True)
+        without_html = await shopify_products.get_single_product_detail(self.URL)
+
+        assert with_html['html_content'] == JSON_LD_PAGE
+        assert with_html['source'] == 'json_ld'
+        assert 'html_content' not in without_html
+        assert calls == ['/products/explorer-1000', '/products/explorer-1000.json']
+
+
+class TestGetProductDetailsBatch:
+    """Test get_product_details_batch tool."""
+
+    @pytest.fixture
+    def store(self, monkeypatch, tmp_path):
+        """Serve products with per-handle delays and track concurrency."""
+        state = {'active': 0, 'peak': 0, 'calls': 0}
+        delays = {'slow': 0.05, 'medium': 0.02}
+
+        async def handler(request):
+            handle = request.url.path.split('/')[-1].removesuffix('.json')
+            state['calls'] += 1
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(delays.get(handle, 0.001))
+            state['active'] -= 1
+            if handle == 'missing':
+                return httpx.Response(404)
+            return httpx.Response(200, json={'product': {'title': handle}})
+
+        monkeypatch.setattr(shopify_products, '_http_client',
+                            PooledHTTPClient(transport=httpx.MockTransport(handler)))
+        monkeypatch.setattr(shopify_products, '_detail_cache', DiskCache(str(tmp_path)))
+        monkeypatch.setattr(shopify_products, '_detail_memory_cache', LRUCache(
+            max_bytes=1024 * 1024, sizeof=shopify_products._detail_entry_size))
+        return state
+
+    @staticmethod
+    def url(handle):
+        """Build a product URL for a handle."""
+        return f'https://store.example.com/products/{handle}'
+
+    @pytest.mark.asyncio
+    async def test_results_in_input_order(self, store):
+        """Test results follow the input order, not completion order."""
+        handles = ['slow', 'fast', 'medium']
+        result = await shopify_products.get_product_details_batch([self.url(handle) for handle in handles])
+
+        assert [item['detail']['title'] for item in result['results']] == handles
+        assert all(item['ok'] and item['elapsed_ms'] >= 0 for item in result['results'])
+        assert result['elapsed_ms'] < 150
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, store, monkeypatch):
+        """Test no more than the configured number of fetches run at once."""
+        monkeypatch.setattr(shopify_products, 'DETAIL_BATCH_CONCURRENCY', 2)
+        await shopify_products.get_product_details_batch([self.url(f'p{index}') for index in range(6)])
+
+        assert store['calls'] == 6
+        assert store['peak'] == 2
+
+    @pytest.mark.asyncio
+    async def test_per_item_errors(self, store):
+        """Test a failing product is reported without failing the batch."""
+        result = await shopify_products.get_product_details_batch([self.url('fast'), self.url('missing')])
+
+        assert result['results'][0]['ok']
+        assert not result['results'][1]['ok']
+        assert '404' in result['results'][1]['error']
+
+    @pytest.mark.asyncio
+    async def test_slow_item_times_out(self, store, monkeypatch):
+        """Test one slow page times out alone."""
+        monkeypatch.setattr(shopify_products, 'DETAIL_BATCH_ITEM_TIMEOUT_SECONDS', 0.02)
+        result = await shopify_products.get_product_details_batch([self.url('slow'), self.url('fast')])
+
+        assert [item['ok'] for item in result['results']] == [False, True]
+        assert '超时' in result['results'][0]['error']
+
+    @pytest.mark.asyncio
+    async def test_cached_items_skip_fetch(self, store):
+        """Test products already cached are not fetched again."""
+        await shopify_products.get_single_product_detail(self.url('fast'))
+        result = await shopify_products.get_product_details_batch([self.url('fast'), self.url('medium')])
+
+        assert store['calls'] == 2
+        assert all(item['ok'] for item in result['results'])
+
+    @pytest.mark.asyncio
+    async def test_too_many_urls(self, store):
+        """Test oversized batches are rejected."""
+        urls = [self.url(f'p{index}') for index in range(shopify_products.MAX_DETAIL_BATCH_SIZE + 1)]
+        assert 'error' in await shopify_products.get_product_details_batch(urls)
@@ -0,0 +1,481 @@
+"""Tests for the Shopify crawler."""
+
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import httpx
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository.shopify_crawler import VARIANT_ATTRIBUTES, ShopifyCrawler
+from mcp_servers.shopify.repository.sqlite_catalog import SQLiteCatalog
+from mcp_servers.shopify.utils.http_client import PooledHTTPClient
+
+BASE_URL = 'https://store.example.com'
+
+LISTING = [
+    [{'title': f'Product {index}', 'handle': f'product-{index}', 'body_html': f'<p>Only ${index}99</p>'}
+     for index in range(page * 4, page * 4 + 4)]
+    for page in range(2)
+]
+
+
+def product_page(handle):
+    """Build a product page with a title and meta description."""
+    return (f'<html><head><title>{handle} title</title>'
+            f'<meta name="description" content="{handle} meta"></head></html>')
+
+
+def variants(handle):
+    """Build the variants of a product with the fields the /products.json listing carries."""
+    index = int(handle.split('-')[1])
+    return [{'id': index * 10 + offset, 'product_id': index, 'title': f'V{offset}',
+             'price': f'{index}{offset}.00', 'sku': f'SKU-{index}-{offset}'} for offset in range(2)]
+
+
+def detail_variants(handle):
+    """Build the variants of <handle>.json, which add inventory and shipping fields."""
+    return [dict(variant, inventory_quantity=variant['id'] + 1, inventory_policy='deny',
+                 inventory_management='shopify', barcode=f'BC-{variant["id"]}', weight=1.5, weight_unit='kg')
+            for variant in variants(handle)]
+
+
+def product_json_variants(url):
+    """Serve get_inventory_from_product from detail_variants."""
+    return pd.DataFrame(detail_variants(url.split('/')[-1].removesuffix('.json')))
+
+
+class Store:
+    """Mock Shopify store that records request order and concurrency."""
+
+    def __init__(self, listing=LISTING):
+        self.listing = listing
+        self.events = []
+        self.limits = []
+        self.active = 0
+        self.peak = 0
+
+    async def handler(self, request):
+        """Serve listing pages, product pages and variant JSON."""
+        path = request.url.path
+        if path == '/products.json':
+            page = int(request.url.params['page'])
+            self.limits.append(request.url.params.get('limit'))
+            self.events.append(f'listing {page}')
+            products = self.listing[page - 1] if page <= len(self.listing) else []
+            return httpx.Response(200, json={'products': products})
+
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        handle = path.split('/')[-1].removesuffix('.json')
+        # Earlier products finish later, so completion order differs from listing order
+        await asyncio.sleep(0.002 * (8 - int(handle.split('-')[1])))
+        self.active -= 1
+        self.events.append(f'done {path}')
+        if path.endswith('.json'):
+            return httpx.Response(200, json={'product': {'variants': detail_variants(handle)}})
+        return httpx.Response(200, text=product_page(handle))
+
+    def client(self):
+        """Build a pooled client backed by this store."""
+        return PooledHTTPClient(max_per_host=100, transport=httpx.MockTransport(self.handler))
+
+
+def crawl_sync(crawler):
+    """Run the blocking crawler against the same store data."""
+    pages = LISTING + [[]]
+    with patch.object(crawler, 'get_page', side_effect=lambda page: pages[page - 1]), \
+            patch.object(crawler, 'get_tags_from_product',
+                         side_effect=lambda url: crawler.parse_tags(product_page(url.split('/')[-1]))), \
+            patch.object(crawler, 'get_inventory_from_product',
+                         side_effect=product_json_variants):
+        crawler.crawl()
+
+
+class TestCrawlAsync:
+    """Test ShopifyCrawler.crawl_async."""
+
+    @pytest.mark.parametrize('with_variants', [False, True])
+    @pytest.mark.asyncio
+    async def test_matches_sequential_crawl(self, tmp_path, with_variants):
+        """Test the async crawl writes the same rows in listing order."""
+        sync_path, async_path = tmp_path / 'sync.csv', tmp_path / 'async.csv'
+        crawl_sync(ShopifyCrawler(BASE_URL, str(sync_path), with_variants=with_variants, write_binary=False))
+
+        crawler = ShopifyCrawler(BASE_URL, str(async_path), with_variants=with_variants, write_binary=False,
+                                 parse_workers=0)
+        await crawler.crawl_async(Store().client())
+
+        assert async_path.read_text() == sync_path.read_text()
+        names = pd.read_csv(async_path)['Name'].drop_duplicates().tolist()
+        assert names == [f'Product {index}' for index in range(8)]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_limit(self, tmp_path):
+        """Test no more product fetches run at once than the limit allows."""
+        store = Store()
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), with_variants=True,
+                                 write_binary=False, concurrency=2, parse_workers=0)
+        await crawler.crawl_async(store.client())
+
+        # Each product fetches its page and variants together
+        assert store.peak == 4
+
+    @pytest.mark.asyncio
+    async def test_next_listing_prefetched(self, tmp_path):
+        """Test the next listing page is requested before the current products finish."""
+        store = Store()
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False, parse_workers=0)
+        await crawler.crawl_async(store.client())
+
+        first_product_done = next(index for index, event in enumerate(store.events) if event.startswith('done'))
+        assert store.events.index('listing 2') < first_product_done
+
+    @pytest.mark.asyncio
+    async def test_next_listing_not_held_back_by_window(self, tmp_path):
+        """Test the next listing page is requested while the current page waits for in-flight room."""
+        store = Store()
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False,
+                                 parse_workers=0, queue_size=2)
+        await crawler.crawl_async(store.client())
+
+        first_product_done = next(index for index, event in enumerate(store.events) if event.startswith('done'))
+        assert store.events.index('listing 2') < first_product_done
+
+    @pytest.mark.asyncio
+    async def test_writes_sqlite_pages(self, tmp_path):
+        """Test the SQLite catalog is written in listing order too."""
+        sqlite_path = str(tmp_path / 'products.sqlite')
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False,
+                                 sqlite_output_path=sqlite_path, parse_workers=0)
+        await crawler.crawl_async(Store().client())
+
+        catalog = SQLiteCatalog(sqlite_path)
+        assert [product['name'] for product in catalog.page(0, 10, ['name'])] == [
+            f'Product {index}' for index in range(8)]
+        catalog.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_product_fails_crawl(self, tmp_path):
+        """Test HTTP errors propagate like in the sequential crawl."""
+        def handler(request):
+            if request.url.path == '/products.json':
+                return httpx.Response(200, json={'products': LISTING[0]})
+            return httpx.Response(500)
+
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False, parse_workers=0)
+        with pytest.raises(httpx.HTTPStatusError):
+            await crawler.crawl_async(PooledHTTPClient(transport=httpx.MockTransport(handler)))
+
+
+class TestCrawlPipeline:
+    """Test the staged crawl pipeline."""
+
+    @pytest.mark.asyncio
+    async def test_inline_parse_matches_process_pool(self, tmp_path):
+        """Test parsing in the event loop writes the same rows as the process pool."""
+        pool_path, inline_path = tmp_path / 'pool.csv', tmp_path / 'inline.csv'
+        await ShopifyCrawler(BASE_URL, str(pool_path), with_variants=True, write_binary=False,
+                             parse_workers=2).crawl_async(Store().client())
+        await ShopifyCrawler(BASE_URL, str(inline_path), with_variants=True, write_binary=False,
+                             parse_workers=0).crawl_async(Store().client())
+
+        assert pool_path.read_text() == inline_path.read_text()
+
+    @pytest.mark.asyncio
+    async def test_uses_given_executor(self, tmp_path):
+        """Test every product is parsed in the executor passed in."""
+        class CountingExecutor(ThreadPoolExecutor):
+            submitted = 0
+
+            def submit(self, *args, **kwargs):
+                CountingExecutor.submitted += 1
+                return super().submit(*args, **kwargs)
+
+        with CountingExecutor(max_workers=2) as executor:
+            crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False)
+            await crawler.crawl_async(Store().client(), executor=executor)
+
+        assert CountingExecutor.submitted == 8
+
+    @pytest.mark.asyncio
+    async def test_stage_stats(self, tmp_path):
+        """Test each stage reports how many products it handled."""
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False,
+                                 parse_workers=0, queue_size=3)
+        await crawler.crawl_async(Store().client())
+
+        assert {stage: stats['items'] for stage, stats in crawler.stage_stats.items()} == {
+            'listing': 3, 'fetch': 8, 'parse': 8, 'write': 8}
+        assert all(stats['queue_peak'] <= 3 for stats in crawler.stage_stats.values())
+        assert crawler.stage_stats['fetch']['items_per_second'] > 0
+
+    @pytest.mark.asyncio
+    async def test_in_flight_products_bounded(self, tmp_path):
+        """Test a slow product holds back the listing instead of buffering the store."""
+        store = Store()
+        path = tmp_path / 'products.csv'
+        crawler = ShopifyCrawler(BASE_URL, str(path), write_binary=False, concurrency=4,
+                                 parse_workers=0, queue_size=2)
+        await crawler.crawl_async(store.client())
+
+        assert store.peak <= 2
+        # The last products of the first page wait for earlier ones to be written
+        assert store.events.index('done /products/product-2') > store.events.index('done /products/product-0')
+        assert store.events.index('done /products/product-2') > store.events.index('done /products/product-1')
+        names = pd.read_csv(path)['Name'].tolist()
+        assert names == [f'Product {index}' for index in range(8)]
+
+
+    @pytest.mark.asyncio
+    async def test_written_rows_are_dropped(self, tmp_path):
+        """Test the write stage keeps no rows once they are in the CSV."""
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), with_variants=True,
+                                 write_binary=False, parse_workers=0)
+        kept = []
+        write_product = crawler._write_product
+        crawler._write_product = lambda *args: kept.extend(write_product(*args)) or []
+        await crawler.crawl_async(Store().client())
+
+        assert kept == []
+        assert crawler.stats['fetched'] == 8
+        assert len(pd.read_csv(tmp_path / 'products.csv')) == 16
+
+
+class TestIncrementalCrawl:
+    """Test incremental crawls driven by the crawl manifest."""
+
+    @staticmethod
+    def listing(updated):
+        """Build a listing where every product carries an updated_at."""
+        return [[dict(product, id=int(product['handle'].split('-')[1]),
+                      updated_at=updated.get(product['handle'], 't0'))
+                 for product in page] for page in LISTING]
+
+    async def crawl(self, path, listing, incremental, with_variants=False):
+        """Crawl a listing and return the store and crawler."""
+        store = Store(listing)
+        crawler = ShopifyCrawler(BASE_URL, str(path), with_variants=with_variants, write_binary=False,
+                                 incremental=incremental, parse_workers=0)
+        await crawler.crawl_async(store.client())
+        return store, crawler
+
+    @staticmethod
+    def fetched(store):
+        """Product pages fetched during a crawl."""
+        return sorted(event.split('/')[-1] for event in store.events if event.startswith('done'))
+
+    @pytest.mark.parametrize('with_variants', [False, True])
+    @pytest.mark.asyncio
+    async def test_only_changed_products_fetched(self, tmp_path, with_variants):
+        """Test unchanged rows are carried over, changed, new and deleted products handled."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False, with_variants=with_variants)
+
+        listing = self.listing({'product-2': 't1'})
+        del listing[1][0]
+        listing[1].append({'id': 9, 'title': 'Product 9', 'handle': 'product-9', 'body_html': '<p>New</p>',
+                           'updated_at': 't1'})
+        store, crawler = await self.crawl(path, listing, incremental=True, with_variants=with_variants)
+
+        expected = {'product-2', 'product-9'}
+        if with_variants:
+            expected |= {handle + '.json' for handle in expected}
+        assert self.fetched(store) == sorted(expected)
+        assert crawler.stats == {'fetched': 2, 'reused': 6, 'removed': 1}
+
+        full_path = tmp_path / 'full.csv'
+        await self.crawl(full_path, listing, incremental=False, with_variants=with_variants)
+        assert path.read_text() == full_path.read_text()
+
+    @pytest.mark.asyncio
+    async def test_sequential_crawl_uses_manifest(self, tmp_path):
+        """Test the blocking crawl reuses rows from the manifest too."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        expected = path.read_text()
+
+        crawler = ShopifyCrawler(BASE_URL, str(path), write_binary=False, incremental=True)
+        pages = self.listing({}) + [[]]
+        with patch.object(crawler, 'get_page', side_effect=lambda page: pages[page - 1]), \
+                patch.object(crawler, 'get_tags_from_product') as get_tags:
+            crawler.crawl()
+
+        get_tags.assert_not_called()
+        assert path.read_text() == expected
+
+    @pytest.mark.asyncio
+    async def test_non_incremental_crawl_fetches_everything(self, tmp_path):
+        """Test the manifest is written but not used unless requested."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        store, _ = await self.crawl(path, self.listing({}), incremental=False)
+
+        assert len(self.fetched(store)) == 8
+        assert (tmp_path / 'products.csv.manifest.json').exists()
+
+    @pytest.mark.asyncio
+    async def test_incompatible_manifest_ignored(self, tmp_path):
+        """Test a manifest written with another header forces a full crawl."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        store, _ = await self.crawl(path, self.listing({}), incremental=True, with_variants=True)
+
+        assert len(self.fetched(store)) == 16
+
+    @pytest.mark.asyncio
+    async def test_corrupt_manifest_ignored(self, tmp_path):
+        """Test an unreadable manifest forces a full crawl."""
+        path = tmp_path / 'products.csv'
+        (tmp_path / 'products.csv.manifest.json').write_text('{"version": ')
+        store, _ = await self.crawl(path, self.listing({}), incremental=True)
+
+        assert len(self.fetched(store)) == 8
+
+
+    @pytest.mark.asyncio
+    async def test_manifest_keeps_no_rows(self, tmp_path):
+        """Test the manifest records where each product's rows are instead of the rows."""
+        path = tmp_path / 'products.csv'
+        _, crawler = await self.crawl(path, self.listing({}), incremental=False)
+
+        manifest = json.loads((tmp_path / 'products.csv.manifest.json').read_text())
+        entry = manifest['products']['1']
+        assert set(entry) == {'updated_at', 'hash', 'offset', 'length', 'rows_hash'}
+        assert path.read_bytes()[entry['offset']:entry['offset'] + entry['length']].startswith(b'Product 1,')
+        assert all('rows' not in entry for entry in crawler._manifest.values())
+
+    @pytest.mark.asyncio
+    async def test_edited_csv_rows_fetched_again(self, tmp_path):
+        """Test rows that no longer match the manifest are fetched instead of copied."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        expected = path.read_text()
+        path.write_bytes(path.read_bytes().replace(b'Product 3,', b'Product X,'))
+
+        store, crawler = await self.crawl(path, self.listing({}), incremental=True)
+
+        assert self.fetched(store) == ['product-3']
+        assert crawler.stats['reused'] == 7
+        assert path.read_text() == expected
+
+    @pytest.mark.asyncio
+    async def test_reused_rows_written_to_sqlite(self, tmp_path):
+        """Test rows copied from the previous CSV also reach the SQLite catalog."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        sqlite_path = str(tmp_path / 'products.sqlite')
+        crawler = ShopifyCrawler(BASE_URL, str(path), write_binary=False, incremental=True,
+                                 sqlite_output_path=sqlite_path, parse_workers=0)
+        await crawler.crawl_async(Store(self.listing({'product-2': 't1'})).client())
+
+        catalog = SQLiteCatalog(sqlite_path)
+        assert [product['name'] for product in catalog.page(0, 10, ['name'])] == [
+            f'Product {index}' for index in range(8)]
+        catalog.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_crawl_keeps_previous_csv(self, tmp_path):
+        """Test a failed crawl leaves the previous CSV in place."""
+        path = tmp_path / 'products.csv'
+        await self.crawl(path, self.listing({}), incremental=False)
+        expected = path.read_text()
+
+        def handler(request):
+            if request.url.path == '/products.json':
+                return httpx.Response(200, json={'products': LISTING[0]})
+            return httpx.Response(500)
+
+        crawler = ShopifyCrawler(BASE_URL, str(path), write_binary=False, parse_workers=0)
+        with pytest.raises(httpx.HTTPStatusError):
+            await crawler.crawl_async(PooledHTTPClient(transport=httpx.MockTransport(handler)))
+
+        assert path.read_text() == expected
+        assert sorted(file.name for file in tmp_path.iterdir()) == ['products.csv', 'products.csv.manifest.json']
+
+
+class TestListingDrivenCrawl:
+    """Test variants taken from the listing payload."""
+
+    @staticmethod
+    def listing_with_variants(build=variants):
+        """Build a listing whose products embed their variants."""
+        return [[dict(product, variants=build(product['handle'])) for product in page] for page in LISTING]
+
+    @staticmethod
+    def complete_variants(handle):
+        """Build variants that carry every variant column."""
+        return [{key: variant.get(key, f'{key}-{variant["id"]}') for key in VARIANT_ATTRIBUTES}
+                for variant in detail_variants(handle)]
+
+    @pytest.mark.asyncio
+    async def test_listing_variants_merged_with_product_json(self, tmp_path):
+        """Test fields missing from listing variants are filled in from <handle>.json."""
+        store = Store(self.listing_with_variants())
+        path = tmp_path / 'listing.csv'
+        crawler = ShopifyCrawler(BASE_URL, str(path), with_variants=True, write_binary=False, parse_workers=0)
+        await crawler.crawl_async(store.client())
+
+        assert sum(event.endswith('.json') for event in store.events) == 8
+        df = pd.read_csv(path)
+        assert df['Inventory Quantity'].tolist() == [index * 10 + offset + 1
+                                                     for index in range(8) for offset in range(2)]
+        assert (df['Inventory Policy'] == 'deny').all()
+        assert (df['Weight Unit'] == 'kg').all()
+
+        per_product_path = tmp_path / 'per_product.csv'
+        crawler = ShopifyCrawler(BASE_URL, str(per_product_path), with_variants=True, write_binary=False,
+                                 listing_variants=False, parse_workers=0)
+        await crawler.crawl_async(Store(self.listing_with_variants()).client())
+        assert path.read_text() == per_product_path.read_text()
+
+    @pytest.mark.asyncio
+    async def test_complete_listing_variants_skip_product_json(self, tmp_path):
+        """Test no per-product JSON is requested when listing variants have every column."""
+        store = Store(self.listing_with_variants(self.complete_variants))
+        path = tmp_path / 'listing.csv'
+        crawler = ShopifyCrawler(BASE_URL, str(path), with_variants=True, write_binary=False, parse_workers=0)
+        await crawler.crawl_async(store.client())
+
+        fetched = [event for event in store.events if event.startswith('done')]
+        assert len(fetched) == 8
+        assert not any(event.endswith('.json') for event in fetched)
+        assert pd.read_csv(path)['Barcode'].tolist()[:2] == ['BC-0', 'BC-1']
+
+    @pytest.mark.asyncio
+    async def test_listing_requests_max_page_size(self, tmp_path):
+        """Test listing pages are requested with limit=250."""
+        store = Store()
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), write_binary=False, parse_workers=0)
+        await crawler.crawl_async(store.client())
+
+        assert store.limits == ['250', '250', '250']
+
+    def test_sequential_crawl_uses_listing_variants(self, tmp_path):
+        """Test the blocking crawl also skips the per-product JSON request for complete variants."""
+        crawler = ShopifyCrawler(BASE_URL, str(tmp_path / 'products.csv'), with_variants=True, write_binary=False)
+        pages = self.listing_with_variants(self.complete_variants) + [[]]
+        with patch.object(crawler, 'get_page', side_effect=lambda page: pages[page - 1]), \
+                patch.object(crawler, 'get_tags_from_product', return_value=('Title', 'Meta')), \
+                patch.object(crawler, 'get_inventory_from_product') as get_inventory:
+            crawler.crawl()
+
+        get_inventory.assert_not_called()
+        assert len(pd.read_csv(tmp_path / 'products.csv')) == 16
+
+    def test_sequential_crawl_merges_product_json(self, tmp_path):
+        """Test the blocking crawl fills listing variants from <handle>.json."""
+        path = tmp_path / 'products.csv'
+        crawler = ShopifyCrawler(BASE_URL, str(path), with_variants=True, write_binary=False)
+        pages = self.listing_with_variants() + [[]]
+        with patch.object(crawler, 'get_page', side_effect=lambda page: pages[page - 1]), \
+                patch.object(crawler, 'get_tags_from_product', return_value=('Title', 'Meta')), \
+                patch.object(crawler, 'get_inventory_from_product',
+                             side_effect=product_json_variants):
+            crawler.crawl()
+
+        df = pd.read_csv(path)
+        assert df['Inventory Quantity'].tolist()[:2] == [1, 2]
+        assert df['SKU'].tolist()[:2] == ['SKU-0-0', 'SKU-0-1']
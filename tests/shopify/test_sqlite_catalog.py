@@ -0,0 +1,185 @@
+"""Tests for the SQLite catalog backend."""
+
+import os
+import sqlite3
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.shopify_crawler import ShopifyCrawler
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+from mcp_servers.shopify.repository.sqlite_catalog import (
+    SQLiteCatalog,
+    SQLiteCatalogWriter,
+    write_sqlite_catalog,
+)
+
+
+@pytest.fixture
+def df():
+    """Build a small product table."""
+    return pd.DataFrame({
+        'Name': ['Solar Generator 1000', 'Explorer Power Station', 'Solar Panel 100W',
+                 'Solar Generator 2000', 'RV Kit'],
+        'URL': ['u1', 'u2', 'u3', 'u4', 'u5'],
+        'Meta Title': ['', '', '', '', ''],
+        'Meta Description': ['', '', '', '', ''],
+        'Product Description': ['Now $1,099.00 for camping', 'Only $499 for home backup',
+                                '$0.1 solar panel for camping', 'Only $1,999 for camping trips',
+                                '$99 for an rv trip'],
+    })
+
+
+@pytest.fixture
+def catalog(df, tmp_path):
+    """Write the table to SQLite and open it read-only."""
+    path = str(tmp_path / 'products.sqlite')
+    write_sqlite_catalog(df, path, page_size=2)
+    catalog = SQLiteCatalog(path)
+    yield catalog
+    catalog.close()
+
+
+class TestSQLiteCatalog:
+    """Test SQLiteCatalog class."""
+
+    def test_size_and_page(self, catalog):
+        """Test rows keep catalog order and derived fields."""
+        assert len(catalog) == 5
+        assert catalog.page(0, 2) == [
+            {'name': 'Solar Generator 1000', 'url': 'u1', 'description': 'Now $1,099.00 for camping',
+             'price': 1099.0, 'category': 'Solar Generator'},
+            {'name': 'Explorer Power Station', 'url': 'u2', 'description': 'Only $499 for home backup',
+             'price': 499.0, 'category': 'Battery Pack'},
+        ]
+        assert catalog.page(4, 10, ['price', 'name']) == [{'price': 99.0, 'name': 'RV Kit'}]
+
+    def test_search_record(self, catalog):
+        """Test search records have the search_products fields."""
+        assert catalog.search_record(2) == {'name': 'Solar Panel 100W', 'url': 'u3',
+                                            'description': '$0.1 solar panel for camping'}
+
+    @pytest.mark.parametrize('product_filter', [
+        ProductFilter(category='solar generator', scenario='camping'),
+        ProductFilter(category='SOLAR', scenario='camping', max_price=1099),
+        ProductFilter(category='solar', scenario='camping', min_price=0.1),
+        ProductFilter(category='solar', scenario='camping', max_price=0.1),
+        ProductFilter(category='station', scenario='backup', description='home'),
+        ProductFilter(category='kit', scenario='rv'),
+        ProductFilter(category='solar', scenario='camping', min_price=1000, max_price=1500),
+    ])
+    def test_matches_memory_backend(self, df, catalog, product_filter):
+        """Test the same rows match as in the in-memory snapshot."""
+        snapshot = CatalogSnapshot(df)
+        expected = snapshot.filter_engine.filter(product_filter).tolist()
+
+        assert sorted(catalog.search(product_filter, limit=10)) == expected
+
+    def test_ranked_by_relevance(self, df, catalog):
+        """Test rows with more matching terms rank first, like the in-memory index."""
+        product_filter = ProductFilter(category='solar', scenario='camping')
+        ranked = catalog.search(product_filter, limit=3)
+
+        assert ranked[0] == 2
+        assert ranked == CatalogSnapshot(df).search(product_filter, limit=3)
+
+    def test_opened_read_only(self, catalog):
+        """Test the server connection cannot write."""
+        with pytest.raises(sqlite3.OperationalError):
+            catalog._connection.execute("DELETE FROM products")
+
+
+class TestSQLiteCatalogWriter:
+    """Test SQLiteCatalogWriter class."""
+
+    def test_abort_keeps_previous_file(self, df, tmp_path):
+        """Test a failed write leaves the existing catalog in place."""
+        path = str(tmp_path / 'products.sqlite')
+        write_sqlite_catalog(df, path)
+
+        with pytest.raises(RuntimeError):
+            with SQLiteCatalogWriter(path) as writer:
+                writer.write_page(['Name', 'URL'], [['Only one', 'u9']])
+                raise RuntimeError('crawl failed')
+
+        assert len(SQLiteCatalog(path)) == 5
+        assert os.listdir(tmp_path) == ['products.sqlite']
+
+    def test_extra_columns_are_kept(self, tmp_path):
+        """Test variant columns are stored alongside the indexed fields."""
+        path = str(tmp_path / 'products.sqlite')
+        with SQLiteCatalogWriter(path) as writer:
+            writer.write_page(['Name', 'Variant ID', 'URL'], [['Explorer', 42, 'u1']])
+
+        connection = sqlite3.connect(path)
+        assert connection.execute("SELECT extra FROM products").fetchone() == ('{"Variant ID": 42}',)
+        connection.close()
+
+
+class TestSQLiteBackend:
+    """Test tools on top of the SQLite backend."""
+
+    @pytest.fixture
+    def use_catalog(self, catalog, monkeypatch):
+        """Serve the SQLite catalog through the module loader."""
+        monkeypatch.setattr(shopify_products, '_catalog_loader',
+                            CatalogLoader(catalog.path, build_snapshot=lambda path, digest: SQLiteCatalog(path)))
+        shopify_products._search_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_search_products(self, use_catalog):
+        """Test search_products returns SQLite rows."""
+        results = await shopify_products.search_products('solar generator', 'camping', max_price=1500)
+        assert [product['url'] for product in results] == ['u1']
+
+    @pytest.mark.asyncio
+    async def test_unsupported_match_mode(self, use_catalog):
+        """Test modes the backend does not support are rejected."""
+        with pytest.raises(ValueError):
+            await shopify_products.search_products('solar', 'camping', match_mode='semantic')
+
+    @pytest.mark.asyncio
+    async def test_get_all_products(self, use_catalog):
+        """Test pagination over the SQLite backend."""
+        result = await shopify_products.get_all_products(limit=3, fields=['url'])
+        assert result['products'] == [{'url': 'u1'}, {'url': 'u2'}, {'url': 'u3'}]
+        result = await shopify_products.get_all_products(limit=3, cursor=result['next_cursor'], fields=['url'])
+        assert result['products'] == [{'url': 'u4'}, {'url': 'u5'}]
+        assert result['next_cursor'] is None
+
+    def test_create_catalog_loader(self):
+        """Test the backend setting selects the loader."""
+        assert shopify_products.create_catalog_loader('sqlite').path == shopify_products.PRODUCTS_SQLITE_PATH
+        with pytest.raises(ValueError):
+            shopify_products.create_catalog_loader('redis')
+
+
+class TestCrawlerSQLiteOutput:
+    """Test the crawler writes the SQLite catalog page by page."""
+
+    def test_crawl_writes_sqlite_catalog(self, tmp_path):
+        """Test each listing page is written in its own transaction."""
+        csv_path = str(tmp_path / 'products.csv')
+        sqlite_path = str(tmp_path / 'products.sqlite')
+        crawler = ShopifyCrawler('https://store.example.com', csv_path, write_binary=False,
+                                 sqlite_output_path=sqlite_path)
+        pages = [
+            [{'title': 'Explorer 1000', 'handle': 'explorer-1000', 'body_html': '<p>Only $799</p>'}],
+            [{'title': 'Solar Panel', 'handle': 'solar-panel', 'body_html': '<p>Only $199</p>'}],
+            [],
+        ]
+
+        with patch.object(crawler, 'get_page', side_effect=pages), \
+                patch.object(crawler, 'get_tags_from_product', return_value=('Title', 'Meta')), \
+                patch.object(SQLiteCatalogWriter, 'write_page', autospec=True,
+                             side_effect=SQLiteCatalogWriter.write_page) as write_page:
+            crawler.crawl()
+
+        assert write_page.call_count == 2
+        catalog = SQLiteCatalog(sqlite_path)
+        assert [product['price'] for product in catalog.page(0, 10)] == [799.0, 199.0]
+        assert catalog.search_record(1)['url'] == 'https://store.example.com/products/solar-panel'
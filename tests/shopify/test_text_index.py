@@ -0,0 +1,103 @@
+"""Tests for the BM25 full-text index."""
+
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+from mcp_servers.shopify.repository.text_index import BM25Index, tokenize
+
+
+class TestTokenize:
+    """Test the tokenizer."""
+
+    def test_tokenize(self):
+        """Test tokens are lowercased word characters."""
+        assert tokenize('Solar Generator 2000 v2, for CAMPING!') == [
+            'solar', 'generator', '2000', 'v2', 'for', 'camping'
+        ]
+        assert tokenize(None) == ['none']
+
+
+class TestBM25Index:
+    """Test BM25Index class."""
+
+    @pytest.fixture
+    def index(self):
+        """Build a small index."""
+        return BM25Index([
+            'portable power station',
+            'camping camping camping solar generator',
+            'solar panel for camping',
+            'home backup battery',
+        ])
+
+    def test_score_only_matching_documents(self, index):
+        """Test only documents containing query terms are scored."""
+        docs, scores = index.score('camping')
+
+        assert docs.tolist() == [1, 2]
+        assert (scores > 0).all()
+        assert scores[0] > scores[1]
+
+    def test_unknown_terms(self, index):
+        """Test queries without known terms score nothing."""
+        docs, scores = index.score('refrigerator')
+        assert len(docs) == 0 and len(scores) == 0
+
+    def test_top_k(self, index):
+        """Test top-k returns the best documents first."""
+        assert [doc for doc, _ in index.top_k('solar camping', 2)] == [1, 2]
+        assert [doc for doc, _ in index.top_k('solar camping', 1)] == [1]
+
+    def test_ranked_is_sorted(self, index):
+        """Test ranked iteration yields descending scores."""
+        scores = [score for _, score in index.ranked('solar camping backup')]
+        assert scores == sorted(scores, reverse=True)
+        assert len(scores) == 3
+
+    def test_rare_terms_weigh_more(self, index):
+        """Test idf favors rarer terms."""
+        assert index.idf('backup') > index.idf('camping')
+
+
+class TestCatalogSearch:
+    """Test ranked search over a catalog snapshot."""
+
+    @pytest.fixture
+    def snapshot(self):
+        """Build a snapshot whose best match is not the first row."""
+        return CatalogSnapshot(pd.DataFrame({
+            'Name': ['Solar Generator A', 'Solar Generator B', 'Mysolar Generatorx', 'Cable'],
+            'URL': ['a', 'b', 'c', 'd'],
+            'Meta Title': ['', 'Camping Solar Generator', '', ''],
+            'Product Description': [
+                'generic description mentioning camping once among many other words here',
+                'built for camping, camping trips and camping in the wild',
+                'campingwith typo',
+                'cable for camping',
+            ],
+        }))
+
+    def test_most_relevant_first(self, snapshot):
+        """Test results are ordered by relevance, not catalog order."""
+        result = snapshot.search(ProductFilter(category='solar generator', scenario='camping'), 3)
+        assert result[:2] == [1, 0]
+
+    def test_substring_matches_without_terms_are_kept(self, snapshot):
+        """Test substring matches with no indexed term still fill the limit."""
+        # Keywords outside the taxonomy match as substrings; taxonomy tags only match whole words
+        snapshot = CatalogSnapshot(snapshot.df, taxonomy={})
+        assert snapshot.text_index.score('solar generator camping')[0].tolist() == [0, 1, 3]
+        result = snapshot.search(ProductFilter(category='solar generator', scenario='camping'), 3)
+        assert sorted(result) == [0, 1, 2]
+
+    def test_taxonomy_tags_skip_partial_words(self, snapshot):
+        """Test taxonomy tags do not match keywords glued to other words."""
+        result = snapshot.search(ProductFilter(category='solar generator', scenario='camping'), 3)
+        assert sorted(result) == [0, 1]
+
+    def test_filters_still_apply(self, snapshot):
+        """Test ranked results respect the filter."""
+        result = snapshot.search(ProductFilter(category='cable', scenario='camping'), 3)
+        assert result == [3]
@@ -0,0 +1,167 @@
+"""Tests for variant aggregation."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+from mcp_servers.shopify.repository.variants import VariantGroups, parse_price_column
+
+
+@pytest.fixture
+def variants_df():
+    """Build a with-variants catalog: two products with several variants and one single."""
+    rows = [
+        ('Explorer 1000', 11, 1, 'Black', '999.00', 5),
+        ('Solar Panel 100W', 21, 2, 'Default Title', '199.00', 7),
+        ('Explorer 1000', 12, 1, 'With panel', '1,499.00', 3),
+        ('Explorer 1000', 13, 1, 'Refurbished', '799.00', None),
+        ('Cable', 31, 3, 'Default Title', None, 2),
+    ]
+    return pd.DataFrame({
+        'Name': [row[0] for row in rows],
+        'Variant ID': [row[1] for row in rows],
+        'Product ID': [row[2] for row in rows],
+        'Variant Title': [row[3] for row in rows],
+        'Price': [row[4] for row in rows],
+        'Inventory Quantity': [row[5] for row in rows],
+        'URL': [f'u{row[2]}' for row in rows],
+        'Product Description': ['Portable power for camping, $1,099', 'Solar panel for camping, $199',
+                                'Portable power for camping, $1,099', 'Portable power for camping, $1,099',
+                                'Charging cable'],
+    })
+
+
+class TestParsePriceColumn:
+    """Test Price column parsing."""
+
+    def test_text_prices(self):
+        """Test text prices keep the Decimal rounding direction."""
+        prices, rounding = parse_price_column(pd.Series(['1,299.99', '0.1', '', None]))
+
+        assert prices[0] == 1299.99
+        assert rounding[1] == -1
+        assert np.isnan(prices[2]) and np.isnan(prices[3])
+
+    def test_numeric_prices(self):
+        """Test numeric columns are used as is."""
+        prices, rounding = parse_price_column(pd.Series([10.5, np.nan]))
+        assert prices[0] == 10.5 and np.isnan(prices[1])
+        assert not rounding.any()
+
+
+class TestVariantGroups:
+    """Test VariantGroups class."""
+
+    def test_groups_in_first_seen_order(self, variants_df):
+        """Test products keep the order of their first variant."""
+        groups = VariantGroups(variants_df)
+
+        assert len(groups) == 3
+        assert groups.product_rows.tolist() == [0, 1, 4]
+        assert groups.variant_products.tolist() == [0, 1, 0, 0, 2]
+
+    def test_aggregates(self, variants_df):
+        """Test price range, inventory and variant counts per product."""
+        groups = VariantGroups(variants_df)
+
+        assert groups.min_prices[0] == 799.0 and groups.max_prices[0] == 1499.0
+        assert np.isnan(groups.min_prices[2])
+        assert groups.total_inventory.tolist() == [8, 7, 2]
+        assert groups.variant_counts.tolist() == [3, 1, 1]
+
+    def test_variants(self, variants_df):
+        """Test the variant list of a product."""
+        assert VariantGroups(variants_df).variants(0) == [
+            {'id': 11, 'title': 'Black', 'price': 999.0, 'inventory_quantity': 5.0},
+            {'id': 12, 'title': 'With panel', 'price': 1499.0, 'inventory_quantity': 3.0},
+            {'id': 13, 'title': 'Refurbished', 'price': 799.0, 'inventory_quantity': None},
+        ]
+
+    def test_missing_product_id(self):
+        """Test rows without a Product ID stay separate products."""
+        df = pd.DataFrame({'Product ID': [1, None, None], 'Price': ['1', '2', '3']})
+        assert len(VariantGroups(df)) == 3
+
+
+class TestAggregatedSnapshot:
+    """Test CatalogSnapshot over aggregated variants."""
+
+    def test_one_position_per_product(self, variants_df):
+        """Test searches and pages see products, not variants."""
+        snapshot = CatalogSnapshot(variants_df)
+
+        assert len(snapshot) == 3
+        assert snapshot.search(ProductFilter(category='explorer', scenario='camping'), 3) == [0]
+        assert [product['url'] for product in snapshot.page(0, 10, ['url'])] == ['u1', 'u2', 'u3']
+
+    def test_price_uses_variant_prices(self, variants_df):
+        """Test a product matches when any variant is within the range."""
+        snapshot = CatalogSnapshot(variants_df)
+
+        def matching(**prices):
+            return snapshot.filter_engine.filter(ProductFilter(category='', scenario='', **prices)).tolist()
+
+        assert matching(min_price=1200) == [0, 2]
+        assert matching(max_price=800) == [0, 1, 2]
+        assert matching(min_price=900, max_price=1000) == [0, 2]
+        assert matching(min_price=1500) == [2]
+        assert snapshot.price_at(0) == 799.0
+
+    def test_ranked_search_computes_price_mask_once(self, variants_df, monkeypatch):
+        """Test ranked search builds the product price mask once from the price index."""
+        many = pd.concat([variants_df.assign(**{'Product ID': variants_df['Product ID'] + 10 * copy,
+                                                'URL': variants_df['URL'] + f'-{copy}'})
+                          for copy in range(40)], ignore_index=True)
+        snapshot = CatalogSnapshot(many)
+        engine = snapshot.filter_engine
+        calls = []
+        original = engine.product_price_mask
+        monkeypatch.setattr(engine, 'product_price_mask', lambda *args: calls.append(args) or original(*args))
+        monkeypatch.setattr(engine, '_price_row_mask', lambda *args: pytest.fail('variant rows rescanned'))
+
+        positions = snapshot.search(ProductFilter(category='explorer', scenario='camping', min_price=1200), 100)
+
+        assert len(calls) == 1
+        assert positions == list(range(0, 120, 3))
+
+    def test_record_fields(self, variants_df):
+        """Test aggregated fields are only built when requested."""
+        snapshot = CatalogSnapshot(variants_df)
+
+        assert snapshot.record(0, ['min_price', 'max_price', 'total_inventory', 'variant_count']) == {
+            'min_price': 799.0, 'max_price': 1499.0, 'total_inventory': 8, 'variant_count': 3
+        }
+        assert [variant['id'] for variant in snapshot.record(0, ['variants'])['variants']] == [11, 12, 13]
+
+    def test_compact_mode(self, variants_df):
+        """Test compact mode aggregates the same way."""
+        full = CatalogSnapshot(variants_df)
+        compact = CatalogSnapshot(variants_df, compact=True)
+
+        fields = ['name', 'price', 'total_inventory', 'variants']
+        assert compact.page(0, 10, fields) == full.page(0, 10, fields)
+
+    def test_without_aggregation(self, variants_df):
+        """Test aggregation can be turned off."""
+        snapshot = CatalogSnapshot(variants_df, aggregate_variants=False)
+        assert len(snapshot) == 5
+        assert snapshot.record(0, ['variant_count', 'variants']) == {'variant_count': 1, 'variants': []}
+
+    @pytest.mark.asyncio
+    async def test_get_all_products_variants(self, variants_df, monkeypatch, tmp_path):
+        """Test get_all_products returns variants on request."""
+        snapshot = CatalogSnapshot(variants_df)
+        csv_path = tmp_path / 'products.csv'
+        csv_path.write_text('')
+        monkeypatch.setattr(shopify_products, '_catalog_loader',
+                            CatalogLoader(str(csv_path), build_snapshot=lambda path, digest: snapshot))
+
+        result = await shopify_products.get_all_products(limit=1, fields=['name', 'variant_count', 'variants'])
+
+        assert result['total'] == 3
+        assert result['products'][0]['variant_count'] == 3
+        assert len(result['products'][0]['variants']) == 3
@@ -0,0 +1,173 @@
+"""Tests for the hashed TF-IDF vector index."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mcp_servers.shopify.repository import shopify_products
+from mcp_servers.shopify.repository.catalog import CatalogSnapshot
+from mcp_servers.shopify.repository.catalog_loader import CatalogLoader, build_snapshot_from_file
+from mcp_servers.shopify.repository.shopify_products import ProductFilter
+from mcp_servers.shopify.repository.vector_index import VectorIndex, text_features, vector_index_path
+
+
+DOCUMENTS = [
+    'portable power station for camping trips',
+    'solar panel for the roof',
+    'portable power station for camping trips',
+    'home backup battery keeps a cpap running overnight',
+]
+
+
+@pytest.fixture
+def index():
+    """Build a small index."""
+    return VectorIndex.build(DOCUMENTS, dimensions=256)
+
+
+class TestVectorIndex:
+    """Test VectorIndex class."""
+
+    def test_text_features(self):
+        """Test features include words and word pairs."""
+        assert text_features('Solar Panel kit') == ['solar', 'panel', 'kit', 'solar panel', 'panel kit']
+
+    def test_sparse_layout(self, index):
+        """Test identical texts share one normalized sparse row holding only nonzero weights."""
+        assert index.data.dtype == np.float32
+        assert index.indptr.tolist()[0] == 0 and len(index.indptr) == 4
+        assert index.rows.tolist() == [0, 1, 0, 2]
+        for text_id in range(3):
+            start, end = index.indptr[text_id], index.indptr[text_id + 1]
+            assert len(set(index.indices[start:end].tolist())) == end - start
+            assert np.isclose(np.linalg.norm(index.data[start:end]), 1)
+        assert index.nbytes < 3 * 256 * 4
+
+    def test_scores_match_dense_product(self, index):
+        """Test sparse scoring equals the dense matrix-vector product."""
+        dense = np.zeros((3, 256), dtype=np.float32)
+        for text_id in range(3):
+            start, end = index.indptr[text_id], index.indptr[text_id + 1]
+            dense[text_id, index.indices[start:end]] = index.data[start:end]
+
+        query = 'power station for camping overnight'
+        assert np.allclose(index.scores(query), (dense @ index.query_vector(query))[index.rows])
+
+    def test_empty_text(self):
+        """Test texts without features score zero without shifting other rows."""
+        index = VectorIndex.build(['', 'solar panel', '', 'camping'], dimensions=64)
+        assert index.scores('camping').tolist()[:3] == [0, 0, 0]
+        assert index.scores('camping')[3] > 0
+
+    def test_top_k(self, index):
+        """Test the most similar rows come first, ties in catalog order."""
+        assert [position for position, _ in index.top_k('run my cpap overnight', 2)] == [3]
+        assert [position for position, _ in index.top_k('camping power', 3)] == [0, 2]
+
+    def test_top_k_with_mask(self, index):
+        """Test masked rows are never returned."""
+        mask = np.array([False, True, True, True])
+        assert [position for position, _ in index.top_k('camping power', 3, mask)] == [2]
+
+    def test_unknown_query(self, index):
+        """Test queries without known features return nothing."""
+        assert index.top_k('refrigerator', 3) == []
+
+    def test_save_and_load(self, index, tmp_path):
+        """Test a saved index loads only for the same digest."""
+        path = str(tmp_path / 'products.csv.vectors.npz')
+        index.save(path, 'abc')
+
+        loaded = VectorIndex.load(path, 'abc')
+        assert np.array_equal(loaded.data, index.data)
+        assert np.array_equal(loaded.indices, index.indices)
+        assert loaded.rows.tolist() == index.rows.tolist()
+        assert VectorIndex.load(path, 'def') is None
+
+    def test_corrupt_file(self, tmp_path):
+        """Test an unreadable file is ignored."""
+        path = tmp_path / 'products.csv.vectors.npz'
+        path.write_bytes(b'not a zip file')
+        assert VectorIndex.load(str(path), 'abc') is None
+
+
+class TestVectorFile:
+    """Test vectors saved next to the catalog."""
+
+    @pytest.fixture
+    def csv_path(self, tmp_path):
+        """Write a products CSV."""
+        path = tmp_path / 'products.csv'
+        path.write_text('Name,URL,Product Description\n'
+                        'Explorer 1000,u1,$999 runs a CPAP overnight\n'
+                        'Solar Panel,u2,$199 for the roof\n')
+        return str(path)
+
+    def test_vectors_are_reused(self, csv_path, monkeypatch):
+        """Test a second load reads the saved vectors."""
+        build_snapshot_from_file(csv_path)
+        assert os.path.exists(vector_index_path(csv_path))
+
+        monkeypatch.setattr(VectorIndex, 'build', classmethod(lambda cls, documents: pytest.fail('rebuilt')))
+        snapshot = build_snapshot_from_file(csv_path)
+        assert snapshot.vector_index.size == 2
+
+    def test_vectors_in_cache_directory(self, csv_path, tmp_path):
+        """Test vectors can be kept outside the catalog's directory."""
+        vectors_dir = str(tmp_path / 'cache' / 'vectors')
+        build_snapshot_from_file(csv_path, vectors_dir=vectors_dir)
+
+        assert not os.path.exists(vector_index_path(csv_path))
+        assert os.path.exists(vector_index_path(csv_path, vectors_dir))
+        assert os.path.dirname(vector_index_path(csv_path, vectors_dir)) == vectors_dir
+
+    def test_changed_catalog_rebuilds_vectors(self, csv_path):
+        """Test vectors for old content are not used."""
+        build_snapshot_from_file(csv_path)
+        with open(csv_path, 'a') as f:
+            f.write('Battery Pack,u3,$299 for camping\n')
+
+        snapshot = build_snapshot_from_file(csv_path)
+        assert snapshot.vector_index.size == 3
+
+
+class TestSemanticSearch:
+    """Test semantic search mode."""
+
+    @pytest.fixture
+    def snapshot(self):
+        """Build a small catalog snapshot."""
+        return CatalogSnapshot(pd.DataFrame({
+            'Name': ['Explorer 1000', 'Solar Panel 100W', 'Explorer 300'],
+            'URL': ['u1', 'u2', 'u3'],
+            'Product Description': ['$999 power station runs a CPAP machine overnight at camp',
+                                    '$199 solar panel for the roof',
+                                    '$299 small power station for phones'],
+        }))
+
+    def test_semantic_search(self, snapshot):
+        """Test natural language queries rank by similarity."""
+        product_filter = ProductFilter(description='something to run a CPAP overnight while camping')
+        assert snapshot.semantic_search(product_filter, 3)[0] == 0
+
+    def test_price_filter_is_exact(self, snapshot):
+        """Test price bounds still apply in semantic mode."""
+        product_filter = ProductFilter(description='power station for a cpap', max_price=500)
+        positions = snapshot.semantic_search(product_filter, 3)
+        assert positions[0] == 2
+        assert 0 not in positions
+
+    @pytest.mark.asyncio
+    async def test_search_products_semantic_mode(self, snapshot, monkeypatch, tmp_path):
+        """Test search_products dispatches to semantic search."""
+        csv_path = tmp_path / 'products.csv'
+        csv_path.write_text('')
+        monkeypatch.setattr(shopify_products, '_catalog_loader',
+                            CatalogLoader(str(csv_path), build_snapshot=lambda path, digest: snapshot))
+        shopify_products._search_cache.clear()
+
+        results = await shopify_products.search_products('', '', description='cpap overnight camping',
+                                                         match_mode='semantic')
+        assert results[0]['url'] == 'u1'